@@ -0,0 +1,6 @@
+"""Microbenchmarks of the transform and job hot paths.
+
+The benchmarks are run with `python -m benchmarks run`, from the backend directory.
+Their results can be stored as JSON baselines, against which later runs are compared
+with `python -m benchmarks compare`.
+"""
@@ -0,0 +1,123 @@
+"""Command line interface of the benchmarks.
+
+Usage:
+    python -m benchmarks run [-k PATTERN] [--save PATH]
+    python -m benchmarks compare BASELINE [RESULTS] [-k PATTERN] [--threshold RATIO]
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+from .data import init_stand_ins
+from .runner import compare, get_environment, run
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    parser_run = subparsers.add_parser('run', help='Runs the benchmarks.')
+    add_run_arguments(parser_run)
+    parser_run.add_argument(
+        '--save', type=Path, help='Path of the JSON file storing the results.'
+    )
+
+    parser_compare = subparsers.add_parser(
+        'compare', help='Compares the benchmark results with a baseline.'
+    )
+    parser_compare.add_argument('baseline', type=Path, help='The baseline JSON file.')
+    parser_compare.add_argument(
+        'results',
+        type=Path,
+        nargs='?',
+        help='The JSON file of the results. If not specified, the benchmarks of the '
+        'baseline are run.',
+    )
+    add_run_arguments(parser_compare)
+    parser_compare.add_argument(
+        '--threshold',
+        type=float,
+        default=0.2,
+        help='Maximum relative slowdown of the median durations (default: 0.2).',
+    )
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        results = run_benchmarks(args)
+        if args.save is not None:
+            args.save.parent.mkdir(parents=True, exist_ok=True)
+            content = {'environment': get_environment(), 'benchmarks': results}
+            args.save.write_text(json.dumps(content, indent=2) + '\n')
+            print(f'Results saved in {args.save}.')
+        return 0
+
+    baseline = json.loads(args.baseline.read_text())['benchmarks']
+    baseline = {k: v for k, v in baseline.items() if args.k in k}
+    if args.results is None:
+        results = run_benchmarks(args)
+    else:
+        results = json.loads(args.results.read_text())['benchmarks']
+        results = {k: v for k, v in results.items() if args.k in k}
+    return print_comparisons(compare(baseline, results, args.threshold))
+
+
+def add_run_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        '-k', default='', help='Only runs the benchmarks containing this substring.'
+    )
+    parser.add_argument(
+        '--rounds', type=int, default=7, help='Number of timing rounds (default: 7).'
+    )
+    parser.add_argument(
+        '--min-time',
+        type=float,
+        default=0.1,
+        help='Minimum duration of a timing round, in seconds (default: 0.1).',
+    )
+
+
+def run_benchmarks(args: argparse.Namespace) -> dict[str, dict[str, Any]]:
+    """Runs the benchmarks and prints their median durations."""
+    init_stand_ins()
+    results = {}
+    for name, stats in run(args.k, args.rounds, args.min_time):
+        median, min_ = format_time(stats['median']), format_time(stats['min'])
+        print(f'{name:<60} median {median}  min {min_}')
+        results[name] = stats
+    return results
+
+
+def print_comparisons(comparisons: list[tuple[str, Any, Any, bool]]) -> int:
+    """Prints the comparisons and returns 1 if there are regressions."""
+    regressions = 0
+    for name, reference, current, regression in comparisons:
+        if reference is None or current is None:
+            status = 'missing baseline' if reference is None else 'not run'
+            print(f'{name:<60} {status}')
+            continue
+        ratio = current / reference
+        flag = '  REGRESSION' if regression else ''
+        print(
+            f'{name:<60} {format_time(reference)} -> {format_time(current)} '
+            f'({ratio:.2f}x){flag}'
+        )
+        regressions += regression
+    if regressions:
+        print(f'{regressions} benchmark(s) regressed.')
+        return 1
+    return 0
+
+
+def format_time(value: float) -> str:
+    """Formats a duration in seconds with an adequate unit."""
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('µs', 1e-6)):
+        if value >= scale:
+            return f'{value / scale:7.2f} {unit:<2}'
+    return f'{value / 1e-9:7.2f} ns'
+
+
+if __name__ == '__main__':
+    sys.exit(main())
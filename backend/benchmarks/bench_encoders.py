@@ -0,0 +1,47 @@
+"""Benchmarks of the encoders of the job outputs."""
+
+import numpy as np
+
+import sonounolib
+from sonouno_server.types import MediaEncoding
+from sonouno_server.util.encoders import (
+    NumpyNPZEncoder,
+    NumpyWaveEncoder,
+    SonoUnoTrackEncoder,
+)
+
+from .runner import benchmark
+
+RATE = 44100
+DURATIONS = {'1s': 1, '10s': 10, '60s': 60}
+
+
+def create_signal(duration: float) -> np.ndarray:
+    time = np.arange(int(duration * RATE)) / RATE
+    return 0.5 * np.sin(2 * np.pi * 440 * time)
+
+
+@benchmark(DURATIONS)
+def wave_float64_to_int16(duration: float):
+    value = create_signal(duration)
+    encoding: MediaEncoding = {'rate': RATE, 'format': 'int16', 'max_amplitude': 1.0}
+    return lambda: NumpyWaveEncoder().encode(value, encoding)
+
+
+@benchmark(DURATIONS)
+def wave_float32(duration: float):
+    value = create_signal(duration).astype(np.float32)
+    return lambda: NumpyWaveEncoder().encode(value, {'rate': RATE})
+
+
+@benchmark(DURATIONS)
+def npz(duration: float):
+    value = create_signal(duration)
+    return lambda: NumpyNPZEncoder().encode(value, {})
+
+
+@benchmark(DURATIONS)
+def sonounolib_track(duration: float):
+    track = sonounolib.Track(RATE, max_amplitude='int16')
+    track.add_sine_wave(440, duration)
+    return lambda: SonoUnoTrackEncoder().encode(track, {})
@@ -0,0 +1,101 @@
+"""Benchmarks of the job creation and of the processing of the job outputs."""
+
+import asyncio
+from io import BytesIO
+
+import numpy as np
+from beanie import PydanticObjectId
+
+import sonounolib
+from sonouno_server.models import Job, JobIn
+from sonouno_server.schemas import JSONSchema
+from sonouno_server.util.io import transfer_values
+from sonouno_server.util.job_builder import JobBuilder
+
+from .data import (
+    create_transform,
+    create_user,
+    generate_binary_tree_source,
+    generate_source,
+)
+from .runner import benchmark
+
+WAVE_SCHEMA = {
+    'contentMediaType': 'audio/x-wav',
+    'x-contentMediaEncoding': {'rate': 44100, 'format': 'int16'},
+}
+
+
+@benchmark(
+    {
+        'chain-200': generate_source(200),
+        'binary-tree-8': generate_binary_tree_source(8),
+        'binary-tree-10': generate_binary_tree_source(10),
+    }
+)
+def job_builder_create(source: str):
+    transform = create_transform(source)
+    job_in = JobIn(
+        transform_id=transform.id,
+        inputs=[{'id': 'pipeline.x', 'value': 3}],
+        outputs=[{'id': 'pipeline.0', 'schema': {'title': 'The result'}}],
+    )
+    return JobBuilder(job_in, create_user(), transform).create
+
+
+@benchmark(
+    {
+        'json-schema': ({'type': 'number'}, {'title': 'The result', 'minimum': 0}),
+        'content-type': (
+            {'contentMediaType': 'audio/*'},
+            {'contentMediaType': 'audio/x-wav', 'x-contentMediaEncoding': {'rate': 8}},
+        ),
+        'encoding': (WAVE_SCHEMA, {'x-contentMediaEncoding': {'format': 'float32'}}),
+    }
+)
+def json_schema_or(schema1: dict, schema2: dict):
+    schema = JSONSchema(schema1)
+    return lambda: schema | schema2
+
+
+@benchmark(
+    {
+        'json': ({'type': 'number'}, 1.0),
+        'ndarray': ({}, np.zeros(10)),
+        'track': ({'contentMediaType': 'audio/*'}, sonounolib.Track()),
+        'buffer': ({'contentMediaType': 'application/*'}, BytesIO()),
+    }
+)
+def json_schema_update_with_value(schema: dict, value: object):
+    def update_with_value():
+        JSONSchema(schema).update_with_value(value)
+
+    return update_with_value
+
+
+@benchmark(
+    {
+        'json': ({'type': 'array'}, 'json', list(range(1000))),
+        'json-uri': ({'type': 'array'}, 'uri', list(range(1000))),
+        'wav-1s': (WAVE_SCHEMA, 'uri', np.zeros(44100)),
+        'wav-60s': (WAVE_SCHEMA, 'uri', np.zeros(60 * 44100)),
+        'npz-1M': ({'contentMediaType': 'application/*'}, 'uri', np.zeros(10**6)),
+        'pickle': ({}, 'uri', {'values': list(range(1000))}),
+    }
+)
+def transfer_values_in_memory(schema: dict, transfer: str, value: object):
+    """Transfers one output value, to the in-memory stand-in of MinIO."""
+    job = Job(
+        id=PydanticObjectId(),
+        transform_id=PydanticObjectId(),
+        user_id=PydanticObjectId(),
+        outputs=[{'id': 'pipeline.0', 'name': '0', 'schema': {}, 'transfer': transfer}],
+    )
+    values = {'pipeline.0': value}
+
+    def run():
+        job.outputs[0].json_schema = JSONSchema(schema)
+        job.update_json_schemas_with_values(values)
+        asyncio.run(transfer_values(job, values))
+
+    return run
@@ -0,0 +1,81 @@
+"""Benchmarks of the serialization of the job and transform responses.
+
+The `fastapi` benchmarks reproduce the serialization of a route returning a document
+with a response model: the document is validated against the model, converted by
+`jsonable_encoder` and serialized by the standard library. The `document` benchmarks
+serialize the document with orjson, as done by the routes returning a
+`DocumentResponse`, and the `msgpack` benchmarks in the MessagePack format.
+"""
+
+from datetime import datetime
+from typing import Any, Callable
+
+from beanie import PydanticObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.utils import create_response_field
+
+from sonouno_server.models import Job, JobIn, Transform
+from sonouno_server.responses import DocumentResponse, MsgPackDocumentResponse
+from sonouno_server.util.job_builder import JobBuilder
+
+from .data import create_transform, create_user, generate_source
+from .runner import benchmark
+
+
+def create_job(value: Any) -> Job:
+    """Returns a done job, whose output is returned inline."""
+    transform = create_transform(generate_source(20))
+    job_in = JobIn(
+        transform_id=transform.id,
+        inputs=[{'id': 'pipeline.x', 'value': 3}],
+        outputs=[{'id': 'pipeline.0', 'schema': {'type': 'array'}}],
+    )
+    job = JobBuilder(job_in, create_user(), transform).create()
+    job.id = PydanticObjectId()
+    job.status = 'done'
+    job.done_at = datetime.utcnow()
+    job.outputs[0].transfer = 'json'
+    job.outputs[0].value = value
+    return job
+
+
+def create_transforms(count: int) -> list[Transform]:
+    transform = create_transform(generate_source(20))
+    return [transform.copy(update={'id': PydanticObjectId()}) for _ in range(count)]
+
+
+CONTENTS = {
+    'job-1k': (Job, lambda: create_job([0.5] * 10**3)),
+    'job-100k': (Job, lambda: create_job([0.5] * 10**5)),
+    'job-nested-10k': (
+        Job,
+        lambda: create_job([{'x': i, 'y': [0.5, 0.25]} for i in range(10**4)]),
+    ),
+    'transforms-50': (list[Transform], lambda: create_transforms(50)),
+}
+
+
+@benchmark(CONTENTS)
+def fastapi(model: Any, create_content: Callable[[], Any]):
+    content = create_content()
+    field = create_response_field('Response', model)
+
+    def serialize():
+        value, errors = field.validate(content, {}, loc=('response',))
+        assert not errors
+        return JSONResponse(jsonable_encoder(value)).body
+
+    return serialize
+
+
+@benchmark(CONTENTS)
+def document(model: Any, create_content: Callable[[], Any]):
+    content = create_content()
+    return lambda: DocumentResponse(content).body
+
+
+@benchmark(CONTENTS)
+def msgpack(model: Any, create_content: Callable[[], Any]):
+    content = create_content()
+    return lambda: MsgPackDocumentResponse(content).body
@@ -0,0 +1,36 @@
+"""Benchmarks of the transform creation."""
+
+from sonouno_server.util.call_dependencies import CallDependencyResolver
+from sonouno_server.util.transform_builder import TransformBuilder
+
+from .data import create_transform_in, create_user, generate_source
+from .runner import benchmark
+
+SIZES = {'small': 2, 'medium': 20, 'large': 200}
+
+
+@benchmark(SIZES)
+def transform_builder_create(function_count: int):
+    source = generate_source(function_count)
+    builder = TransformBuilder(create_transform_in(source), create_user())
+    return builder.create
+
+
+@benchmark(SIZES)
+def resolver_get_graph(function_count: int):
+    resolver = CallDependencyResolver(generate_source(function_count))
+    function_defs = resolver.get_function_defs()
+    return lambda: resolver.get_graph(function_defs)
+
+
+@benchmark(SIZES)
+def resolver_remove_nodes(function_count: int):
+    resolver = CallDependencyResolver(generate_source(function_count))
+    graph = resolver.get_graph(resolver.get_function_defs())
+    # the non-exposed stages
+    nodes = [n for n in graph.nodes() if n.startswith('stage') and int(n[5:]) % 3 == 2]
+
+    def remove_nodes():
+        resolver.remove_nodes(graph.copy(), nodes)
+
+    return remove_nodes
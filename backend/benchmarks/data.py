@@ -0,0 +1,134 @@
+"""Benchmark data and stand-ins of the MongoDB and MinIO services.
+"""
+
+import asyncio
+
+from beanie import PydanticObjectId, init_beanie
+from mongomock_motor import AsyncMongoMockClient
+
+from sonouno_server.app import app
+from sonouno_server.models import (
+    Blob,
+    CacheInvalidation,
+    Dataset,
+    Deletion,
+    IdempotencyKey,
+    Job,
+    Transform,
+    TransformIn,
+    Upload,
+    User,
+)
+from sonouno_server.util.minio import InMemoryMinio, make_bucket
+from sonouno_server.util.transform_builder import TransformBuilder
+
+HEADER = """
+from typing import Annotated
+
+from streamunolib import exposed
+"""
+
+
+def init_stand_ins() -> None:
+    """Initializes the documents and the object store with in-memory stand-ins.
+
+    The benchmarks do not measure database or network round trips, but the
+    documents must be bound to a collection to be instantiated.
+    """
+    database = AsyncMongoMockClient()['benchmarks']
+    models = [
+        Blob,
+        CacheInvalidation,
+        Dataset,
+        Deletion,
+        IdempotencyKey,
+        Job,
+        Transform,
+        Upload,
+        User,
+    ]
+    asyncio.run(init_beanie(database, document_models=models))  # type: ignore[arg-type]
+    app.state.minio = InMemoryMinio()
+    make_bucket(app.state.minio, 'jobs')
+    make_bucket(app.state.minio, 'uploads')
+    make_bucket(app.state.minio, 'datasets')
+
+
+def create_user() -> User:
+    return User(
+        id=PydanticObjectId(),
+        email='benchmark@test.io',
+        password='benchmark',
+    )
+
+
+def create_transform_in(source: str) -> TransformIn:
+    return TransformIn(
+        name='Benchmark transform',
+        language='python',
+        source=source,
+        entry_point={'name': 'pipeline'},
+    )
+
+
+def create_transform(source: str) -> Transform:
+    """Returns a transform, as stored in the database."""
+    transform = TransformBuilder(create_transform_in(source), create_user()).create()
+    transform.id = PydanticObjectId()
+    return transform
+
+
+def generate_source(function_count: int) -> str:
+    """Returns a transform source with a given number of functions.
+
+    The pipeline calls chains of ten stages. One stage in three is not exposed, so
+    that it is removed from the call dependency graph.
+    """
+    stage_count = function_count - 1
+    functions = []
+    for i in range(stage_count):
+        callee = f'    x = stage{i + 1}(x, scale)\n' if (i + 1) % 10 else ''
+        decorator = '' if i % 3 == 2 else '@exposed\n'
+        functions.append(
+            f'{decorator}def stage{i}(x: float, scale: float = 1.0) -> float:\n'
+            f'    """Stage {i}."""\n'
+            f'{callee}'
+            f'    return scale * x + {i}\n'
+        )
+    calls = ''.join(f'    x = stage{i}(x, 2.0)\n' for i in range(0, stage_count, 10))
+    functions.append(
+        '@exposed\n'
+        "def pipeline(x: Annotated[float, {'title': 'The input'}] = 1.0) -> float:\n"
+        f'{calls}'
+        '    return x\n'
+    )
+    return HEADER + '\n\n'.join(functions)
+
+
+def generate_binary_tree_source(depth: int) -> str:
+    """Returns a transform source whose callee tree is a perfect binary tree.
+
+    Each stage calls the next one twice, so that the callee tree of the entry point
+    has 2**depth - 1 nodes for only `depth` functions.
+    """
+    functions = []
+    for i in range(1, depth):
+        callees = (
+            f'    stage{i + 1}(x - 1)\n    stage{i + 1}(x + 1)\n'
+            if i < depth - 1
+            else ''
+        )
+        functions.append(
+            '@exposed\n'
+            f'def stage{i}(x: int, label: str = "stage{i}") -> int:\n'
+            f'{callees}'
+            '    return x\n'
+        )
+    functions.append(
+        '@exposed\n'
+        'def pipeline(x: int = 0, label: str = "pipeline") -> int:\n'
+        '    stage1(x - 1)\n'
+        '    stage1(x + 1)\n'
+        '    return x\n'
+    )
+    return HEADER + '\n\n'.join(functions)
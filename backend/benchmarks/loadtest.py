@@ -0,0 +1,301 @@
+"""Load test of the API, served in-process.
+
+Usage:
+    python -m benchmarks.loadtest [--concurrency N] [--duration S] [--mix MIX]
+
+The application is booted with its lifespan events and requested through an ASGI
+client, so that the measured latencies include the request validation, the
+serialization and the job execution, but not the network. The database and object
+store are selected by the settings MONGO_BACKEND and STORAGE_BACKEND, which are set
+to their in-memory stand-ins by `scripts/run-loadtest.sh`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from asgi_lifespan import LifespanManager
+from beanie import PydanticObjectId
+from httpx import AsyncClient, Response
+
+from sonouno_server.main import app
+from sonouno_server.models import User
+from sonouno_server.util.password import hash_password
+
+DEMO_SOURCE_PATH = Path(__file__).parents[1] / 'demo' / 'shortwav.py'
+OPERATIONS = ('login', 'list_transforms', 'create_job', 'poll_job')
+DEFAULT_MIX = 'login=1,list_transforms=4,create_job=1,poll_job=4'
+
+
+@dataclass
+class OperationStats:
+    """The latencies and errors of an operation."""
+
+    latencies: list[float] = field(default_factory=list)
+    errors: Counter[str] = field(default_factory=Counter)
+
+    @property
+    def count(self) -> int:
+        return len(self.latencies)
+
+    def summary(self, elapsed: float) -> dict[str, Any]:
+        """Returns the throughput, error rate and latency percentiles, in ms."""
+        summary: dict[str, Any] = {
+            'count': self.count,
+            'throughput': self.count / elapsed,
+            'error_rate': sum(self.errors.values()) / self.count if self.count else 0,
+            'errors': dict(self.errors),
+        }
+        if not self.latencies:
+            return summary
+        latencies = sorted(1000 * _ for _ in self.latencies)
+        for percentile in (50, 90, 99):
+            index = min(len(latencies) - 1, int(percentile / 100 * len(latencies)))
+            summary[f'p{percentile}'] = latencies[index]
+        summary['max'] = latencies[-1]
+        return summary
+
+
+@dataclass
+class Worker:
+    """A client session, sequentially issuing requests."""
+
+    user: User
+    headers: dict[str, str] = field(default_factory=dict)
+    job_ids: list[str] = field(default_factory=list)
+
+
+class LoadTest:
+    """Concurrent workers issuing a mix of requests to the application.
+
+    Arguments:
+        client: The client of the application.
+        concurrency: The number of concurrent workers.
+        user_count: The number of users, among which the workers are distributed.
+        mix: The relative weights of the operations.
+        duration: The duration of the load test, in seconds.
+    """
+
+    def __init__(
+        self,
+        client: AsyncClient,
+        concurrency: int,
+        user_count: int,
+        mix: dict[str, float],
+        duration: float,
+    ):
+        self.client = client
+        self.concurrency = concurrency
+        self.user_count = user_count
+        self.mix = mix
+        self.duration = duration
+        self.stats = {op: OperationStats() for op in OPERATIONS}
+        self.transform_id = ''
+
+    async def setup(self) -> list[User]:
+        """Creates the users and the demo transform."""
+        users = []
+        for i in range(self.user_count):
+            email = f'loadtest-{i}@test.io'
+            user = User(
+                id=PydanticObjectId(),
+                email=email,
+                password=hash_password(email),
+                email_confirmed_at=datetime.now(timezone.utc),
+            )
+            users.append(await user.create())
+
+        worker = Worker(users[0])
+        await self.login(worker)
+        response = await self.client.post(
+            '/transforms',
+            headers=worker.headers,
+            json={
+                'name': 'Load test',
+                'public': True,
+                'language': 'python',
+                'source': DEMO_SOURCE_PATH.read_text(),
+                'entry_point': {'name': 'pipeline'},
+            },
+        )
+        response.raise_for_status()
+        self.transform_id = response.json()['_id']
+        return users
+
+    async def run(self) -> float:
+        """Runs the load test and returns its actual duration."""
+        users = await self.setup()
+        self.stats = {op: OperationStats() for op in OPERATIONS}
+        workers = [Worker(users[i % len(users)]) for i in range(self.concurrency)]
+        start = time.perf_counter()
+        deadline = start + self.duration
+        await asyncio.gather(*(self.run_worker(w, deadline) for w in workers))
+        return time.perf_counter() - start
+
+    async def run_worker(self, worker: Worker, deadline: float) -> None:
+        operations, weights = zip(*self.mix.items())
+        await self.login(worker)
+        while time.perf_counter() < deadline:
+            operation = random.choices(operations, weights)[0]
+            if operation == 'poll_job' and not worker.job_ids:
+                operation = 'create_job'
+            await getattr(self, operation)(worker)
+
+    async def login(self, worker: Worker) -> None:
+        email = worker.user.email
+        data = {'email': email, 'password': email}
+        response = await self.request('login', 'POST', '/iam/login', json=data)
+        if response is not None:
+            worker.headers = {'Authorization': f'Bearer {response["access_token"]}'}
+
+    async def list_transforms(self, worker: Worker) -> None:
+        await self.request('list_transforms', 'GET', '/transforms', worker.headers)
+
+    async def create_job(self, worker: Worker) -> None:
+        data = {
+            'transform_id': self.transform_id,
+            'inputs': [{'id': 'pipeline.repeat', 'value': 1}],
+        }
+        job = await self.request('create_job', 'POST', '/jobs', worker.headers, data)
+        if job is None:
+            return
+        worker.job_ids.append(job['_id'])
+        if job['status'] != 'done':
+            self.stats['create_job'].errors[f'job {job["status"]}'] += 1
+
+    async def poll_job(self, worker: Worker) -> None:
+        job_id = random.choice(worker.job_ids)
+        await self.request('poll_job', 'GET', f'/jobs/{job_id}', worker.headers)
+
+    async def request(
+        self,
+        operation: str,
+        method: str,
+        url: str,
+        headers: dict[str, str] | None = None,
+        json: Any = None,
+    ) -> Any:
+        """Times a request and returns its JSON content, or None if it failed."""
+        stats = self.stats[operation]
+        start = time.perf_counter()
+        try:
+            response: Response = await self.client.request(
+                method, url, headers=headers, json=json
+            )
+        except Exception as exc:
+            stats.latencies.append(time.perf_counter() - start)
+            stats.errors[type(exc).__name__] += 1
+            return None
+        stats.latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            stats.errors[str(response.status_code)] += 1
+            return None
+        return response.json()
+
+    def report(self, elapsed: float) -> dict[str, Any]:
+        """Returns the statistics of the operations and of all the requests."""
+        total = OperationStats()
+        for stats in self.stats.values():
+            total.latencies += stats.latencies
+            total.errors += stats.errors
+        operations = {op: s.summary(elapsed) for op, s in self.stats.items() if s.count}
+        return {
+            'concurrency': self.concurrency,
+            'users': self.user_count,
+            'duration': elapsed,
+            'operations': operations,
+            'total': total.summary(elapsed),
+        }
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    """Parses an operation mix, such as `login=1,create_job=2`."""
+    mix = {}
+    for item in value.split(','):
+        operation, _, weight = item.partition('=')
+        if operation not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f'Invalid operation: {operation!r}.')
+        mix[operation] = float(weight or 1)
+    return mix
+
+
+def print_report(report: dict[str, Any]) -> None:
+    print(
+        f'{report["concurrency"]} workers, {report["users"]} users, '
+        f'{report["duration"]:.1f} s'
+    )
+    print(
+        f'{"operation":<16} {"count":>7} {"req/s":>8} {"errors":>7} '
+        f'{"p50 ms":>9} {"p90 ms":>9} {"p99 ms":>9} {"max ms":>9}'
+    )
+    rows = report['operations'] | {'total': report['total']}
+    for operation, summary in rows.items():
+        latencies = ''.join(
+            f' {summary.get(k, float("nan")):9.1f}'
+            for k in ('p50', 'p90', 'p99', 'max')
+        )
+        print(
+            f'{operation:<16} {summary["count"]:>7} {summary["throughput"]:8.1f} '
+            f'{summary["error_rate"]:7.1%}{latencies}'
+        )
+        for error, count in summary['errors'].items():
+            print(f'    {error}: {count}')
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.loadtest')
+    parser.add_argument(
+        '--concurrency', type=int, default=8, help='Number of concurrent workers.'
+    )
+    parser.add_argument(
+        '--users',
+        type=int,
+        help='Number of users, among which the workers are distributed (default: '
+        'one per worker).',
+    )
+    parser.add_argument(
+        '--duration', type=float, default=30, help='Duration of the test, in seconds.'
+    )
+    parser.add_argument(
+        '--mix',
+        type=parse_mix,
+        default=DEFAULT_MIX,
+        help=f'Relative weights of the operations (default: {DEFAULT_MIX}).',
+    )
+    parser.add_argument('--seed', type=int, help='Seed of the operation choices.')
+    parser.add_argument(
+        '--save', type=Path, help='Path of the JSON file storing the report.'
+    )
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    async with LifespanManager(app):
+        async with AsyncClient(app=app, base_url='http://loadtest') as client:
+            load_test = LoadTest(
+                client,
+                args.concurrency,
+                args.users or args.concurrency,
+                args.mix,
+                args.duration,
+            )
+            report = load_test.report(await load_test.run())
+
+    print_report(report)
+    if args.save is not None:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps(report, indent=2) + '\n')
+    return 1 if report['total']['error_rate'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,300 @@
+"""Memory footprint regression checks of the job execution and output transfer.
+
+Usage:
+    python -m benchmarks.memory [-k PATTERN] [--save PATH]
+
+Each case executes a transform through the LocalExecutor and transfers its output to
+the in-memory stand-in of MinIO. The peak memory allocated by each phase (execution,
+update of the output schemas and transfer) is traced by tracemalloc and expressed as
+a multiple of the size of the transferred output. The checks fail when a ratio exceeds
+the maximum configured for the case.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import resource
+import sys
+import tracemalloc
+from collections.abc import Callable, Iterator, Mapping
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from sonouno_server.app import app
+from sonouno_server.config import CONFIG
+from sonouno_server.executors import LocalExecutor
+from sonouno_server.models import Job, JobIn
+from sonouno_server.util.io import transfer_values
+from sonouno_server.util.job_builder import JobBuilder
+
+from .data import create_transform, create_user, init_stand_ins
+
+SAMPLE_COUNT = 2**22
+
+HEADER = f"""
+from typing import Annotated
+
+import numpy as np
+
+import sonounolib
+from streamunolib import exposed, media_type
+
+SAMPLE_COUNT = {SAMPLE_COUNT}
+
+
+def create_signal():
+    return 0.5 * np.sin(np.linspace(0, 1000 * np.pi, SAMPLE_COUNT))
+"""
+
+
+@dataclass
+class MemoryCase:
+    """A transform whose output is transferred, and the maximum memory ratios.
+
+    Attributes:
+        name: The case name.
+        source: The body of the transform source, following the common header.
+        max_ratios: The maximum peak memory of each phase, as a multiple of the size
+            of the transferred output.
+        transfer: The transfer mode of the output.
+        settings: The config settings overridden during the case.
+    """
+
+    name: str
+    source: str
+    max_ratios: dict[str, float]
+    transfer: str | None = None
+    settings: dict[str, Any] = field(default_factory=dict)
+
+    def create_job(self) -> tuple[Job, LocalExecutor]:
+        transform = create_transform(HEADER + self.source)
+        outputs = []
+        if self.transfer is not None:
+            outputs.append(
+                {'id': 'pipeline.0', 'schema': {}, 'transfer': self.transfer}
+            )
+        job_in = JobIn(transform_id=transform.id, outputs=outputs)
+        job = JobBuilder(job_in, create_user(), transform).create()
+        return job, LocalExecutor(job, transform)
+
+
+@dataclass
+class MemoryReport:
+    """The peak memory of the phases of a case, in bytes."""
+
+    case: MemoryCase
+    output_size: int = 0
+    peaks: dict[str, int] = field(default_factory=dict)
+    max_rss: int = 0
+
+    @property
+    def ratios(self) -> dict[str, float]:
+        return {k: v / self.output_size for k, v in self.peaks.items()}
+
+    @property
+    def failures(self) -> list[str]:
+        return [
+            phase
+            for phase, ratio in self.ratios.items()
+            if ratio > self.case.max_ratios[phase]
+        ]
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'output_size': self.output_size,
+            'peaks': self.peaks,
+            'ratios': self.ratios,
+            'max_ratios': self.case.max_ratios,
+            'max_rss': self.max_rss,
+        }
+
+
+# the maximum ratios are set about 25% above the measured ones
+CASES = [
+    MemoryCase(
+        'ndarray-wav',
+        """
+Out = Annotated[np.ndarray, media_type('audio', rate=44100, format='int16')]
+
+@exposed
+def pipeline() -> Out:
+    return create_signal()
+""",
+        {'exec': 10, 'schema_update': 0.1, 'transfer': 2.5},
+    ),
+    MemoryCase(
+        'track-wav',
+        """
+@exposed
+def pipeline() -> sonounolib.Track:
+    signal = create_signal()
+    track = sonounolib.Track(max_amplitude='int16')
+    track.add_raw_data(signal)
+    return track
+""",
+        {'exec': 10, 'schema_update': 0.1, 'transfer': 6},
+    ),
+    MemoryCase(
+        'ndarray-npz',
+        """
+@exposed
+def pipeline():
+    return create_signal()
+""",
+        {'exec': 2.5, 'schema_update': 0.1, 'transfer': 2.75},
+        transfer='uri',
+    ),
+    MemoryCase(
+        'pickle',
+        """
+@exposed
+def pipeline():
+    signal = create_signal()
+    return {'values': signal.tolist()}
+""",
+        {'exec': 5.5, 'schema_update': 0.1, 'transfer': 2.5},
+        transfer='uri',
+    ),
+    MemoryCase(
+        'json-inline',
+        """
+@exposed
+def pipeline() -> list[float]:
+    signal = create_signal()
+    return signal[::16].tolist()
+""",
+        {'exec': 15, 'schema_update': 0.1, 'transfer': 0.5},
+        # the output is returned as is by the auto transfer mode
+        settings={'transfer_json_max_size': 2**23},
+    ),
+    MemoryCase(
+        'json-auto',
+        """
+@exposed
+def pipeline() -> list[float]:
+    signal = create_signal()
+    return signal[::16].tolist()
+""",
+        {'exec': 15, 'schema_update': 0.1, 'transfer': 1.3},
+    ),
+    MemoryCase(
+        'json-uri',
+        """
+@exposed
+def pipeline() -> list[float]:
+    signal = create_signal()
+    return signal[::16].tolist()
+""",
+        {'exec': 15, 'schema_update': 0.1, 'transfer': 2.5},
+        transfer='uri',
+    ),
+]
+
+
+def run_case(case: MemoryCase) -> MemoryReport:
+    """Traces the peak memory of the phases of a case."""
+    report = MemoryReport(case)
+    job, executor = case.create_job()
+    with override_settings(case.settings):
+        tracemalloc.start()
+        try:
+            with trace_phase(report, 'exec'):
+                values = executor.run()
+            with trace_phase(report, 'schema_update'):
+                job.update_json_schemas_with_values(values)
+            with trace_phase(report, 'transfer'):
+                asyncio.run(transfer_values(job, values))
+        finally:
+            tracemalloc.stop()
+    report.output_size = get_output_size(job, values)
+    report.max_rss = 1024 * resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return report
+
+
+@contextmanager
+def override_settings(settings: dict[str, Any]) -> Iterator[None]:
+    """Overrides config settings, which are restored on exit."""
+    previous = {name: getattr(CONFIG, name) for name in settings}
+    for name, value in settings.items():
+        setattr(CONFIG, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(CONFIG, name, value)
+
+
+@contextmanager
+def trace_phase(report: MemoryReport, phase: str) -> Iterator[None]:
+    """Stores the peak memory allocated in a phase, above the memory in use."""
+    tracemalloc.reset_peak()
+    current, _ = tracemalloc.get_traced_memory()
+    yield
+    _, peak = tracemalloc.get_traced_memory()
+    report.peaks[phase] = peak - current
+
+
+def get_output_size(job: Job, values: Mapping[str, Any]) -> int:
+    """Returns the size of the transferred output, as stored or serialized in JSON."""
+    output = job.outputs[0]
+    if output.transfer == 'json':
+        return len(json.dumps(output.value))
+    object_name = output.value.split('/jobs/', 1)[1]
+    return app.state.minio.stat_object('jobs', object_name).size
+
+
+def run(pattern: str, callback: Callable[[MemoryReport], None]) -> list[MemoryReport]:
+    """Runs the cases whose name contains a pattern."""
+    init_stand_ins()
+    reports = []
+    for case in CASES:
+        if pattern not in case.name:
+            continue
+        # the first run imports the modules used by the transform
+        run_case(case)
+        report = run_case(case)
+        callback(report)
+        reports.append(report)
+    return reports
+
+
+def print_report(report: MemoryReport) -> None:
+    ratios = '  '.join(
+        f'{phase} {ratio:5.2f}/{report.case.max_ratios[phase]:<5g}'
+        for phase, ratio in report.ratios.items()
+    )
+    status = 'FAILED' if report.failures else 'ok'
+    size = report.output_size / 2**20
+    print(f'{report.case.name:<12} {size:8.2f} MiB  {ratios}  {status}')
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.memory')
+    parser.add_argument(
+        '-k', default='', help='Only runs the cases containing this substring.'
+    )
+    parser.add_argument(
+        '--save', type=Path, help='Path of the JSON file storing the report.'
+    )
+    args = parser.parse_args()
+
+    print(f'{"case":<12} {"output":>12}  peak memory / output size (maximum)')
+    reports = run(args.k, print_report)
+    if args.save is not None:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        content = {r.case.name: r.to_dict() for r in reports}
+        args.save.write_text(json.dumps(content, indent=2) + '\n')
+
+    failures = [f'{r.case.name}:{phase}' for r in reports for phase in r.failures]
+    if failures:
+        print(f'Memory ratios exceeded: {", ".join(failures)}.')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
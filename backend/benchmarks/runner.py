@@ -0,0 +1,169 @@
+"""Benchmark registry, timing and comparison of the results.
+"""
+
+from __future__ import annotations
+
+import importlib
+import pkgutil
+import platform
+import statistics
+import subprocess
+import timeit
+from collections.abc import Callable, Iterator, Mapping
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any
+
+__all__ = ['Benchmark', 'benchmark', 'compare', 'run']
+
+Setup = Callable[..., Callable[[], Any]]
+BENCHMARKS: dict[str, Benchmark] = {}
+
+
+@dataclass
+class Benchmark:
+    """A benchmark case.
+
+    Attributes:
+        name: The benchmark name, as `module.function[parameter id]`.
+        setup: The function returning the timed callable. It is called before the
+            timing, so that the preparation of the inputs is not measured.
+        arguments: The arguments of the setup function.
+    """
+
+    name: str
+    setup: Setup
+    arguments: tuple[Any, ...] = ()
+
+    def run(self, rounds: int, min_time: float) -> dict[str, Any]:
+        """Times the benchmark callable.
+
+        The number of calls per round is chosen so that a round lasts at least
+        `min_time` seconds.
+
+        Arguments:
+            rounds: The number of timing rounds.
+            min_time: The minimum duration of a round, in seconds.
+
+        Returns:
+            The statistics of the duration of one call, in seconds.
+        """
+        timer = timeit.Timer(self.setup(*self.arguments))
+        loops = 1
+        while (duration := timer.timeit(loops)) < min_time:
+            loops *= 2
+        times = [duration / loops] + [
+            timer.timeit(loops) / loops for _ in range(rounds - 1)
+        ]
+        return {
+            'min': min(times),
+            'median': statistics.median(times),
+            'mean': statistics.fmean(times),
+            'stdev': statistics.stdev(times) if len(times) > 1 else 0.0,
+            'rounds': rounds,
+            'loops': loops,
+        }
+
+
+def benchmark(params: Mapping[str, Any] | None = None) -> Callable[[Setup], Setup]:
+    """Decorator registering a benchmark setup function.
+
+    Arguments:
+        params: Mapping from the parameter identifiers to the setup function
+            arguments. A tuple argument is unpacked. When not specified, the setup
+            function is called without arguments.
+    """
+
+    def decorator(setup: Setup) -> Setup:
+        module = setup.__module__.rpartition('.')[2].removeprefix('bench_')
+        name = f'{module}.{setup.__name__}'
+        if params is None:
+            BENCHMARKS[name] = Benchmark(name, setup)
+            return setup
+        for id, arguments in params.items():
+            if not isinstance(arguments, tuple):
+                arguments = (arguments,)
+            BENCHMARKS[f'{name}[{id}]'] = Benchmark(f'{name}[{id}]', setup, arguments)
+        return setup
+
+    return decorator
+
+
+def collect() -> dict[str, Benchmark]:
+    """Imports the `bench_*` modules of the package and returns their benchmarks."""
+    package = importlib.import_module(__package__)
+    for module in pkgutil.iter_modules(package.__path__):
+        if module.name.startswith('bench_'):
+            importlib.import_module(f'{__package__}.{module.name}')
+    return BENCHMARKS
+
+
+def run(
+    pattern: str = '', rounds: int = 7, min_time: float = 0.1
+) -> Iterator[tuple[str, dict[str, Any]]]:
+    """Runs the benchmarks whose name contains a pattern.
+
+    Arguments:
+        pattern: The substring to be matched by the benchmark names.
+        rounds: The number of timing rounds of each benchmark.
+        min_time: The minimum duration of a round, in seconds.
+
+    Yields:
+        The benchmark names and their statistics.
+    """
+    for name, bench in collect().items():
+        if pattern in name:
+            yield name, bench.run(rounds, min_time)
+
+
+def get_environment() -> dict[str, str]:
+    """Returns the description of the environment in which the benchmarks are run."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = ''
+    return {
+        'datetime': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'system': platform.platform(),
+    }
+
+
+def compare(
+    baseline: Mapping[str, Mapping[str, Any]],
+    results: Mapping[str, Mapping[str, Any]],
+    threshold: float,
+) -> list[tuple[str, float | None, float | None, bool]]:
+    """Compares the benchmark results with a baseline.
+
+    The benchmarks are compared through the median duration of a call.
+
+    Arguments:
+        baseline: The baseline statistics, by benchmark name.
+        results: The current statistics, by benchmark name.
+        threshold: The maximum relative slowdown, above which a benchmark regresses.
+
+    Returns:
+        For each benchmark, its name, baseline and current median durations and
+        whether it regresses. The median durations are None for the benchmarks
+        missing in the baseline or in the current results.
+    """
+    comparisons = []
+    for name in sorted(baseline.keys() | results.keys()):
+        reference = baseline.get(name, {}).get('median')
+        current = results.get(name, {}).get('median')
+        regression = (
+            reference is not None
+            and current is not None
+            and current > reference * (1 + threshold)
+        )
+        comparisons.append((name, reference, current, regression))
+    return comparisons
@@ -0,0 +1,8 @@
+#! /usr/bin/env bash
+set -ex
+
+# the in-memory stand-ins of MongoDB and MinIO are used, unless specified otherwise
+export MONGO_BACKEND=${MONGO_BACKEND:-memory}
+export STORAGE_BACKEND=${STORAGE_BACKEND:-memory}
+
+TESTING=true poetry run python -m benchmarks.loadtest "${@}"
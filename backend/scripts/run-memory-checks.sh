@@ -0,0 +1,4 @@
+#! /usr/bin/env bash
+set -ex
+
+TESTING=true poetry run python -m benchmarks.memory "${@}"
@@ -4,19 +4,35 @@ Server app config
 
 # pylint: disable=import-error
 
+import asyncio
+import logging
+
 from beanie import init_beanie
 from fastapi import FastAPI, status
 from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
 from fastapi.openapi.utils import get_openapi
 from fastapi.responses import JSONResponse
-from minio import Minio
-from motor.motor_asyncio import AsyncIOMotorClient
 
 from . import __version__
+from .compression import CompressionMiddleware
 from .config import CONFIG
-from .models import Job, Transform, User
-from .util.minio import make_public_bucket
+from .metrics import MetricsMiddleware
+from .models import (
+    Blob,
+    CacheInvalidation,
+    Dataset,
+    Deletion,
+    IdempotencyKey,
+    Job,
+    Transform,
+    Upload,
+    User,
+)
+from .scheduler import JobScheduler
+from .util.cache import poll_invalidations
+from .util.minio import create_minio_client, make_bucket
+from .util.mongo import create_motor_client
 
 description = """
 The sonoUno server is a sonification-as-a-service platform. The main resources are:
@@ -45,9 +61,27 @@ tags_metadata = [
         'name': 'Transforms',
         'description': 'Operations on sonification transforms.',
     },
+    {
+        'name': 'Uploads',
+        'description': 'Uploads of the large job inputs.',
+    },
+    {
+        'name': 'Datasets',
+        'description': 'Immutable datasets, addressed by the digest of their content.',
+    },
+    {
+        'name': 'Deletions',
+        'description': 'Status of the cascade deletions of transforms and users.',
+    },
 ]
 
+logger = logging.getLogger(__name__)
+
 app = FastAPI()
+if CONFIG.compression_enabled:
+    app.add_middleware(CompressionMiddleware)
+if CONFIG.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
 
 
 @app.exception_handler(RequestValidationError)
@@ -87,19 +121,47 @@ app.openapi = custom_openapi  # type: ignore[assignment]
 @app.on_event('startup')
 async def app_init() -> None:
     """Initialize application services"""
-    motor_client = AsyncIOMotorClient(CONFIG.mongo_uri)
+    motor_client = create_motor_client()
     app.state.db = getattr(motor_client, CONFIG.mongo_database)
-    models = [Job, Transform, User]
+    models = [
+        Blob,
+        CacheInvalidation,
+        Dataset,
+        Deletion,
+        IdempotencyKey,
+        Job,
+        Transform,
+        Upload,
+        User,
+    ]
     await init_beanie(app.state.db, document_models=models)  # type: ignore[arg-type]
-    print('Init minio:')
-    print(CONFIG.minio_endpoint + ':9000')
-    minio_client = Minio(
-        CONFIG.minio_endpoint + ':9000',
-        CONFIG.minio_access_key,
-        CONFIG.minio_secret_key,
-        secure=False,
-    )
-    make_public_bucket(minio_client, 'jobs')
+    logger.info(f'Init MinIO: {CONFIG.minio_endpoint}:9000')
+    minio_client = create_minio_client()
+    make_bucket(minio_client, 'jobs')
+    make_bucket(minio_client, 'uploads')
+    make_bucket(minio_client, 'datasets')
 
-    print('Local Minio buckets:', minio_client.list_buckets())
     app.state.minio = minio_client
+
+    app.state.scheduler = JobScheduler(
+        CONFIG.scheduler_max_concurrency, CONFIG.scheduler_user_concurrency
+    )
+    app.state.cache_invalidation_task = asyncio.create_task(
+        poll_invalidations(CONFIG.cache_invalidation_interval)
+    )
+    # the reaper and the deletions depend on the application state
+    from .util.deletions import resume_deletions
+    from .util.reaper import run_reaper
+
+    app.state.reaper_task = None
+    if CONFIG.reaper_interval:
+        app.state.reaper_task = asyncio.create_task(run_reaper(CONFIG.reaper_interval))
+    await resume_deletions()
+
+
+@app.on_event('shutdown')
+async def app_shutdown() -> None:
+    """Stops the application services"""
+    app.state.cache_invalidation_task.cancel()
+    if app.state.reaper_task is not None:
+        app.state.reaper_task.cancel()
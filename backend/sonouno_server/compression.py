@@ -0,0 +1,219 @@
+"""Compression of the responses, negotiated through the `Accept-Encoding` header.
+
+The responses are compressed with brotli or gzip, unless they are smaller than
+`COMPRESSION_MINIMUM_SIZE`, already encoded or of a media type that is already
+compressed, such as the images, sounds and videos. The compression levels can be
+overridden per route with the `compression` decorator. The compression of the bodies
+larger than `COMPRESSION_THREAD_MIN_SIZE` is run in a worker thread, so that it does
+not block the event loop.
+"""
+
+from __future__ import annotations
+
+import zlib
+from collections.abc import Callable
+from typing import Any, Protocol, TypeVar
+
+import brotli
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import CONFIG
+
+__all__ = ['CompressionMiddleware', 'compression']
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+# the supported encodings, by order of preference
+ENCODINGS = ('br', 'gzip')
+EXCLUDED_MEDIA_TYPES = tuple(
+    _.strip() for _ in CONFIG.compression_excluded_media_types.split(',') if _.strip()
+)
+
+
+class Compressor(Protocol):
+    def compress(self, data: bytes) -> bytes:
+        ...
+
+    def flush(self) -> bytes:
+        ...
+
+
+class BrotliCompressor:
+    """Adapts the brotli compressor to the interface of the zlib ones."""
+
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.finish()
+
+
+def compression(gzip: int | None = None, br: int | None = None) -> Callable[[F], F]:
+    """Decorator overriding the compression levels of the responses of a route.
+
+    It must be applied below the route decorator.
+
+    Arguments:
+        gzip: The gzip compression level, from 0 (no compression) to 9.
+        br: The brotli quality, from 0 to 11.
+    """
+
+    def decorator(endpoint: F) -> F:
+        levels = {'gzip': gzip, 'br': br}
+        endpoint.compression_levels = {  # type: ignore[attr-defined]
+            k: v for k, v in levels.items() if v is not None
+        }
+        return endpoint
+
+    return decorator
+
+
+def create_compressor(encoding: str, level: int) -> Compressor:
+    """Returns a streaming compressor."""
+    if encoding == 'br':
+        return BrotliCompressor(level)
+    # the window bits select the gzip container
+    return zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+
+def select_encoding(accept_encoding: str) -> str | None:
+    """Returns the preferred supported encoding of an `Accept-Encoding` header."""
+    qualities: dict[str, float] = {}
+    for item in accept_encoding.split(','):
+        coding, *parameters = (_.strip() for _ in item.split(';'))
+        quality = 1.0
+        for parameter in parameters:
+            name, _, value = parameter.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    pass
+        qualities[coding.lower()] = quality
+    default = qualities.get('*', 0.0)
+    best_encoding, best_quality = None, 0.0
+    for encoding in ENCODINGS:
+        quality = qualities.get(encoding, default)
+        if quality > best_quality:
+            best_encoding, best_quality = encoding, quality
+    return best_encoding
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing the responses."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        encoding = select_encoding(Headers(scope=scope).get('accept-encoding', ''))
+        await CompressionResponder(self.app, encoding)(scope, receive, send)
+
+
+class CompressionResponder:
+    """Compresses the body of a response, which may be streamed.
+
+    The response start message is held until the first body chunk is received, to
+    decide whether the response is compressed.
+    """
+
+    def __init__(self, app: ASGIApp, encoding: str | None) -> None:
+        self.app = app
+        self.encoding = encoding
+        self.scope: Scope = {}
+        self.send: Send
+        self.start_message: Message = {}
+        self.compressor: Compressor | None = None
+        self.started = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.scope = scope
+        self.send = send
+        await self.app(scope, receive, self.send_with_compression)
+
+    async def send_with_compression(self, message: Message) -> None:
+        if message['type'] == 'http.response.start':
+            self.start_message = message
+            return
+        if message['type'] != 'http.response.body':
+            await self.send(message)
+            return
+
+        body = message.get('body', b'')
+        more_body = message.get('more_body', False)
+        if self.started:
+            if self.compressor is not None:
+                body = await self.compress(body, more_body)
+                message = {
+                    'type': message['type'],
+                    'body': body,
+                    'more_body': more_body,
+                }
+            await self.send(message)
+            return
+
+        self.started = True
+        headers = MutableHeaders(raw=self.start_message['headers'])
+        if self.is_compressible(headers, body, more_body):
+            headers.add_vary_header('Accept-Encoding')
+            if self.encoding is not None:
+                level = self.get_level(self.encoding)
+                self.compressor = create_compressor(self.encoding, level)
+                body = await self.compress(body, more_body)
+                message = {
+                    'type': message['type'],
+                    'body': body,
+                    'more_body': more_body,
+                }
+                headers['Content-Encoding'] = self.encoding
+                etag = headers.get('etag')
+                if etag is not None and not etag.startswith('W/'):
+                    # the strong entity tags are specific to the content encoding
+                    headers['ETag'] = f'{etag[:-1]}-{self.encoding}"'
+                if more_body:
+                    del headers['Content-Length']
+                else:
+                    headers['Content-Length'] = str(len(body))
+        await self.send(self.start_message)
+        await self.send(message)
+
+    async def compress(self, body: bytes, more_body: bool) -> bytes:
+        """Compresses a body chunk, in a worker thread for the large ones."""
+        if len(body) >= CONFIG.compression_thread_min_size:
+            return await run_in_threadpool(self._compress, body, more_body)
+        return self._compress(body, more_body)
+
+    def _compress(self, body: bytes, more_body: bool) -> bytes:
+        assert self.compressor is not None
+        compressed = self.compressor.compress(body)
+        if not more_body:
+            compressed += self.compressor.flush()
+        return compressed
+
+    def is_compressible(
+        self, headers: MutableHeaders, body: bytes, more_body: bool
+    ) -> bool:
+        """Returns true if the response should be compressed."""
+        if self.scope['method'] == 'HEAD' or 'content-encoding' in headers:
+            return False
+        if not more_body and len(body) < CONFIG.compression_minimum_size:
+            return False
+        media_type = headers.get('content-type', '')
+        return not media_type.startswith(EXCLUDED_MEDIA_TYPES)
+
+    def get_level(self, encoding: str) -> int:
+        """Returns the compression level of the route, or the default one."""
+        levels = getattr(self.scope.get('endpoint'), 'compression_levels', {})
+        if encoding in levels:
+            return levels[encoding]
+        if encoding == 'br':
+            return CONFIG.compression_brotli_quality
+        return CONFIG.compression_gzip_level
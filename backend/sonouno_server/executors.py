@@ -1,14 +1,31 @@
 from __future__ import annotations
 
+import cProfile
+import multiprocessing
+import os
+import resource
+import signal
 import typing
 from collections.abc import Mapping
+from contextlib import ExitStack
+from multiprocessing.connection import Connection
 from typing import Any
 
 from fastapi import HTTPException
 
+from .tracing import attach_traceparent, get_traceparent, span
+
 if typing.TYPE_CHECKING:
+    from minio import Minio
+
     from .models import Job, Transform
 
+__all__ = ['ExecutionError', 'LocalExecutor', 'ProcessExecutor']
+
+
+class ExecutionError(Exception):
+    """Raised when the execution of a job fails or exceeds its resource limits."""
+
 
 class LocalExecutor:
     """Runs the transform in the job creation request.
@@ -19,22 +36,74 @@ class LocalExecutor:
     def __init__(self, job: Job, transform: Transform):
         self.job = job
         self.transform = transform
+        self.stats: dict[Any, Any] | None = None
 
     def run(self) -> Mapping[str, Any]:
-        """Executes the transform code."""
+        """Executes the transform code.
+
+        When the profiling of the job is requested, the raw profile statistics of the
+        execution are stored in the attribute `stats`.
+        """
+        with ExitStack() as stack:
+            inputs = self.prepare_inputs(self.get_storage_client(), stack)
+            results = self.execute(inputs)
+        return results
+
+    def get_storage_client(self) -> Minio:
+        """Returns the MinIO client from which the uploads and datasets are fetched."""
+        # the application depends on the executors, through the job model
+        from .app import app
+
+        return app.state.minio
+
+    def execute(self, inputs: Mapping[str, Any]) -> Mapping[str, Any]:
+        """Executes the transform entry point with the prepared inputs."""
         # Very naively injects the inputs and extracts the outputs of the job.
-        locals_ = {'zzz_inputs': self.prepare_inputs()}
+        locals_ = {'zzz_inputs': inputs}
         source = (
             self.transform.source
             + f'\nzzz_results = {self.transform.entry_point.name}(**zzz_inputs)\n'
         )
-        exec(source, locals_, locals_)
+        profile = cProfile.Profile() if self.job.profile else None
+        if profile is not None:
+            profile.enable()
+        try:
+            exec(source, locals_, locals_)
+        finally:
+            if profile is not None:
+                profile.disable()
+                profile.create_stats()
+                self.stats = profile.stats  # type: ignore[attr-defined]
         return self.prepare_outputs(locals_['zzz_results'])
 
-    def prepare_inputs(self) -> Mapping[str, Any]:
-        """Packs the entry point inputs."""
+    def prepare_inputs(self, client: Minio, stack: ExitStack) -> Mapping[str, Any]:
+        """Packs the entry point inputs.
+
+        The inputs referencing an upload or a dataset are downloaded only here, in the
+        worker process. The uploads are released by the exit stack after the
+        execution, while the datasets are kept in the on-disk cache of the host.
+
+        Arguments:
+            client: The MinIO client of the current process.
+            stack: The exit stack releasing the uploads after the execution.
+        """
+        # the uploads and the datasets depend on the application state
+        from .util.datasets import materialize_dataset
+        from .util.uploads import materialize_upload
+
         # XXX only the entry point inputs can be modified
-        return {i.name: i.value for i in self.job.inputs}
+        inputs = {}
+        for input_ in self.job.inputs:
+            if input_.upload_id is not None:
+                content_type = input_.json_schema.get('contentMediaType')
+                inputs[input_.name] = materialize_upload(
+                    client, input_.upload_id, content_type, stack
+                )
+            elif input_.dataset_digest is not None:
+                inputs[input_.name] = materialize_dataset(client, input_.dataset_digest)
+            else:
+                inputs[input_.name] = input_.value
+        return inputs
 
     def prepare_outputs(self, results: Any) -> Mapping[str, Any]:
         """Unpacks the value returned by the transform entry point.
@@ -55,3 +124,119 @@ class LocalExecutor:
                 422, 'The entry point does not return the expected number of outputs.'
             )
         return dict(zip((o.id for o in self.transform.entry_point.outputs), results))
+
+
+class ProcessExecutor(LocalExecutor):
+    """Runs the transform in a forked worker process, within the job resource limits.
+
+    The wall-clock time limit is enforced by the server, which kills the worker when
+    it is exceeded. The CPU time and memory limits are enforced by the kernel, through
+    the worker resource limits. The memory limit caps the address space that the
+    worker can allocate in addition to the one inherited from the server process and
+    to the memory maps of the job inputs.
+    """
+
+    def run(self) -> Mapping[str, Any]:
+        """Executes the transform code in a worker process.
+
+        Raises:
+            ExecutionError: When the execution fails or exceeds the resource limits.
+        """
+        wall_time = self.job.limits.wall_time
+        context = multiprocessing.get_context('fork')
+        reader, writer = context.Pipe(duplex=False)
+        process = context.Process(
+            target=self.run_worker, args=(writer, get_traceparent()), daemon=True
+        )
+        process.start()
+        writer.close()
+        try:
+            if not reader.poll(wall_time):
+                raise ExecutionError(
+                    f'The job exceeded its wall-clock time limit of {wall_time} s.'
+                )
+            status, result, self.stats = reader.recv()
+        except EOFError:
+            process.join()
+            raise ExecutionError(self.get_exit_reason(process.exitcode))
+        finally:
+            if process.is_alive():
+                process.kill()
+            process.join()
+            reader.close()
+
+        if status == 'error':
+            raise ExecutionError(result)
+        return result
+
+    def run_worker(self, connection: Connection, traceparent: str | None) -> None:
+        """Entry point of the worker process.
+
+        Arguments:
+            connection: The pipe end through which the outputs are sent back.
+            traceparent: The trace context of the job creation request.
+        """
+        attach_traceparent(traceparent)
+        result: tuple[str, Any]
+        try:
+            with ExitStack() as stack:
+                # the memory maps of the inputs do not count towards the memory limit
+                inputs = self.prepare_inputs(self.get_storage_client(), stack)
+                self.set_resource_limits()
+                with span('worker.run', pid=os.getpid()):
+                    result = 'ok', self.execute(inputs)
+        except MemoryError:
+            memory = self.job.limits.memory
+            result = 'error', f'The job exceeded its memory limit of {memory} MiB.'
+        except HTTPException as exc:
+            result = 'error', exc.detail
+        except Exception as exc:
+            result = 'error', f'{type(exc).__name__}: {exc}'
+
+        try:
+            connection.send(result + (self.stats,))
+        except Exception as exc:
+            message = f'The job outputs cannot be transferred: {exc}'
+            connection.send(('error', message, None))
+        finally:
+            connection.close()
+
+    def get_storage_client(self) -> Minio:
+        """Returns a MinIO client of the worker process, which does not share the
+        connections of the server process."""
+        from .util.minio import create_forked_minio_client
+
+        return create_forked_minio_client(super().get_storage_client())
+
+    def set_resource_limits(self) -> None:
+        """Sets the CPU time and memory limits of the current process."""
+        limits = self.job.limits
+        if limits.cpu_time is not None:
+            # SIGXCPU is sent at the soft limit, SIGKILL at the hard limit
+            resource.setrlimit(
+                resource.RLIMIT_CPU, (limits.cpu_time, limits.cpu_time + 1)
+            )
+        if limits.memory is not None:
+            address_space = _get_address_space() + limits.memory * 2**20
+            resource.setrlimit(resource.RLIMIT_AS, (address_space, address_space))
+
+    def get_exit_reason(self, exitcode: int | None) -> str:
+        """Explains why the worker process exited without returning the outputs."""
+        if exitcode is not None and exitcode < 0:
+            if -exitcode == signal.SIGXCPU:
+                return (
+                    f'The job exceeded its CPU time limit of '
+                    f'{self.job.limits.cpu_time} s.'
+                )
+            return f'The job worker was killed by {signal.Signals(-exitcode).name}.'
+        return f'The job worker exited unexpectedly with code {exitcode}.'
+
+
+def _get_address_space() -> int:
+    """Returns the virtual memory size of the current process, in bytes."""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[0])
+    except OSError:
+        return 0
+    return pages * resource.getpagesize()
@@ -5,14 +5,20 @@
 
 from . import jwt  # nopycln: import  # noqa: F401
 from .app import app
+from .routes.datasets import router as dataset_router
+from .routes.deletions import router as deletion_router
 from .routes.iam import router as aim_router
 from .routes.jobs import router as job_router
 from .routes.system import router as system_router
 from .routes.transforms import router as transform_router
+from .routes.uploads import router as upload_router
 from .routes.users import router as user_router
 
 app.include_router(aim_router)
+app.include_router(dataset_router)
+app.include_router(deletion_router)
 app.include_router(job_router)
 app.include_router(system_router)
 app.include_router(transform_router)
+app.include_router(upload_router)
 app.include_router(user_router)
@@ -0,0 +1,319 @@
+"""Prometheus-style metrics of the server.
+
+The metrics are kept in memory by each server process and are rendered in the
+Prometheus text exposition format. When the metrics are disabled (setting
+`METRICS_ENABLED`), the instrumentation functions return immediately.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from bisect import bisect_left
+from collections.abc import Iterator, Sequence
+from contextlib import nullcontext
+from threading import Lock
+from types import TracebackType
+from typing import Any, ContextManager
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import CONFIG
+
+__all__ = [
+    'Counter',
+    'Gauge',
+    'Histogram',
+    'MetricsMiddleware',
+    'REGISTRY',
+]
+
+ENABLED = CONFIG.metrics_enabled
+
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    math.inf,
+)
+BYTES_BUCKETS = tuple(float(4**i) for i in range(4, 15)) + (math.inf,)
+
+LabelValues = tuple[str, ...]
+
+
+class MetricsRegistry:
+    """Collection of the metrics rendered by the metrics endpoint."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> None:
+        """Adds a metric to the registry."""
+        if metric.name in self._metrics:
+            raise ValueError(f'Duplicate metric: {metric.name!r}.')
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """Returns the metrics in the Prometheus text exposition format."""
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+
+class Metric:
+    """Base class of the metrics."""
+
+    type = ''
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: MetricsRegistry = REGISTRY,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[LabelValues, Any] = {}
+        self._lock = Lock()
+        registry.register(self)
+
+    def render(self) -> Iterator[str]:
+        """Yields the samples of the metric."""
+        for key, value in sorted(self._values.items()):
+            yield f'{self.name}{self._format_labels(key)} {_format_value(value)}'
+
+    def _get_key(self, labels: dict[str, Any]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _format_labels(self, key: LabelValues, **extra: str) -> str:
+        pairs = list(zip(self.labelnames, key)) + list(extra.items())
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{n}="{_escape(v)}"' for n, v in pairs) + '}'
+
+
+class Counter(Metric):
+    """Monotonically increasing value."""
+
+    type = 'counter'
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        """Increments the counter."""
+        if not ENABLED:
+            return
+        key = self._get_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    """Value that can go up and down."""
+
+    type = 'gauge'
+
+    def set(self, value: float, **labels: Any) -> None:
+        """Sets the gauge value."""
+        if not ENABLED:
+            return
+        self._values[self._get_key(labels)] = value
+
+
+class Histogram(Metric):
+    """Distribution of observations, counted in cumulative buckets."""
+
+    type = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        registry: MetricsRegistry = REGISTRY,
+    ) -> None:
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels: Any) -> None:
+        """Adds an observation to the histogram."""
+        if not ENABLED:
+            return
+        key = self._get_key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0]
+            state[0][bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    def time(self, **labels: Any) -> ContextManager[Any]:
+        """Returns a context manager observing the duration of its block."""
+        if not ENABLED:
+            return nullcontext()
+        return _Timer(self, labels)
+
+    def render(self) -> Iterator[str]:
+        for key, (counts, total) in sorted(self._values.items()):
+            cumulative_count = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative_count += count
+                labels = self._format_labels(key, le=_format_value(bound))
+                yield f'{self.name}_bucket{labels} {cumulative_count}'
+            labels = self._format_labels(key)
+            yield f'{self.name}_sum{labels} {_format_value(total)}'
+            yield f'{self.name}_count{labels} {cumulative_count}'
+
+
+class _Timer:
+    """Context manager observing the duration of its block into a histogram."""
+
+    def __init__(self, histogram: Histogram, labels: dict[str, Any]) -> None:
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> _Timer:
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+class MetricsMiddleware:
+    """ASGI middleware observing the latency of the requests per route."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self._paths: dict[Any, str] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=scope['method'],
+                route=self._get_route_path(scope),
+                status=status_code,
+            )
+
+    def _get_route_path(self, scope: Scope) -> str:
+        """Returns the path template of the route that handled the request."""
+        endpoint = scope.get('endpoint')
+        if endpoint is None:
+            return '<unmatched>'
+        path = self._paths.get(endpoint)
+        if path is None:
+            routes = scope['app'].routes
+            self._paths = {r.endpoint: r.path for r in routes if hasattr(r, 'endpoint')}
+            return self._paths.get(endpoint, '<unmatched>')
+        return path
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value))
+
+
+REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds',
+    'Latency of the HTTP requests.',
+    ['method', 'route', 'status'],
+)
+JOB_PHASE_SECONDS = Histogram(
+    'job_phase_duration_seconds', 'Duration of the job creation phases.', ['phase']
+)
+ENCODE_SECONDS = Histogram(
+    'job_output_encode_duration_seconds',
+    'Duration of the job output encoding.',
+    ['content_type'],
+)
+UPLOAD_BYTES = Histogram(
+    'job_output_upload_bytes',
+    'Size of the job outputs uploaded to the object store.',
+    ['content_type'],
+    buckets=BYTES_BUCKETS,
+)
+DEDUPLICATED_BYTES = Histogram(
+    'job_output_deduplicated_bytes',
+    'Size of the job outputs not uploaded, since already in the object store.',
+    ['content_type'],
+    buckets=BYTES_BUCKETS,
+)
+REAPER_DELETED = Counter(
+    'reaper_deleted_total',
+    'Number of expired jobs, objects, unreferenced blobs and expired pending or '
+    'oversized uploads deleted by the reaper.',
+    ['kind'],
+)
+REAPER_EXPIRED_JOBS = Gauge(
+    'reaper_expired_jobs', 'Number of expired jobs remaining to be deleted.'
+)
+REAPER_PASS_SECONDS = Histogram(
+    'reaper_pass_duration_seconds', 'Duration of the reaper passes.'
+)
+SCHEDULER_QUEUE_DEPTH = Gauge(
+    'scheduler_queue_depth', 'Number of job executions waiting for a slot.'
+)
+SCHEDULER_USER_QUEUE_DEPTH = Gauge(
+    'scheduler_user_queue_depth',
+    'Number of job executions waiting for a slot, per user.',
+    ['user'],
+)
+SCHEDULER_WAIT_SECONDS = Histogram(
+    'scheduler_wait_duration_seconds',
+    'Time waited by the job executions for a slot, per user.',
+    ['user'],
+)
+JOBS_COALESCED = Counter(
+    'jobs_coalesced_total',
+    'Number of jobs sharing the execution of an identical job in flight.',
+)
+CACHE_REQUESTS = Counter(
+    'cache_requests_total', 'Number of cache lookups.', ['cache', 'result']
+)
+CACHE_SIZE_BYTES = Gauge(
+    'cache_size_bytes', 'Estimated memory size of the cache entries.', ['cache']
+)
+CACHE_ENTRIES = Gauge('cache_entries', 'Number of cache entries.', ['cache'])
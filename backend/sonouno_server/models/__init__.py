@@ -1,12 +1,29 @@
+from .blobs import Blob
+from .caches import CacheInvalidation
+from .datasets import Dataset, DatasetIn
+from .deletions import Deletion
+from .idempotency import IdempotencyKey
 from .jobs import Job, JobIn
+from .limits import ExecutionLimits
+from .profiles import HotFunction, JobProfile
 from .transforms import ExposedFunction, Transform, TransformIn
+from .uploads import Upload, UploadIn, UploadUrl
 from .users import User
 from .variables import Input, InputIn, Output, OutputIn, OutputWithValue
 
 __all__ = [
+    'Blob',
+    'CacheInvalidation',
+    'Dataset',
+    'DatasetIn',
+    'Deletion',
+    'ExecutionLimits',
     'ExposedFunction',
+    'HotFunction',
+    'IdempotencyKey',
     'Job',
     'JobIn',
+    'JobProfile',
     'Input',
     'InputIn',
     'Output',
@@ -14,5 +31,8 @@ __all__ = [
     'OutputWithValue',
     'Transform',
     'TransformIn',
+    'Upload',
+    'UploadIn',
+    'UploadUrl',
     'User',
 ]
@@ -0,0 +1,25 @@
+"""Blob Document model.
+"""
+
+from datetime import datetime
+
+from beanie import Document, Indexed
+from pydantic import Field as F
+
+
+class Blob(Document):
+    """Content-addressed object of the jobs bucket, shared by the identical job outputs.
+
+    The blob is referenced by the job outputs whose value is its URI. It can be removed
+    from the bucket once it is no longer referenced.
+    """
+
+    name: Indexed(str, unique=True) = F(title='The object name in the jobs bucket.')  # type: ignore[valid-type]  # noqa: E501
+    ref_count: int = F(0, title='The number of job outputs referencing the blob.')
+    created_at: datetime = F(
+        default_factory=datetime.utcnow, title='Date and time of the first storage.'
+    )
+    updated_at: datetime = F(
+        default_factory=datetime.utcnow,
+        title='Date and time of the last storage, lookup or reference update.',
+    )
@@ -0,0 +1,20 @@
+"""Cache invalidation Document model.
+"""
+
+from datetime import datetime
+
+from beanie import Document, Indexed
+from pydantic import Field as F
+
+# the invalidations are only read by the server processes during the polling interval
+RETENTION_SECONDS = 24 * 3600
+
+
+class CacheInvalidation(Document):
+    """Invalidation of a cache entry, broadcast to the server processes."""
+
+    cache: str = F(title='The name of the cache.')
+    key: str = F(title='The key of the invalidated entry.')
+    created_at: Indexed(datetime, expireAfterSeconds=RETENTION_SECONDS) = F(  # type: ignore[valid-type]  # noqa: E501
+        default_factory=datetime.utcnow, title='Date and time of the invalidation.'
+    )
@@ -0,0 +1,33 @@
+"""Dataset Pydantic and Document models.
+"""
+
+from datetime import datetime
+
+from beanie import Document, Indexed, PydanticObjectId
+from pydantic import BaseModel
+from pydantic import Field as F
+
+
+class DatasetIn(BaseModel):
+    upload_id: PydanticObjectId = F(title='The upload whose content is the dataset.')
+
+    class Config:
+        schema_extra = {
+            'example': {'upload_id': '62a8a32bcd4b9e5b6f9bfa02'},
+        }
+
+
+class Dataset(Document):
+    """Immutable content, addressed by its SHA-256 digest, to be used as a job input.
+
+    The datasets of identical contents are stored once: they are not owned by their
+    creator, and they can be referenced by any user knowing their digest.
+    """
+
+    digest: Indexed(str, unique=True) = F(title='The SHA-256 digest of the content.')  # type: ignore[valid-type]  # noqa: E501
+    content_type: str = F(title='The content type of the first upload of the content.')
+    size: int = F(title='The size of the content, in bytes.')
+    user_id: PydanticObjectId = F(title='The user first creating the dataset.')
+    created_at: datetime = F(
+        default_factory=datetime.utcnow, title='Date and time of the dataset creation.'
+    )
@@ -0,0 +1,29 @@
+"""Deletion Document model.
+"""
+
+from datetime import datetime
+
+from beanie import Document, Indexed, PydanticObjectId
+from pydantic import Field as F
+
+from ..types import DeletionKind, DeletionStatus
+
+
+class Deletion(Document):
+    """Cascade deletion of a transform or a user, executed in the background."""
+
+    kind: DeletionKind = F(title='The kind of the deleted document.')
+    target_id: PydanticObjectId = F(title='The identifier of the deleted document.')
+    user_id: Indexed(PydanticObjectId) = F(title='The user requesting the deletion.')  # type: ignore[valid-type]  # noqa: E501
+    status: DeletionStatus = F('queued', title='The status of the deletion.')
+    error: str | None = F(None, title='The reason of the deletion failure.')
+    deleted_jobs: int = F(0, title='The number of dependent jobs deleted so far.')
+    created_at: datetime = F(
+        default_factory=datetime.utcnow, title='Date and time of the request.'
+    )
+    updated_at: datetime = F(
+        default_factory=datetime.utcnow, title='Date and time of the last progress.'
+    )
+    done_at: datetime | None = F(
+        None, title='Date and time when the deletion finished.'
+    )
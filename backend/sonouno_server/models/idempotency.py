@@ -0,0 +1,27 @@
+"""Idempotency key Document model.
+"""
+
+from datetime import datetime
+
+from beanie import Document, Indexed, PydanticObjectId
+from pydantic import Field as F
+from pymongo import ASCENDING, IndexModel
+
+from ..config import CONFIG
+
+
+class IdempotencyKey(Document):
+    """Idempotency key of a job request, expiring after the retention period."""
+
+    user_id: PydanticObjectId = F(title='The user sending the request.')
+    key: str = F(title='The value of the `Idempotency-Key` request header.')
+    request_hash: str = F(title='The hash of the request body.')
+    job_id: PydanticObjectId = F(title='The job created by the request.')
+    created_at: Indexed(datetime, expireAfterSeconds=CONFIG.idempotency_key_retention) = F(  # type: ignore[valid-type]  # noqa: E501
+        default_factory=datetime.utcnow, title='Date and time of the first request.'
+    )
+
+    class Settings:
+        indexes = [
+            IndexModel([('user_id', ASCENDING), ('key', ASCENDING)], unique=True)
+        ]
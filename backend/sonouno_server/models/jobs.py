@@ -2,14 +2,17 @@ from collections.abc import Iterator, Mapping, Sequence
 from datetime import datetime
 from typing import Any, cast
 
-from beanie import Document, PydanticObjectId
+from beanie import Document, Indexed, PydanticObjectId
 from pydantic import BaseModel
 from pydantic import Field as F
 
-from ..executors import LocalExecutor
+from ..config import CONFIG
+from ..executors import LocalExecutor, ProcessExecutor
 from ..models.transforms import Transform
 from ..schemas import JSONSchema
-from ..types import JSONSchemaType
+from ..types import JobPriority, JobStatus, JSONSchemaType
+from .limits import ExecutionLimits
+from .profiles import JobProfile
 from .variables import Input, InputIn, OutputIn, OutputWithValue
 
 
@@ -19,6 +22,17 @@ class JobIn(BaseModel):
     )
     inputs: Sequence[InputIn] = F([], title='Specifications of the transform inputs.')
     outputs: Sequence[OutputIn] = F([], title='Specifications fo the transform outputs')
+    limits: ExecutionLimits = F(
+        ExecutionLimits(), title='Overrides of the transform resource limits.'
+    )
+    priority: JobPriority = F(
+        'interactive',
+        title='The priority class of the job: `interactive` jobs are executed before '
+        '`bulk` ones.',
+    )
+    profile: bool = F(
+        False, title='If true, the execution profile of the job is captured.'
+    )
 
     class Config:
         schema_extra = {
@@ -33,8 +47,22 @@ class JobIn(BaseModel):
 
 
 class Job(JobIn, Document):
-    user_id: PydanticObjectId = F(title='The user requesting the job.')
+    user_id: Indexed(PydanticObjectId) = F(title='The user requesting the job.')  # type: ignore[valid-type]  # noqa: E501
+    status: JobStatus = F('queued', title='The execution status of the job.')
+    error: str | None = F(None, title='The reason of the job failure.')
     done_at: datetime | None = F(None, title='Date and time when the job finished.')
+    execution_profile: JobProfile | None = F(
+        None, title='The execution profile, if requested.'
+    )
+    coalesced_with: PydanticObjectId | None = F(
+        None,
+        title='The identical job in flight, whose execution outputs are shared.',
+    )
+    expires_at: Indexed(datetime) | None = F(  # type: ignore[valid-type]
+        None, title='Date and time after which the job and its outputs are deleted.'
+    )
+    # the deletion of the expired job by the reaper, identified by an ObjectId
+    reaper_claim: PydanticObjectId | None = F(None, hidden=True)
     inputs: Sequence[Input] = F([], title='The specified inputs.')
     outputs: Sequence[OutputWithValue] = F(
         [], title='The resulting fully specified outputs.'
@@ -84,7 +112,12 @@ class Job(JobIn, Document):
                             'value': 'http://api.sonouno.org.ar:9000/jobs/job-628f4d4255358f834b9df030/pipeline-0-726141.wav',  # noqa: E501
                         }
                     ],
+                    'limits': {'wall_time': 300, 'cpu_time': 300, 'memory': 2048},
+                    'priority': 'interactive',
+                    'profile': False,
                     'user_id': '628f0baa98325a42409ae3bd',
+                    'status': 'done',
+                    'error': None,
                     'done_at': '2022-05-26T09:49:55.058357',
                 }
             ],
@@ -92,7 +125,9 @@ class Job(JobIn, Document):
 
     def get_executor(self, transform: Transform) -> LocalExecutor:
         """Returns the transform executor."""
-        return LocalExecutor(self, transform)
+        if CONFIG.executor == 'local':
+            return LocalExecutor(self, transform)
+        return ProcessExecutor(self, transform)
 
     def iter_output_values(
         self, values: Mapping[str, Any]
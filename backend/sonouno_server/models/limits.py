@@ -0,0 +1,36 @@
+"""Job resource limits model.
+"""
+
+from typing import Annotated
+
+from pydantic import BaseModel
+from pydantic import Field as F
+
+
+class ExecutionLimits(BaseModel):
+    """Resource limits of the job execution.
+
+    Unspecified limits are inherited from the transform, or otherwise from the server
+    defaults.
+    """
+
+    wall_time: Annotated[
+        float | None, F(title='Wall-clock time limit, in seconds.', gt=0)
+    ] = None
+    cpu_time: Annotated[int | None, F(title='CPU time limit, in seconds.', gt=0)] = None
+    memory: Annotated[
+        int | None,
+        F(title='Memory limit of the execution worker, in MiB.', gt=0),
+    ] = None
+
+    class Config:
+        schema_extra = {
+            'description': 'Resource limits of the job execution.',
+            'examples': [
+                {
+                    'wall_time': 60,
+                    'cpu_time': 60,
+                    'memory': 1024,
+                },
+            ],
+        }
@@ -0,0 +1,59 @@
+"""Job execution profile models.
+"""
+
+from typing import Annotated
+
+from pydantic import BaseModel
+from pydantic import Field as F
+
+
+class HotFunction(BaseModel):
+    function: Annotated[str, F(title='The function, as `file:line(name)`.')]
+    calls: Annotated[int, F(title='The number of calls.')]
+    total_time: Annotated[
+        float, F(title='The time spent in the function itself, in seconds.')
+    ]
+    cumulative_time: Annotated[
+        float, F(title='The time spent in the function and its callees, in seconds.')
+    ]
+
+
+class JobProfile(BaseModel):
+    phases: Annotated[
+        dict[str, float], F(title='The duration of the job phases, in seconds.')
+    ] = {}
+    hot_functions: Annotated[
+        list[HotFunction],
+        F(title='The functions with the highest total time, in decreasing order.'),
+    ] = []
+    stats_uri: Annotated[
+        str | None, F(title='The URI of the full profile, in the pstats format.')
+    ] = None
+
+    class Config:
+        schema_extra = {
+            'description': 'The execution profile of a job, captured on demand.',
+            'examples': [
+                {
+                    'phases': {
+                        'transform_fetch': 0.0021,
+                        'build': 0.0005,
+                        'mongo_write': 0.0042,
+                        'queue': 0.0001,
+                        'exec': 0.3145,
+                        'schema_update': 0.0001,
+                        'encode': 0.0313,
+                        'upload': 0.0125,
+                    },
+                    'hot_functions': [
+                        {
+                            'function': 'track.py:75(add_sine_wave)',
+                            'calls': 12,
+                            'total_time': 0.2491,
+                            'cumulative_time': 0.2606,
+                        }
+                    ],
+                    'stats_uri': 'http://api.sonouno.org.ar:9000/jobs/job-628f4d4255358f834b9df030/profile.pstats',  # noqa: E501
+                }
+            ],
+        }
@@ -3,3 +3,29 @@ from pydantic import BaseModel
 
 class SystemInfo(BaseModel):
     backend_version: str
+
+
+class UserQueueInfo(BaseModel):
+    user_id: str
+    queued: int
+    running: int
+    started: int
+    mean_wait_time: float
+
+
+class SchedulerInfo(BaseModel):
+    max_concurrency: int
+    user_concurrency: int
+    queue_depth: int
+    running: int
+    active_users: int
+    user: UserQueueInfo | None  # the queue of the current user, if active
+
+
+class CacheInfo(BaseModel):
+    name: str
+    entries: int
+    size: int
+    max_size: int
+    hits: int
+    misses: int
@@ -8,6 +8,7 @@ from beanie import Document, Indexed, PydanticObjectId
 from pydantic import BaseModel
 from pydantic import Field as F
 
+from .limits import ExecutionLimits
 from .variables import Input, Output
 
 
@@ -48,6 +49,17 @@ class TransformIn(BaseModel):
     ]
     source: Annotated[str, F(title='The source code of the transform.')]
     entry_point: Annotated[ExposedFunction, F(title='The entry point of the pipeline.')]
+    limits: Annotated[
+        ExecutionLimits, F(title='The default resource limits of the jobs.')
+    ] = ExecutionLimits()
+    job_retention_days: Annotated[
+        int | None,
+        F(
+            title='The number of days after which the jobs are deleted, 0 to keep '
+            'them. It overrides the retention of the server and of the users.',
+            ge=0,
+        ),
+    ] = None
 
     class Config:
         schema_extra = {
@@ -113,7 +125,7 @@ class Transform(TransformIn, Document):
                                         'rate': 44100,
                                     },
                                 },
-                                'transfer': 'uri',
+                                'transfer': 'auto',
                                 'name': '0',
                             }
                         ],
@@ -0,0 +1,47 @@
+"""Upload Pydantic and Document models.
+"""
+
+from datetime import datetime
+
+from beanie import Document, Indexed, PydanticObjectId
+from pydantic import BaseModel
+from pydantic import Field as F
+
+from ..types import UploadStatus
+
+
+class UploadIn(BaseModel):
+    content_type: str = F(
+        'application/octet-stream',
+        title='The content type of the upload. The NumPy arrays of content type '
+        '`application/x-npy` are memory-mapped by the jobs.',
+    )
+
+
+class Upload(UploadIn, Document):
+    """Content uploaded to the object store, to be used as a job input."""
+
+    user_id: Indexed(PydanticObjectId) = F(title='The user uploading the content.')  # type: ignore[valid-type]  # noqa: E501
+    status: UploadStatus = F('pending', title='The status of the upload.')
+    size: int | None = F(None, title='The size of the uploaded content, in bytes.')
+    size_checked: bool = F(
+        False,
+        title='True if the size of the content has been checked after the expiry of '
+        'the upload URL, through which it can be replaced.',
+    )
+    created_at: datetime = F(
+        default_factory=datetime.utcnow, title='Date and time of the upload creation.'
+    )
+
+    @property
+    def object_name(self) -> str:
+        """The object name in the uploads bucket."""
+        return str(self.id)
+
+
+class UploadUrl(BaseModel):
+    """The upload, and the presigned URL to which its content is sent."""
+
+    upload: Upload = F(title='The created upload.')
+    url: str = F(title='The URL to which the content is sent with a PUT request.')
+    expires_at: datetime = F(title='Date and time after which the URL is invalid.')
@@ -38,6 +38,8 @@ class User(UserOut, Document):
 
     password: str
     email_confirmed_at: datetime | None = None
+    job_weight: float = 1.0  # share of the job executions, relative to other users
+    job_retention_days: int | None = None  # overrides the default job retention
 
     def __repr__(self) -> str:
         return f'<User {self.email}>'
@@ -1,7 +1,9 @@
 from typing import Annotated, Any
 
+from beanie import PydanticObjectId
 from pydantic import BaseModel
 from pydantic import Field as F
+from pydantic import root_validator
 
 from ..types import JSONSchemaType, TransferType
 
@@ -9,6 +11,31 @@ from ..types import JSONSchemaType, TransferType
 class InputIn(BaseModel):
     id: Annotated[str, F(title='Unique identifier of the exposed function argument.')]
     value: Annotated[Any, F(title='Input value of the exposed function.')]
+    upload_id: Annotated[
+        PydanticObjectId | None,
+        F(title='The upload whose content is the input value, instead of `value`.'),
+    ] = None
+    dataset_digest: Annotated[
+        str | None,
+        F(
+            title='The digest of the dataset that is the input value, instead of '
+            '`value`.',
+            regex='^[0-9a-f]{64}$',
+        ),
+    ] = None
+
+    @root_validator(skip_on_failure=True)
+    def check_single_source(cls, values: dict[str, Any]) -> dict[str, Any]:
+        """Checks that the input value is given by at most one of `value`,
+        `upload_id` and `dataset_digest`."""
+        sources = [
+            name
+            for name in ('value', 'upload_id', 'dataset_digest')
+            if values.get(name) is not None
+        ]
+        if len(sources) > 1:
+            raise ValueError(f"Only one of {', '.join(sources)} can be specified.")
+        return values
 
     class Config:
         schema_extra = {
@@ -22,6 +49,15 @@ class InputIn(BaseModel):
                     'id': 'pipeline.filter_number',
                     'value': 2,
                 },
+                {
+                    'id': 'pipeline.data',
+                    'upload_id': '62a8a32bcd4b9e5b6f9bfa02',
+                },
+                {
+                    'id': 'pipeline.catalog',
+                    'dataset_digest': 'e3b0c44298fc1c149afbf4c8996fb924'
+                    '27ae41e4649b934ca495991b7852b855',
+                },
             ],
         }
 
@@ -73,7 +109,11 @@ class OutputIn(BaseModel):
     json_schema: Annotated[JSONSchemaType, F(title='The JSON schema of the output.')]
     transfer: Annotated[
         TransferType,
-        F(title='Transfer mode for the returned value: `json`, `uri` or `ignore`.'),
+        F(
+            title='Transfer mode for the returned value: `json`, `uri`, `auto` or '
+            '`ignore`. In the jobs, the `auto` mode is resolved into `json` or `uri` '
+            'according to the size of the encoded value.'
+        ),
     ] = 'ignore'
 
     class Config:
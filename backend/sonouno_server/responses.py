@@ -0,0 +1,238 @@
+"""Fast serialization of the responses, in JSON or MessagePack.
+
+The documents returned by the routes have been validated when they were written to or
+read from the database. They are serialized by orjson into the response body, instead
+of being validated again against the route response model and converted by
+`jsonable_encoder`, which walks through the nested inputs, outputs and callees, and
+their possibly large values.
+
+The clients accepting the `application/msgpack` media type get the documents in the
+MessagePack format, in which the numbers are not converted to text. The numeric arrays
+are packed as the extension type `NDARRAY_EXT_CODE`, whose data is the MessagePack
+array `[dtype, shape, buffer]`, with `dtype` the numpy array-protocol type string (such
+as `<f8`), `shape` an array of integers and `buffer` the binary C-ordered values.
+"""
+
+import json
+from datetime import datetime
+from functools import lru_cache
+from typing import Any
+
+import msgpack
+import numpy
+import orjson
+from bson import ObjectId
+from fastapi import Request
+from pydantic import BaseModel
+from starlette.responses import JSONResponse, Response
+
+from .models import OutputWithValue
+from .util.encoders import NumpyTypedArrayEncoder
+
+__all__ = [
+    'DocumentResponse',
+    'MsgPackDocumentResponse',
+    'document_response',
+    'dumps_json',
+    'dumps_msgpack',
+    'json_default',
+    'loads_msgpack',
+    'render_document',
+]
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+MSGPACK_MEDIA_TYPE = 'application/msgpack'
+NDARRAY_EXT_CODE = 1
+# documentation of the negotiated media types of the document responses
+NEGOTIATED_RESPONSES: dict[int | str, dict[str, Any]] = {
+    200: {'content': {MSGPACK_MEDIA_TYPE: {}}}
+}
+
+
+def dumps_json(value: Any, sort_keys: bool = False) -> bytes:
+    """Serializes a value into JSON.
+
+    In addition to the types natively handled by orjson, such as the datetimes, the
+    dataclasses and the numpy arrays, the pydantic models are serialized by alias.
+
+    Arguments:
+        value: The value to be serialized.
+        sort_keys: If true, the keys of the objects are sorted.
+
+    Raises:
+        TypeError: When the value cannot be serialized in JSON.
+    """
+    option = ORJSON_OPTIONS | orjson.OPT_SORT_KEYS if sort_keys else ORJSON_OPTIONS
+    try:
+        return orjson.dumps(value, default=json_default, option=option)
+    except orjson.JSONEncodeError:
+        # orjson does not handle the integers beyond 64 bits
+        return json.dumps(value, default=json_default, sort_keys=sort_keys).encode()
+
+
+def json_default(value: Any) -> Any:
+    """Converts the values that are not natively handled by orjson or json."""
+    if isinstance(value, BaseModel):
+        return _get_model_dict(value)
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, (numpy.ndarray, numpy.generic)):
+        return value.tolist()
+    # as serialized by orjson, for the json fallback
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'Type is not JSON serializable: {type(value).__name__}')
+
+
+def dumps_msgpack(value: Any) -> bytes:
+    """Serializes a value into MessagePack.
+
+    The numeric arrays, including the typed arrays of the output values, are packed
+    as extension types. The datetimes are packed as ISO 8601 strings, as in JSON.
+
+    Raises:
+        TypeError: When the value cannot be serialized in MessagePack.
+    """
+    return msgpack.packb(value, default=_default_msgpack, use_bin_type=True)
+
+
+def loads_msgpack(data: bytes, ndarray_as_list: bool = False) -> Any:
+    """Deserializes MessagePack data.
+
+    Arguments:
+        data: The MessagePack data.
+        ndarray_as_list: If true, the numeric arrays are unpacked as nested lists,
+            which can be stored in the database, instead of numpy arrays.
+    """
+
+    def ext_hook(code: int, data: bytes) -> Any:
+        if code != NDARRAY_EXT_CODE:
+            return msgpack.ExtType(code, data)
+        dtype, shape, buffer = msgpack.unpackb(data)
+        array = numpy.frombuffer(buffer, dtype).reshape(shape)
+        return array.tolist() if ndarray_as_list else array
+
+    return msgpack.unpackb(data, ext_hook=ext_hook, strict_map_key=False)
+
+
+def _default_msgpack(value: Any) -> Any:
+    """Converts the values that are not natively handled by msgpack."""
+    if isinstance(value, numpy.ndarray) and value.dtype.kind in 'biuf':
+        value = numpy.ascontiguousarray(value)
+        data = [value.dtype.str, value.shape, value.data]
+        return msgpack.ExtType(NDARRAY_EXT_CODE, msgpack.packb(data))
+    if isinstance(value, OutputWithValue) and value.json_schema.get('x-typedArray'):
+        content = _get_model_dict(value)
+        content['value'] = NumpyTypedArrayEncoder.decode(value.value)
+        return content
+    return json_default(value)
+
+
+def _get_model_dict(model: BaseModel) -> dict[str, Any]:
+    """Converts a model into a dictionary, by alias.
+
+    The conversion is shallow: the field values are walked by the serializer, not by
+    pydantic.
+    """
+    return {alias: getattr(model, name) for name, alias in _get_aliases(type(model))}
+
+
+@lru_cache(maxsize=None)
+def _get_aliases(model: type[BaseModel]) -> list[tuple[str, str]]:
+    """Returns the names and aliases of the model fields, except the hidden ones, such
+    as the revision identifier of the documents."""
+    return [
+        (name, field.alias)
+        for name, field in model.__fields__.items()
+        if not field.field_info.extra.get('hidden')
+    ]
+
+
+class DocumentResponse(JSONResponse):
+    """JSON response serializing validated documents, or lists of them, with orjson.
+
+    When returned by a route, the route response model is only used for the
+    documentation of the API.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+
+class MsgPackDocumentResponse(Response):
+    """MessagePack response serializing validated documents, or lists of them."""
+
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return dumps_msgpack(content)
+
+
+def render_document(content: Any, media_type: str) -> bytes:
+    """Serializes documents in the format of the document responses.
+
+    Arguments:
+        content: The document or the list of documents.
+        media_type: The media type of the response, as returned by
+            `get_response_media_type`.
+    """
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return dumps_msgpack(content)
+    return dumps_json(content)
+
+
+def document_response(request: Request, content: Any) -> Response:
+    """Returns the response of the documents, in the format accepted by the client.
+
+    Arguments:
+        request: The request, whose `Accept` header selects the response format.
+        content: The document or the list of documents.
+    """
+    if get_response_media_type(request) == MSGPACK_MEDIA_TYPE:
+        return MsgPackDocumentResponse(content)
+    return DocumentResponse(content)
+
+
+def get_response_media_type(request: Request) -> str:
+    """Returns the media type of the document responses: JSON, or MessagePack if it
+    is preferred by the `Accept` header of the request."""
+    if get_accepted_quality(request, MSGPACK_MEDIA_TYPE) > get_accepted_quality(
+        request, 'application/json'
+    ):
+        return MSGPACK_MEDIA_TYPE
+    return 'application/json'
+
+
+def get_accepted_quality(request: Request, media_type: str) -> float:
+    """Returns the quality factor of a media type in the request `Accept` header.
+
+    The most specific matching media range is used, as specified by RFC 7231.
+    """
+    accept = request.headers.get('accept')
+    if not accept:
+        return 1.0
+    main_type = media_type.split('/')[0]
+    best_specificity, best_quality = -1, 0.0
+    for media_range in accept.split(','):
+        range_type, *parameters = (_.strip() for _ in media_range.split(';'))
+        if range_type == media_type:
+            specificity = 2
+        elif range_type == f'{main_type}/*':
+            specificity = 1
+        elif range_type == '*/*':
+            specificity = 0
+        else:
+            continue
+        if specificity <= best_specificity:
+            continue
+        best_specificity, best_quality = specificity, 1.0
+        for parameter in parameters:
+            name, _, value = parameter.partition('=')
+            if name.strip() == 'q':
+                try:
+                    best_quality = float(value)
+                except ValueError:
+                    pass
+    return best_quality
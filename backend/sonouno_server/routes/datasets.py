@@ -0,0 +1,57 @@
+"""Datasets router.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+
+from ..models import Dataset, DatasetIn, User
+from ..util.current_user import current_user
+from ..util.datasets import create_dataset
+from ..util.uploads import refresh_upload
+from .uploads import get_upload
+
+router = APIRouter(prefix='/datasets', tags=['Datasets'])
+
+
+@router.post(
+    '',
+    summary='Creates a dataset from an upload.',
+    response_model=Dataset,
+    status_code=201,
+    responses={
+        200: {'description': 'An identical dataset exists.'},
+        403: {'description': 'Operation is not authorized.'},
+        413: {'description': 'The content exceeds the maximum upload size.'},
+    },
+)
+async def create(
+    dataset_in: DatasetIn, response: Response, user: User = Depends(current_user)
+):
+    """Creates an immutable dataset from the content of a ready upload, addressed by
+    the SHA-256 digest of the content.
+
+    The dataset of an identical content is returned if it exists. The job inputs
+    reference the dataset through their `dataset_digest` property: the job workers
+    cache the dataset on disk, and pass the NumPy arrays saved in the `.npy` format
+    as read-only memory-mapped arrays, and the other contents as file paths.
+    """
+    upload = await get_upload(dataset_in.upload_id, user)
+    await refresh_upload(upload)
+    if upload.status != 'ready':
+        raise HTTPException(400, f'The upload {upload.id} is not complete.')
+    dataset, created = await create_dataset(upload)
+    if not created:
+        response.status_code = 200
+    return dataset
+
+
+@router.get(
+    '/{digest}',
+    summary='Gets a dataset.',
+    response_model=Dataset,
+)
+async def get(digest: str, user: User = Depends(current_user)):
+    """Returns the dataset of a digest."""
+    dataset = await Dataset.find_one(Dataset.digest == digest)
+    if dataset is None:
+        raise HTTPException(404, 'Unknown dataset.')
+    return dataset
@@ -0,0 +1,31 @@
+"""Deletions router.
+"""
+
+from beanie import PydanticObjectId
+from fastapi import APIRouter, Depends, HTTPException
+
+from ..models import Deletion, User
+from ..util.current_user import current_user_even_disabled
+
+router = APIRouter(prefix='/deletions', tags=['Deletions'])
+
+
+@router.get(
+    '/{id}',
+    summary='Gets the status of a deletion.',
+    response_model=Deletion,
+    responses={403: {'description': 'Operation is not authorized.'}},
+)
+async def get(id: PydanticObjectId, user: User = Depends(current_user_even_disabled)):
+    """Returns the status and progress of the cascade deletion of a transform or of
+    the current user.
+
+    The status of the deletion of the current user can be polled until the user is
+    deleted, after which the access token is no longer valid.
+    """
+    deletion = await Deletion.get(id)
+    if deletion is None:
+        raise HTTPException(404, 'Unknown deletion.')
+    if deletion.user_id != user.id:
+        raise HTTPException(403, 'Access forbidden.')
+    return deletion
@@ -1,26 +1,78 @@
 """Job router."""
+import hashlib
+from contextlib import AsyncExitStack
 from datetime import datetime
+from functools import partial
+from io import BytesIO
 from logging import getLogger
 
 from beanie import PydanticObjectId
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 
-from ..models import Job, JobIn, Transform, User
+from ..app import app
+from ..compression import compression
+from ..config import CONFIG
+from ..executors import ExecutionError
+from ..metrics import JOBS_COALESCED
+from ..models import IdempotencyKey, Job, JobIn, JobProfile, Transform, User
+from ..responses import (
+    NEGOTIATED_RESPONSES,
+    document_response,
+    dumps_json,
+    get_response_media_type,
+    render_document,
+)
+from ..routing import NegotiatedRoute
+from ..tracing import set_span_attributes, traced
+from ..util.blobs import add_blob_references
 from ..util.current_user import current_user
-from ..util.io import transfer_values
+from ..util.datasets import check_job_datasets
+from ..util.downloads import get_signing_window, presign_job
+from ..util.etags import get_document_etag, match_etag, not_modified_response, set_etag
+from ..util.idempotency import (
+    claim_idempotency_key,
+    find_idempotency_key,
+    get_request_hash,
+)
+from ..util.io import store_buffer, transfer_values
 from ..util.job_builder import JobBuilder
+from ..util.job_cache import JOB_CACHE, CachedJob
+from ..util.mongo import get_read_only, get_read_only_fields
+from ..util.profiler import JobProfiler, current_profiler, dump_stats, job_phase
+from ..util.single_flight import SingleFlight
+from ..util.transform_cache import get_transform
+from ..util.uploads import check_job_uploads, set_upload_media_types
 
-router = APIRouter(prefix='/jobs', tags=['Jobs'])
+router = APIRouter(prefix='/jobs', tags=['Jobs'], route_class=NegotiatedRoute)
 logger = getLogger(__name__)
 
+# the jobs being executed, by execution key
+IN_FLIGHT_JOBS: SingleFlight[Job] = SingleFlight()
+
 
 @router.post(
     '',
     summary='Creates a new job.',
     response_model=Job,
-    responses={404: {'description': 'The job specifies an unknown transform.'}},
+    responses={
+        **NEGOTIATED_RESPONSES,
+        403: {'description': 'The job references an upload of another user.'},
+        404: {'description': 'The job specifies an unknown transform.'},
+        409: {'description': 'The request of same idempotency key is in progress.'},
+        413: {'description': 'An upload exceeds the maximum size.'},
+        422: {'description': 'The idempotency key is used by another request.'},
+    },
 )
-async def create(job_in: JobIn, user: User = Depends(current_user)):
+# the job responses can embed outputs of several MiB, compressed at the fastest levels
+@compression(gzip=1, br=1)
+@traced('jobs.create')
+async def create(
+    request: Request,
+    job_in: JobIn,
+    user: User = Depends(current_user),
+    idempotency_key: str | None = Header(None),
+):
     """Creates a job that will execute a transform.
 
     The job specifies a transform and its inputs. Upon response,
@@ -31,31 +83,281 @@ async def create(job_in: JobIn, user: User = Depends(current_user)):
         schema (at least one of the properties `type`, `enum` or `const` are defined),
         or has a defined content type (stored in the contentMediaType property as a MIME
         type).
+        The job status is `failed` if the execution fails or exceeds the job resource
+        limits.
+        The executions are queued by a fair-share scheduler, which limits the number of
+        concurrent executions per user.
+        When the job `profile` flag is set, the duration of the job phases and the
+        hottest functions are returned in the `execution_profile` property.
+        The jobs identical to a job being executed (same transform, inputs, outputs
+        and limits) are not executed: they share the outputs of the executed job,
+        whose identifier is stored in their `coalesced_with` property.
+        The request body and the response can be sent in JSON or in MessagePack
+        (`application/msgpack`), in which the numeric arrays are binary extension
+        types.
+        The requests specifying an `Idempotency-Key` header can be safely retried:
+        the job created by the first request of the same key, finished or not, is
+        returned with the `Idempotent-Replayed` header, without being executed again.
+        The keys expire after a retention period, 24 hours by default.
+        The large inputs can be uploaded beforehand and referenced by their
+        `upload_id` instead of their `value`: they are downloaded only by the job
+        worker. The inputs reused by many jobs can be referenced by their
+        `dataset_digest`: they are cached on disk by the job workers.
     """
-    transform = await Transform.get(document_id=job_in.transform_id)
-    if not transform:
+    assert user.id is not None
+    request_hash = None
+    if idempotency_key is not None:
+        if not 0 < len(idempotency_key) <= CONFIG.idempotency_key_max_length:
+            raise HTTPException(400, 'Invalid idempotency key.')
+        request_hash = get_request_hash(job_in)
+        stored_key = await find_idempotency_key(user.id, idempotency_key)
+        if stored_key is not None:
+            return await replay(request, stored_key, request_hash)
+
+    # the context variable is local to the task handling the request
+    profiler = JobProfiler(job_in.profile)
+    current_profiler.set(profiler)
+    set_span_attributes(user_id=str(user.id), transform_id=str(job_in.transform_id))
+
+    with job_phase('transform_fetch'):
+        cached_transform = await get_transform(job_in.transform_id)
+    if not cached_transform:
         raise HTTPException(404, 'Unknown transform.')
+    transform = cached_transform.transform
+    uploads = await check_job_uploads(job_in, user)
+    await check_job_datasets(job_in)
+
+    with job_phase('build', profile=True):
+        job = JobBuilder(job_in, user, transform).create()
+    set_upload_media_types(job, uploads)
+    job.id = PydanticObjectId()
+    if idempotency_key is not None:
+        assert request_hash is not None
+        stored_key = await claim_idempotency_key(
+            user.id, idempotency_key, request_hash, job.id
+        )
+        if stored_key is not None:
+            return await replay(request, stored_key, request_hash)
+    with job_phase('mongo_write', span_name='job.create'):
+        await job.create()
+    set_span_attributes(job_id=str(job.id))
+
+    key = get_execution_key(job)
+    try:
+        if key is None:
+            await execute(job, transform, user, profiler)
+        else:
+            executed_job = await IN_FLIGHT_JOBS.run(
+                key, partial(execute, job, transform, user, profiler)
+            )
+            if executed_job is not job:
+                copy_execution(executed_job, job)
+    except Exception as exc:
+        if job.status != 'failed':
+            # the job waited for the failed execution of an identical job
+            await fail_job(job, exc)
+        if idempotency_key is not None:
+            # the retries of an unexpectedly failed request are executed again
+            await IdempotencyKey.find_one(
+                IdempotencyKey.user_id == user.id,
+                IdempotencyKey.key == idempotency_key,
+            ).delete()
+        raise
+
+    if job.status == 'done':
+        with job_phase('mongo_write', span_name='blob.reference'):
+            await add_blob_references(job)
+    if job.profile:
+        job.execution_profile = store_profile(job, profiler)
+    job.done_at = datetime.utcnow()
+    set_span_attributes(status=job.status)
+    with job_phase('mongo_write', span_name='job.replace'):
+        await job.replace()
+    return document_response(request, presign_job(job))
+
 
-    job = JobBuilder(job_in, user, transform).create()
-    await job.create()
+async def replay(
+    request: Request, stored_key: IdempotencyKey, request_hash: str
+) -> Response:
+    """Returns the job created by the first request of an idempotency key.
 
+    Raises:
+        HTTPException: When the key is used by a request of another body, or when
+            the job of the first request is not yet created.
+    """
+    if stored_key.request_hash != request_hash:
+        raise HTTPException(422, 'The idempotency key is used by another request.')
+    job = await Job.get(stored_key.job_id)
+    if job is None:
+        raise HTTPException(409, 'The request of same idempotency key is in progress.')
+    response = document_response(request, presign_job(job))
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+async def execute(
+    job: Job, transform: Transform, user: User, profiler: JobProfiler
+) -> Job:
+    """Executes a job, within the limits of the scheduler, and transfers its outputs.
+
+    Arguments:
+        job: The job to be executed.
+        transform: The transform of the job.
+        user: The user requesting the job.
+        profiler: The profiler of the job phases.
+
+    Returns:
+        The executed job.
+    """
     executor = job.get_executor(transform)
-    values = executor.run()
+    scheduler = app.state.scheduler
+    try:
+        async with AsyncExitStack() as stack:
+            with job_phase('queue'):
+                slot = scheduler.slot(str(user.id), job.priority, user.job_weight)
+                await stack.enter_async_context(slot)
+            await job.set({Job.status: 'running'})
+            with job_phase('exec'):
+                values = await run_in_threadpool(executor.run)
+        with job_phase('schema_update', profile=True):
+            job.update_json_schemas_with_values(values)
+        with job_phase('transfer', profile=True):
+            await transfer_values(job, values)
+        job.status = 'done'
+    except ExecutionError as exc:
+        logger.info(f'Job {job.id} failed: {exc}')
+        job.status = 'failed'
+        job.error = str(exc)
+    except Exception as exc:
+        await fail_job(job, exc)
+        raise
+    finally:
+        profiler.add_stats(executor.stats)
+    return job
 
-    job.update_json_schemas_with_values(values)
-    transfer_values(job, values)
 
+async def fail_job(job: Job, exc: Exception) -> None:
+    """Stores a job as failed by an unexpected error, which is then propagated, so
+    that the job does not remain queued or running."""
+    job.status = 'failed'
+    job.error = (
+        exc.detail if isinstance(exc, HTTPException) else f'{type(exc).__name__}: {exc}'
+    )
+    logger.warning(f'Job {job.id} failed: {job.error}')
     job.done_at = datetime.utcnow()
     await job.replace()
-    return job
 
 
-@router.get('/{id}', summary='Gets a job.', response_model=Job)
-async def get(id: PydanticObjectId, user: User = Depends(current_user)):
-    """Gets the job specified by its identifier."""
-    job = await Job.get(document_id=id)
+def get_execution_key(job: Job) -> str | None:
+    """Returns the key identifying the identical job executions.
+
+    The jobs of same transform, inputs, outputs and limits are coalesced while one
+    of them is executed. The profiled jobs, whose execution profile is specific, are
+    not coalesced. Without storage deduplication, the jobs are not coalesced either:
+    the stored outputs of the executed job are not referenced by the other ones, and
+    are deleted with it.
+
+    Returns:
+        The key, or None if the job execution cannot be shared.
+    """
+    if not CONFIG.job_coalescing or not CONFIG.storage_deduplication or job.profile:
+        return None
+    content = [job.transform_id, job.inputs, job.outputs, job.limits]
+    return hashlib.sha256(dumps_json(content, sort_keys=True)).hexdigest()
+
+
+def copy_execution(executed_job: Job, job: Job) -> None:
+    """Copies to a job the execution results of an identical job."""
+    logger.info(f'Job {job.id} coalesced with job {executed_job.id}.')
+    JOBS_COALESCED.inc()
+    set_span_attributes(coalesced_with=str(executed_job.id))
+    job.coalesced_with = executed_job.id
+    job.status = executed_job.status
+    job.error = executed_job.error
+    job.outputs = [output.copy() for output in executed_job.outputs]
+
+
+def store_profile(job: Job, profiler: JobProfiler) -> JobProfile:
+    """Returns the job execution profile, after storing the full statistics in MinIO.
+
+    Arguments:
+        job: The profiled job.
+        profiler: The profiler of the job phases.
+    """
+    profile = profiler.get_profile(CONFIG.profile_function_count)
+    stats = profiler.get_stats()
+    if stats is not None:
+        buffer = BytesIO(dump_stats(stats))
+        name = f'job-{job.id}/profile.pstats'
+        profile.stats_uri = store_buffer(name, buffer, 'application/octet-stream')
+    return profile
+
+
+@router.get(
+    '/{id}',
+    summary='Gets a job.',
+    response_model=Job,
+    responses={
+        **NEGOTIATED_RESPONSES,
+        304: {'description': 'The finished job matches the `If-None-Match` header.'},
+    },
+)
+@compression(gzip=1, br=1)
+async def get(
+    request: Request, id: PydanticObjectId, user: User = Depends(current_user)
+):
+    """Gets the job specified by its identifier.
+
+    Notes:
+        The finished jobs are immutable and their responses have an entity tag. When
+        it matches the `If-None-Match` header, an empty response of status 304 is
+        returned, without fetching the whole job. The responses of the finished jobs
+        are cached.
+        The URIs of the stored outputs are presigned URLs, valid for at least 10
+        minutes by default. The entity tags change when the URLs are renewed.
+    """
+    key = str(id)
+    media_type = get_response_media_type(request)
+    window = get_signing_window()
+    cached_job = JOB_CACHE.get(key)
+    if cached_job is not None:
+        if cached_job.user_id != user.id:
+            raise HTTPException(403, 'Access forbidden.')
+        etag = get_document_etag(request, id, cached_job.done_at, window)
+        matching_etag = match_etag(request, etag)
+        if matching_etag is not None:
+            return not_modified_response(matching_etag)
+        body = cached_job.bodies.get(media_type)
+        if body is not None and cached_job.window == window:
+            response = Response(body, media_type=media_type)
+            set_etag(response, etag)
+            return response
+
+    elif 'if-none-match' in request.headers:
+        fields = await get_read_only_fields(Job, id, ['user_id', 'done_at'])
+        if fields is None:
+            raise HTTPException(404, 'Unknown job.')
+        if fields['user_id'] != user.id:
+            raise HTTPException(403, 'Access forbidden.')
+        if fields.get('done_at') is not None:
+            etag = get_document_etag(request, id, fields['done_at'], window)
+            matching_etag = match_etag(request, etag)
+            if matching_etag is not None:
+                return not_modified_response(matching_etag)
+
+    job = await get_read_only(Job, id)
     if not job:
         raise HTTPException(404, 'Unknown job.')
     if job.user_id != user.id:
         raise HTTPException(403, 'Access forbidden.')
-    return job
+    if job.done_at is None:
+        return document_response(request, presign_job(job, window))
+
+    if cached_job is None or cached_job.window != window:
+        cached_job = CachedJob(job.user_id, job.done_at, window)
+    body = render_document(presign_job(job, window), media_type)
+    cached_job.bodies[media_type] = body
+    JOB_CACHE.set(key, cached_job, cached_job.size)
+    response = Response(body, media_type=media_type)
+    set_etag(response, get_document_etag(request, id, job.done_at, window))
+    return response
@@ -1,9 +1,16 @@
 """System router.
 """
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
 
 from .. import __version__ as backend_version
-from ..models.system import SystemInfo
+from ..app import app
+from ..config import CONFIG
+from ..metrics import REGISTRY
+from ..models.system import CacheInfo, SchedulerInfo, SystemInfo, UserQueueInfo
+from ..models.users import User
+from ..util.cache import CACHES
+from ..util.current_user import current_user
 
 router = APIRouter(prefix='/system', tags=['System'])
 
@@ -12,3 +19,68 @@ router = APIRouter(prefix='/system', tags=['System'])
 async def get():
     """Gets system information, such as the backend version."""
     return {'backend_version': backend_version}
+
+
+@router.get(
+    '/scheduler', summary='Gets the job scheduler state.', response_model=SchedulerInfo
+)
+async def get_scheduler(user: User = Depends(current_user)):
+    """Gets the aggregate queue depth and running executions of the job scheduler,
+    and the queue depth and the mean wait time of the job executions of the current
+    user, while some of their jobs are queued or running."""
+    scheduler = app.state.scheduler
+    stats_by_user = scheduler.get_stats()
+    stats = stats_by_user.get(str(user.id))
+    user_info = None
+    if stats is not None:
+        user_info = UserQueueInfo(
+            user_id=str(user.id),
+            queued=stats.queued,
+            running=stats.running,
+            started=stats.started,
+            mean_wait_time=stats.wait_time / stats.started if stats.started else 0.0,
+        )
+    return SchedulerInfo(
+        max_concurrency=scheduler.max_concurrency,
+        user_concurrency=scheduler.user_concurrency,
+        queue_depth=scheduler.queue_depth,
+        running=scheduler.running,
+        active_users=len(stats_by_user),
+        user=user_info,
+    )
+
+
+@router.get(
+    '/caches',
+    summary='Gets the state of the in-process caches.',
+    response_model=list[CacheInfo],
+)
+async def get_caches():
+    """Gets the number of entries, the estimated memory size in bytes and the number
+    of hits and misses of the caches of the server process."""
+    return [
+        CacheInfo(
+            name=cache.name,
+            entries=len(cache),
+            size=cache.size,
+            max_size=cache.max_size,
+            hits=cache.hits,
+            misses=cache.misses,
+        )
+        for cache in CACHES.values()
+    ]
+
+
+@router.get(
+    '/metrics',
+    summary='Gets the server metrics.',
+    response_class=PlainTextResponse,
+    responses={404: {'description': 'The metrics are disabled.'}},
+)
+async def get_metrics():
+    """Gets the metrics of the server process, in the Prometheus text format."""
+    if not CONFIG.metrics_enabled:
+        raise HTTPException(404, 'The metrics are disabled.')
+    return PlainTextResponse(
+        REGISTRY.render(), media_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -3,30 +3,51 @@
 
 from beanie import PydanticObjectId
 from beanie.operators import Or
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 
+from ..models import Deletion
 from ..models.transforms import Transform, TransformIn
 from ..models.users import User
+from ..responses import NEGOTIATED_RESPONSES, document_response, get_response_media_type
+from ..routing import NegotiatedRoute
 from ..util.current_user import current_user
+from ..util.deletions import start_deletion
+from ..util.etags import get_document_etag, match_etag, not_modified_response, set_etag
+from ..util.mongo import find_read_only
 from ..util.transform_builder import TransformBuilder
+from ..util.transform_cache import get_transform, invalidate_transform
 
-router = APIRouter(prefix='/transforms', tags=['Transforms'])
+router = APIRouter(
+    prefix='/transforms', tags=['Transforms'], route_class=NegotiatedRoute
+)
 
 
-@router.post('', summary='Creates a transform.', response_model=Transform)
-async def create(transform_in: TransformIn, user: User = Depends(current_user)):
+@router.post(
+    '',
+    summary='Creates a transform.',
+    response_model=Transform,
+    responses=NEGOTIATED_RESPONSES,
+)
+async def create(
+    request: Request, transform_in: TransformIn, user: User = Depends(current_user)
+):
     """Creates a new transform in the database."""
     transform = TransformBuilder(transform_in, user).create()
     await transform.create()
-    return transform
+    return document_response(request, transform)
 
 
-@router.get('', summary='Lists transforms.', response_model=list[Transform])
-async def list_(user: User = Depends(current_user)):
+@router.get(
+    '',
+    summary='Lists transforms.',
+    response_model=list[Transform],
+    responses=NEGOTIATED_RESPONSES,
+)
+async def list_(request: Request, user: User = Depends(current_user)):
     """Lists the transforms that are either public or belonging to the current user."""
     criteria = Or(Transform.user_id == user.id, Transform.public == True)  # type: ignore[arg-type]  # noqa: E712, E501
-    transforms = await Transform.find(criteria).to_list()
-    return transforms
+    transforms = await find_read_only(Transform, criteria)
+    return document_response(request, transforms)
 
 
 @router.get(
@@ -34,30 +55,67 @@ async def list_(user: User = Depends(current_user)):
     summary='Gets a transform.',
     response_model=Transform,
     responses={
+        **NEGOTIATED_RESPONSES,
+        304: {'description': 'The transform matches the `If-None-Match` header.'},
         403: {'description': 'Access is not authorized.'},
         404: {'description': 'Unknown transform.'},
     },
 )
-async def get(id: PydanticObjectId, user: User = Depends(current_user)):
-    """Gets the transform specified by its identifier."""
-    transform = await Transform.get(document_id=id)
-    if not transform:
+async def get(
+    request: Request, id: PydanticObjectId, user: User = Depends(current_user)
+):
+    """Gets the transform specified by its identifier.
+
+    Notes:
+        The transforms are immutable and their responses have an entity tag. When it
+        matches the `If-None-Match` header, an empty response of status 304 is
+        returned. The transforms and their serialized responses are cached.
+    """
+    cached_transform = await get_transform(id, read_only=True)
+    if not cached_transform:
         raise HTTPException(404, 'Unknown transform.')
+    transform = cached_transform.transform
     if transform.user_id != user.id and not transform.public:
         raise HTTPException(403, 'Access forbidden.')
-    return transform
+
+    etag = get_document_etag(request, id)
+    matching_etag = match_etag(request, etag)
+    if matching_etag is not None:
+        return not_modified_response(matching_etag)
+    media_type = get_response_media_type(request)
+    response = Response(cached_transform.get_body(media_type), media_type=media_type)
+    set_etag(response, etag)
+    return response
 
 
 @router.delete(
     '/{id}',
     summary='Deletes a transform.',
-    status_code=204,
-    responses={403: {'description': 'Operation is not authorized.'}},
+    status_code=202,
+    response_model=Deletion,
+    responses={
+        403: {'description': 'Operation is not authorized.'},
+        404: {'description': 'The transform does not exist.'},
+    },
 )
-async def delete(id: PydanticObjectId, user: User = Depends(current_user)):
-    """Deletes the transform speficied by its identifier."""
+async def delete(
+    id: PydanticObjectId, response: Response, user: User = Depends(current_user)
+):
+    """Deletes the transform speficied by its identifier.
+
+    The transform is deleted at once, and the deletion of its jobs is executed in the
+    background. Its status is returned, with its URL in the `Location` header.
+    """
     transform = await Transform.get(document_id=id)
-    if transform:
-        if transform.user_id != user.id:
-            raise HTTPException(403, 'Operation forbidden.')
-        await transform.delete()
+    if transform is None:
+        raise HTTPException(404, 'Unknown transform.')
+    if transform.user_id != user.id:
+        raise HTTPException(403, 'Operation forbidden.')
+    await transform.delete()
+    await invalidate_transform(id)
+    assert user.id is not None
+    deletion = Deletion(kind='transform', target_id=id, user_id=user.id)
+    await deletion.create()
+    start_deletion(deletion)
+    response.headers['Location'] = f'/deletions/{deletion.id}'
+    return deletion
@@ -0,0 +1,78 @@
+"""Uploads router.
+"""
+
+from beanie import PydanticObjectId
+from fastapi import APIRouter, Depends, HTTPException, Request
+
+from ..models import Upload, UploadIn, UploadUrl, User
+from ..util.current_user import current_user
+from ..util.uploads import create_upload_url, refresh_upload, store_upload_stream
+
+router = APIRouter(prefix='/uploads', tags=['Uploads'])
+
+
+@router.post(
+    '',
+    summary='Creates an upload.',
+    response_model=UploadUrl,
+    status_code=201,
+)
+async def create(upload_in: UploadIn, user: User = Depends(current_user)):
+    """Creates an upload and returns the presigned URL to which its content is sent
+    with a PUT request, directly to the object store.
+
+    The content can also be streamed through the server, with a PUT request on the
+    upload. The upload can then be referenced by the job inputs, through their
+    `upload_id` property.
+    """
+    upload = Upload(**upload_in.dict(), user_id=user.id)
+    await upload.create()
+    url, expires_at = create_upload_url(upload)
+    return UploadUrl(upload=upload, url=url, expires_at=expires_at)
+
+
+@router.put(
+    '/{id}',
+    summary='Streams the content of an upload.',
+    response_model=Upload,
+    responses={
+        403: {'description': 'Operation is not authorized.'},
+        409: {'description': 'The content of the upload is already sent.'},
+        413: {'description': 'The content exceeds the maximum upload size.'},
+    },
+)
+async def put(
+    id: PydanticObjectId, request: Request, user: User = Depends(current_user)
+):
+    """Stores the request body as the content of an upload, without holding it in
+    memory."""
+    upload = await get_upload(id, user)
+    if upload.status != 'pending':
+        raise HTTPException(409, 'The content of the upload is already sent.')
+    await store_upload_stream(upload, request.stream())
+    return upload
+
+
+@router.get(
+    '/{id}',
+    summary='Gets an upload.',
+    response_model=Upload,
+    responses={
+        403: {'description': 'Operation is not authorized.'},
+        413: {'description': 'The content exceeds the maximum upload size.'},
+    },
+)
+async def get(id: PydanticObjectId, user: User = Depends(current_user)):
+    """Returns an upload, whose status is `ready` once its content is sent."""
+    upload = await get_upload(id, user)
+    await refresh_upload(upload)
+    return upload
+
+
+async def get_upload(id: PydanticObjectId, user: User) -> Upload:
+    upload = await Upload.get(id)
+    if upload is None:
+        raise HTTPException(404, 'Unknown upload.')
+    if upload.user_id != user.id:
+        raise HTTPException(403, 'Access forbidden.')
+    return upload
@@ -3,8 +3,10 @@
 
 from fastapi import APIRouter, Depends, HTTPException, Response
 
+from ..models import Deletion
 from ..models.users import User, UserAuth, UserOut, UserUpdate
 from ..util.current_user import current_user
+from ..util.deletions import start_deletion
 from ..util.password import hash_password
 
 router = APIRouter(prefix='/users', tags=['Users'])
@@ -41,8 +43,24 @@ async def update_user(update: UserUpdate, user: User = Depends(current_user)):
     return user
 
 
-@router.delete('/me', summary='Deletes the current user.')
-async def delete_user(user: User = Depends(current_user)):
-    """Deletes the user specified by the access token."""
-    await user.delete()
-    return Response(status_code=204)
+@router.delete(
+    '/me',
+    summary='Deletes the current user.',
+    status_code=202,
+    response_model=Deletion,
+)
+async def delete_user(response: Response, user: User = Depends(current_user)):
+    """Deletes the user specified by the access token.
+
+    The user is disabled at once, and the deletion of the user transforms, of the
+    user jobs and of the jobs of the user transforms is executed in the background.
+    Its status, returned with its URL in the `Location` header, can be polled until
+    the user is deleted.
+    """
+    assert user.id is not None
+    await user.set({'disabled': True})
+    deletion = Deletion(kind='user', target_id=user.id, user_id=user.id)
+    await deletion.create()
+    start_deletion(deletion)
+    response.headers['Location'] = f'/deletions/{deletion.id}'
+    return deletion
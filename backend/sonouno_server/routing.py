@@ -0,0 +1,50 @@
+"""Routes accepting MessagePack request bodies.
+"""
+
+from collections.abc import Callable, Coroutine
+from typing import Any
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+from .responses import MSGPACK_MEDIA_TYPE, loads_msgpack
+
+__all__ = ['NegotiatedRoute']
+
+
+class NegotiatedRoute(APIRoute):
+    """Route whose request body can be sent in JSON or in MessagePack.
+
+    The MessagePack bodies are decoded before the validation of the route parameters.
+    The numeric arrays packed as extension types are decoded as nested lists.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request) -> Response:
+            content_type = request.headers.get('content-type', '')
+            if content_type.split(';')[0].strip() == MSGPACK_MEDIA_TYPE:
+                request = MsgPackRequest(request)
+            return await handler(request)
+
+        return route_handler
+
+
+class MsgPackRequest(Request):
+    """Request whose MessagePack body is handed to FastAPI as a decoded JSON body."""
+
+    def __init__(self, request: Request):
+        # FastAPI only decodes the bodies of JSON content type
+        headers = [
+            (name, value)
+            for name, value in request.scope['headers']
+            if name != b'content-type'
+        ]
+        headers.append((b'content-type', b'application/json'))
+        super().__init__(dict(request.scope, headers=headers), request.receive)
+
+    async def json(self) -> Any:
+        if not hasattr(self, '_json'):
+            self._json = loads_msgpack(await self.body(), ndarray_as_list=True)
+        return self._json
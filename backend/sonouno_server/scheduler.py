@@ -0,0 +1,187 @@
+"""Fair-share scheduling of the job executions.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import Counter, defaultdict, deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+from .metrics import (
+    SCHEDULER_QUEUE_DEPTH,
+    SCHEDULER_USER_QUEUE_DEPTH,
+    SCHEDULER_WAIT_SECONDS,
+)
+from .types import JobPriority
+
+__all__ = ['JobScheduler']
+
+PRIORITIES: tuple[JobPriority, ...] = ('interactive', 'bulk')
+
+
+@dataclass
+class _Ticket:
+    user_id: str
+    weight: float
+    enqueued_at: float
+    future: asyncio.Future = field(repr=False)
+
+
+@dataclass
+class UserQueueStats:
+    """Queue statistics of a user, kept while the user has queued or running
+    executions."""
+
+    queued: int = 0
+    running: int = 0
+    started: int = 0
+    wait_time: float = 0.0
+
+
+class JobScheduler:
+    """In-memory fair-share scheduler of the job executions.
+
+    The executions are granted an execution slot according to the following policy:
+        * at most `max_concurrency` jobs are executed at the same time,
+        * at most `user_concurrency` jobs of a given user are executed at the same time,
+        * the queued interactive jobs are executed before the bulk ones,
+        * within a priority class, the users are served by weighted fair queuing
+          (start-time fair queuing), so that a user submitting many jobs does not
+          starve the others.
+    """
+
+    def __init__(self, max_concurrency: int, user_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self.user_concurrency = user_concurrency
+        self._queues: dict[JobPriority, dict[str, deque[_Ticket]]] = {
+            p: {} for p in PRIORITIES
+        }
+        self._running: Counter[str] = Counter()
+        self._total_running = 0
+        self._queue_depth = 0
+        self._finish_tags: dict[str, float] = {}
+        self._virtual_time = 0.0
+        self._stats: defaultdict[str, UserQueueStats] = defaultdict(UserQueueStats)
+
+    @asynccontextmanager
+    async def slot(
+        self, user_id: str, priority: JobPriority = 'interactive', weight: float = 1.0
+    ) -> AsyncIterator[None]:
+        """Waits for an execution slot, which is released upon exit.
+
+        Arguments:
+            user_id: The user requesting the execution.
+            priority: The priority class of the execution.
+            weight: The share of the user, relative to the other users.
+        """
+        future = asyncio.get_running_loop().create_future()
+        ticket = _Ticket(user_id, weight, time.monotonic(), future)
+        self._queues[priority].setdefault(user_id, deque()).append(ticket)
+        self._update_queue_depth(user_id, 1)
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.cancelled():
+                self._remove(priority, ticket)
+            else:
+                self._release(user_id)
+            raise
+
+        try:
+            yield
+        finally:
+            self._release(user_id)
+
+    def get_stats(self) -> dict[str, UserQueueStats]:
+        """Returns the queue statistics of the users having queued or running
+        executions."""
+        return dict(self._stats)
+
+    @property
+    def queue_depth(self) -> int:
+        """Returns the number of queued executions."""
+        return self._queue_depth
+
+    @property
+    def running(self) -> int:
+        """Returns the number of running executions."""
+        return self._total_running
+
+    def _dispatch(self) -> None:
+        """Grants execution slots to the queued executions."""
+        while self._total_running < self.max_concurrency:
+            ticket = self._pop_next_ticket()
+            if ticket is None:
+                return
+            user_id = ticket.user_id
+            self._running[user_id] += 1
+            self._total_running += 1
+            self._update_queue_depth(user_id, -1)
+            wait_time = time.monotonic() - ticket.enqueued_at
+            SCHEDULER_WAIT_SECONDS.observe(wait_time, user=user_id)
+            stats = self._stats[user_id]
+            stats.running += 1
+            stats.started += 1
+            stats.wait_time += wait_time
+            ticket.future.set_result(None)
+
+    def _pop_next_ticket(self) -> _Ticket | None:
+        """Returns the next execution to be granted a slot, if any."""
+        for priority in PRIORITIES:
+            queues = self._queues[priority]
+            candidates = [u for u in queues if self._running[u] < self.user_concurrency]
+            if not candidates:
+                continue
+            user_id = min(candidates, key=self._get_start_tag)
+            queue = queues[user_id]
+            ticket = queue.popleft()
+            if not queue:
+                del queues[user_id]
+            start_tag = self._get_start_tag(user_id)
+            self._virtual_time = start_tag
+            self._finish_tags[user_id] = start_tag + 1 / ticket.weight
+            return ticket
+        return None
+
+    def _get_start_tag(self, user_id: str) -> float:
+        return max(self._virtual_time, self._finish_tags.get(user_id, 0.0))
+
+    def _remove(self, priority: JobPriority, ticket: _Ticket) -> None:
+        """Removes a cancelled execution from the queue."""
+        queue = self._queues[priority][ticket.user_id]
+        queue.remove(ticket)
+        if not queue:
+            del self._queues[priority][ticket.user_id]
+        self._update_queue_depth(ticket.user_id, -1)
+        self._prune_stats(ticket.user_id)
+
+    def _update_queue_depth(self, user_id: str, increment: int) -> None:
+        stats = self._stats[user_id]
+        stats.queued += increment
+        self._queue_depth += increment
+        SCHEDULER_USER_QUEUE_DEPTH.set(stats.queued, user=user_id)
+        SCHEDULER_QUEUE_DEPTH.set(self._queue_depth)
+
+    def _release(self, user_id: str) -> None:
+        """Releases the execution slot of a user."""
+        self._running[user_id] -= 1
+        if not self._running[user_id]:
+            del self._running[user_id]
+        self._total_running -= 1
+        self._stats[user_id].running -= 1
+        self._prune_stats(user_id)
+        if self._finish_tags.get(user_id, 0.0) <= self._virtual_time:
+            # the finish tag no longer affects the user's start tags
+            self._finish_tags.pop(user_id, None)
+        self._dispatch()
+
+    def _prune_stats(self, user_id: str) -> None:
+        """Drops the statistics of a user without queued or running executions, so
+        that they do not accumulate for every user who has submitted a job."""
+        stats = self._stats[user_id]
+        if not stats.queued and not stats.running:
+            del self._stats[user_id]
@@ -0,0 +1,247 @@
+"""Span-based tracing of the job pipeline.
+
+The spans follow the OpenTelemetry model: a trace is a tree of timed spans sharing a
+trace identifier. The current span is stored in a context variable, so that the spans
+started in a request, and in the threads it delegates work to, are nested. The trace
+context is propagated to the worker processes in the W3C `traceparent` format.
+
+The finished spans are exported as JSON lines to the console or to a local file
+(setting `TRACING_EXPORTER`). The traces are sampled at their root span, with the
+probability given by the setting `TRACING_SAMPLE_RATE`. When the exporter is `none`,
+the tracing functions return immediately.
+"""
+
+from __future__ import annotations
+
+import abc
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import sys
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Any, ContextManager, TypeVar
+
+from .config import CONFIG
+
+__all__ = [
+    'Span',
+    'attach_traceparent',
+    'get_current_span',
+    'get_traceparent',
+    'set_span_attributes',
+    'span',
+    'traced',
+]
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Span:
+    """A timed operation of a trace."""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None = None
+    sampled: bool = True
+    attributes: dict[str, Any] = field(default_factory=dict)
+    start_time: float = 0.0
+    end_time: float = 0.0
+    status: str = 'ok'
+    error: str | None = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Sets an attribute of the span, such as a document identifier."""
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start_time': self.start_time,
+            'duration': self.end_time - self.start_time,
+            'status': self.status,
+            'error': self.error,
+            'pid': os.getpid(),
+            'attributes': self.attributes,
+        }
+
+
+class SpanExporter(abc.ABC):
+    """Base class of the span exporters."""
+
+    @abc.abstractmethod
+    def export(self, span: Span) -> None:
+        """Exports a finished span."""
+
+
+class ConsoleSpanExporter(SpanExporter):
+    """Writes the spans as JSON lines to the standard error."""
+
+    def export(self, span: Span) -> None:
+        print(json.dumps(span.to_dict(), default=str), file=sys.stderr, flush=True)
+
+
+class FileSpanExporter(SpanExporter):
+    """Appends the spans as JSON lines to a file.
+
+    The file is opened for each span, so that the spans of the worker processes are
+    written even if they exit abruptly.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str) + '\n'
+        with self._lock, open(self.path, 'a') as file:
+            file.write(line)
+
+
+def create_exporter(name: str) -> SpanExporter | None:
+    """Returns the span exporter specified by the setting `TRACING_EXPORTER`."""
+    if name == 'none':
+        return None
+    if name == 'console':
+        return ConsoleSpanExporter()
+    if name == 'file':
+        return FileSpanExporter(CONFIG.tracing_file)
+    raise ValueError(f'Invalid tracing exporter: {name!r}.')
+
+
+EXPORTER = create_exporter(CONFIG.tracing_exporter)
+
+current_span: ContextVar[Span | None] = ContextVar('current_span', default=None)
+
+
+def get_current_span() -> Span | None:
+    """Returns the current span, or None outside of a trace."""
+    return current_span.get()
+
+
+def set_span_attributes(**attributes: Any) -> None:
+    """Sets attributes of the current span, if any."""
+    current = current_span.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+def span(name: str, **attributes: Any) -> ContextManager[Span | None]:
+    """Returns a context manager timing a span, child of the current span.
+
+    Arguments:
+        name: The span name, such as `job.replace`.
+        attributes: The attributes of the span.
+    """
+    if EXPORTER is None:
+        return nullcontext()
+    return _span(name, attributes)
+
+
+@contextmanager
+def _span(name: str, attributes: dict[str, Any]) -> Iterator[Span]:
+    parent = current_span.get()
+    if parent is None:
+        new_span = Span(
+            name,
+            _generate_id(16),
+            _generate_id(8),
+            sampled=random.random() < CONFIG.tracing_sample_rate,
+        )
+    else:
+        new_span = Span(
+            name,
+            parent.trace_id,
+            _generate_id(8),
+            parent_id=parent.span_id,
+            sampled=parent.sampled,
+        )
+    new_span.attributes.update(attributes)
+    token = current_span.set(new_span)
+    new_span.start_time = time.time()
+    try:
+        yield new_span
+    except BaseException as exc:
+        new_span.status = 'error'
+        new_span.error = f'{type(exc).__name__}: {exc}'
+        raise
+    finally:
+        new_span.end_time = time.time()
+        current_span.reset(token)
+        if new_span.sampled:
+            _export(new_span)
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """Decorator timing the calls of a function, sync or async, in a span."""
+
+    def decorator(func: F) -> F:
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **keywords: Any) -> Any:
+                with span(name):
+                    return await func(*args, **keywords)
+
+            return async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **keywords: Any) -> Any:
+            with span(name):
+                return func(*args, **keywords)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def get_traceparent() -> str | None:
+    """Returns the context of the current span in the W3C `traceparent` format."""
+    parent = current_span.get()
+    if parent is None:
+        return None
+    flags = '01' if parent.sampled else '00'
+    return f'00-{parent.trace_id}-{parent.span_id}-{flags}'
+
+
+def attach_traceparent(traceparent: str | None) -> None:
+    """Sets the remote span of a `traceparent` as the current span.
+
+    It is used by the worker processes, so that their spans belong to the trace of
+    the request that created the job.
+    """
+    if EXPORTER is None or traceparent is None:
+        return
+    try:
+        _, trace_id, span_id, flags = traceparent.split('-')
+    except ValueError:
+        logger.warning(f'Invalid traceparent: {traceparent!r}')
+        return
+    remote_span = Span('remote', trace_id, span_id, sampled=flags == '01')
+    current_span.set(remote_span)
+
+
+def _export(span: Span) -> None:
+    assert EXPORTER is not None
+    try:
+        EXPORTER.export(span)
+    except Exception as exc:
+        logger.warning(f'The span {span.name!r} could not be exported: {exc}')
+
+
+def _generate_id(size: int) -> str:
+    return random.getrandbits(8 * size).to_bytes(size, 'big').hex()
@@ -5,15 +5,28 @@ from typing import Any, Literal, TypedDict
 
 __all__ = [
     'AnyType',
+    'DeletionKind',
+    'DeletionStatus',
     'JSONSchemaType',
     'JSONType',
+    'JobPriority',
+    'JobStatus',
     'MediaEncoding',
     'TransferType',
+    'UploadStatus',
 ]
 
 AnyType = Any
 
-TransferType = Literal['ignore', 'json', 'uri']
+TransferType = Literal['ignore', 'json', 'uri', 'auto']
+
+JobPriority = Literal['interactive', 'bulk']
+JobStatus = Literal['queued', 'running', 'done', 'failed']
+
+DeletionKind = Literal['transform', 'user']
+DeletionStatus = Literal['queued', 'running', 'done', 'failed']
+
+UploadStatus = Literal['pending', 'ready']
 
 # mypy does not support recursive types (https://github.com/python/mypy/issues/731)
 # JSONType = bool | int | float | str | dict[str, 'JSONType'] | list['JSONType'] | None
@@ -52,6 +65,7 @@ JSONSchemaType = TypedDict(
         'maxContains': int,
         'minContains': int,
         # Validation Keywords for Objects
+        'properties': dict[str, Any],  # should be 'JSONSchemaType'
         'maxProperties': int,
         'minProperties': int,
         'required': list[str],
@@ -63,6 +77,7 @@ JSONSchemaType = TypedDict(
         'contentEncoding': str,
         'contentSchema': dict[str, Any],  # should be 'JSONSchemaType'
         'x-contentMediaEncoding': MediaEncoding,
+        'x-typedArray': bool,
         # Basic Meta-Data Annotations
         'title': str,
         'description': str,
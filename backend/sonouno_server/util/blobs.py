@@ -0,0 +1,59 @@
+"""Reference counting of the content-addressed job outputs.
+
+The job outputs stored in MinIO under the hash of their content (see `store_blob`)
+can be shared by several jobs. The number of job outputs referencing each of them is
+counted in the `Blob` collection, so that they can be removed from the bucket once they
+are no longer referenced.
+"""
+
+from collections import Counter
+from collections.abc import Iterator
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from ..models import Blob, Job
+from .io import BLOB_PREFIX, get_object_name
+
+__all__ = ['add_blob_references', 'iter_blob_names', 'remove_blob_references']
+
+
+def iter_blob_names(job: Job) -> Iterator[str]:
+    """Iterates over the names of the blobs referenced by the outputs of a job."""
+    for output in job.outputs:
+        if output.transfer != 'uri' or not isinstance(output.value, str):
+            continue
+        name = get_object_name(output.value)
+        if name is not None and name.startswith(BLOB_PREFIX):
+            yield name
+
+
+async def add_blob_references(job: Job) -> None:
+    """Increments the reference counts of the blobs of a job outputs."""
+    await update_ref_counts(Counter(iter_blob_names(job)))
+
+
+async def remove_blob_references(*jobs: Job) -> None:
+    """Decrements the reference counts of the blobs of jobs outputs."""
+    counts = Counter(name for job in jobs for name in iter_blob_names(job))
+    await update_ref_counts({name: -count for name, count in counts.items()})
+
+
+async def update_ref_counts(increments: dict[str, int]) -> None:
+    """Updates the reference counts of blobs, creating the missing manifests."""
+    if not increments:
+        return
+    now = datetime.utcnow()
+    requests = [
+        UpdateOne(
+            {'name': name},
+            {
+                '$inc': {'ref_count': increment},
+                '$set': {'updated_at': now},
+                '$setOnInsert': {'created_at': now},
+            },
+            upsert=True,
+        )
+        for name, increment in increments.items()
+    ]
+    await Blob.get_motor_collection().bulk_write(requests, ordered=False)
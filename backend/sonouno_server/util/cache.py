@@ -0,0 +1,150 @@
+"""In-process caches, bounded by memory, and their invalidation across processes.
+
+Each server process has its own caches. When an entry becomes invalid, for instance
+because the cached document is deleted, the invalidation is stored in the
+`CacheInvalidation` collection, which is polled by the other server processes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Generic, TypeVar
+
+from ..metrics import CACHE_ENTRIES, CACHE_REQUESTS, CACHE_SIZE_BYTES
+from ..models import CacheInvalidation
+
+__all__ = ['LRUCache', 'invalidate', 'poll_invalidations']
+
+V = TypeVar('V')
+
+logger = logging.getLogger(__name__)
+
+# the caches that can be invalidated by the other server processes, by name
+CACHES: dict[str, LRUCache] = {}
+
+
+class LRUCache(Generic[V]):
+    """Least recently used cache, bounded by the estimated memory size of its entries.
+
+    Attributes:
+        name: The cache name, used in the metrics and the invalidations.
+        max_size: The maximum memory size of the entries, in bytes. The cache is
+            disabled when it is zero.
+        size: The memory size of the entries, in bytes.
+        hits: The number of lookups of cached entries.
+        misses: The number of lookups of entries that are not cached.
+    """
+
+    def __init__(self, name: str, max_size: int):
+        if name in CACHES:
+            raise ValueError(f'Duplicate cache: {name!r}.')
+        self.name = name
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[V, int]] = OrderedDict()
+        CACHES[name] = self
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> V | None:
+        """Returns the value of an entry, or None if it is not cached."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            CACHE_REQUESTS.inc(cache=self.name, result='miss')
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        CACHE_REQUESTS.inc(cache=self.name, result='hit')
+        return entry[0]
+
+    def set(self, key: str, value: V, size: int) -> None:
+        """Adds or replaces an entry, evicting the least recently used ones.
+
+        Arguments:
+            key: The entry key.
+            value: The entry value.
+            size: The estimated memory size of the entry, in bytes. The entries larger
+                than the cache are not cached.
+        """
+        self._remove(key)
+        if size <= self.max_size:
+            self._entries[key] = value, size
+            self.size += size
+            while self.size > self.max_size:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+        self._update_metrics()
+
+    def resize(self, key: str, size: int) -> None:
+        """Updates the memory size of an entry, if it is still cached."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.set(key, entry[0], size)
+
+    def pop(self, key: str) -> None:
+        """Removes an entry, if it is cached."""
+        self._remove(key)
+        self._update_metrics()
+
+    def clear(self) -> None:
+        """Removes all the entries."""
+        self._entries.clear()
+        self.size = 0
+        self._update_metrics()
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def _update_metrics(self) -> None:
+        CACHE_SIZE_BYTES.set(self.size, cache=self.name)
+        CACHE_ENTRIES.set(len(self._entries), cache=self.name)
+
+
+async def invalidate(cache: LRUCache, *keys: str) -> None:
+    """Removes entries from a cache, in all the server processes."""
+    if not keys:
+        return
+    for key in keys:
+        cache.pop(key)
+    await CacheInvalidation.insert_many(
+        [CacheInvalidation(cache=cache.name, key=key) for key in keys]
+    )
+
+
+async def poll_invalidations(interval: float) -> None:
+    """Applies the invalidations of the other server processes, until cancelled.
+
+    The invalidations are idempotent: to account for the clock differences and the
+    ongoing insertions, the polling intervals overlap.
+
+    Arguments:
+        interval: The polling interval, in seconds.
+    """
+    since = datetime.utcnow()
+    while True:
+        await asyncio.sleep(interval)
+        now = datetime.utcnow()
+        try:
+            await apply_invalidations(since)
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning(f'Cannot poll the cache invalidations: {exc}')
+            continue
+        since = now - timedelta(seconds=interval)
+
+
+async def apply_invalidations(since: datetime) -> None:
+    """Applies the invalidations created since a given date and time."""
+    query = CacheInvalidation.find(CacheInvalidation.created_at >= since)
+    async for invalidation in query:
+        cache = CACHES.get(invalidation.cache)
+        if cache is not None:
+            cache.pop(invalidation.key)
@@ -8,7 +8,15 @@ from ..models.users import User
 
 
 async def current_user(auth: AuthJWT = Depends()) -> User:
-    """Returns the current authorized user."""
+    """Returns the current authorized user, who must not be disabled."""
+    user = await current_user_even_disabled(auth)
+    if user.disabled:
+        raise HTTPException(403, 'Your account is disabled.')
+    return user
+
+
+async def current_user_even_disabled(auth: AuthJWT = Depends()) -> User:
+    """Returns the current authorized user, such as a user being deleted."""
     auth.jwt_required()
     user = await User.by_email(auth.get_jwt_subject())
     if user is None:
@@ -0,0 +1,162 @@
+"""Immutable datasets, addressed by the SHA-256 digest of their content.
+
+A dataset is created from a ready upload: its content is copied within the object store
+to a temporary object of the datasets bucket, which is hashed and renamed to its
+digest, unless an identical dataset exists. Since the copy is hashed, the content sent
+to the upload URL while it is still valid cannot alter a dataset. The job inputs
+reference the datasets by digest. The job workers download them once to the on-disk
+cache of the host (`DATASET_CACHE_DIR`), shared by the workers and bounded by
+`DATASET_CACHE_MAX_SIZE`, so that the repeated jobs on a dataset do not fetch it again.
+A dataset evicted by another worker before it is opened is fetched again. The NumPy
+arrays saved in the `.npy` format are passed to the transforms as read-only
+memory-mapped arrays, the other contents as file paths.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from functools import partial
+from typing import Any
+from uuid import uuid4
+
+import numpy
+from beanie.operators import In
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from minio import Minio
+from minio.commonconfig import CopySource
+from pymongo.errors import DuplicateKeyError
+
+from ..app import app
+from ..config import CONFIG
+from ..models import Dataset, JobIn, Upload
+from .disk_cache import DiskCache
+from .uploads import UPLOADS_BUCKET
+
+__all__ = [
+    'DATASETS_BUCKET',
+    'check_job_datasets',
+    'create_dataset',
+    'get_dataset_cache',
+    'materialize_dataset',
+]
+
+DATASETS_BUCKET = 'datasets'
+TEMPORARY_PREFIX = 'tmp/'
+HASH_CHUNK_SIZE = 2**20
+MATERIALIZE_ATTEMPTS = 3
+NPY_MAGIC = b'\x93NUMPY'
+
+
+async def create_dataset(upload: Upload) -> tuple[Dataset, bool]:
+    """Creates the dataset of the content of a ready upload.
+
+    Returns:
+        The dataset, and true if it is created, false if an identical one exists.
+    """
+    client = app.state.minio
+    temporary_name = f'{TEMPORARY_PREFIX}{upload.object_name}-{uuid4().hex}'
+    source = CopySource(UPLOADS_BUCKET, upload.object_name)
+    await run_in_threadpool(client.copy_object, DATASETS_BUCKET, temporary_name, source)
+    try:
+        return await create_dataset_from_copy(upload, temporary_name)
+    finally:
+        await run_in_threadpool(client.remove_object, DATASETS_BUCKET, temporary_name)
+
+
+async def create_dataset_from_copy(
+    upload: Upload, temporary_name: str
+) -> tuple[Dataset, bool]:
+    """Creates the dataset of the temporary copy of the content of an upload."""
+    client = app.state.minio
+    digest = await run_in_threadpool(hash_object, DATASETS_BUCKET, temporary_name)
+    dataset = await Dataset.find_one(Dataset.digest == digest)
+    if dataset is not None:
+        return dataset, False
+
+    source = CopySource(DATASETS_BUCKET, temporary_name)
+    await run_in_threadpool(client.copy_object, DATASETS_BUCKET, digest, source)
+    stat = await run_in_threadpool(client.stat_object, DATASETS_BUCKET, digest)
+    dataset = Dataset(
+        digest=digest,
+        content_type=upload.content_type,
+        size=stat.size,
+        user_id=upload.user_id,
+    )
+    try:
+        await dataset.insert()
+    except DuplicateKeyError:
+        existing_dataset = await Dataset.find_one(Dataset.digest == digest)
+        assert existing_dataset is not None
+        return existing_dataset, False
+    return dataset, True
+
+
+def hash_object(bucket_name: str, object_name: str) -> str:
+    """Returns the SHA-256 digest of the content of an object, read by chunks."""
+    response = app.state.minio.get_object(bucket_name, object_name)
+    digest = hashlib.sha256()
+    try:
+        for chunk in iter(partial(response.read, HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    finally:
+        response.close()
+    return digest.hexdigest()
+
+
+async def check_job_datasets(job_in: JobIn) -> None:
+    """Checks that the datasets referenced by the job inputs exist.
+
+    Raises:
+        HTTPException: When a dataset is unknown.
+    """
+    digests = {i.dataset_digest for i in job_in.inputs if i.dataset_digest is not None}
+    if not digests:
+        return
+    datasets = await Dataset.find(In(Dataset.digest, list(digests))).to_list()
+    missing_digests = digests - {dataset.digest for dataset in datasets}
+    if missing_digests:
+        raise HTTPException(
+            400, f"Unknown dataset(s): {', '.join(sorted(missing_digests))}."
+        )
+
+
+def get_dataset_cache() -> DiskCache:
+    """Returns the on-disk cache of the datasets of the host."""
+    return DiskCache(
+        CONFIG.dataset_cache_dir,
+        CONFIG.dataset_cache_max_size,
+        partial_lifetime=CONFIG.job_max_wall_time,
+    )
+
+
+def materialize_dataset(client: Minio, digest: str) -> Any:
+    """Returns the content of a dataset, in the job worker, from the on-disk cache.
+
+    Arguments:
+        client: The MinIO client of the job worker, fetching the uncached dataset.
+        digest: The dataset digest.
+
+    Returns:
+        A read-only memory-mapped array, for the NumPy arrays saved in the `.npy`
+        format, otherwise the path of the cached file.
+    """
+    cache = get_dataset_cache()
+    fetch = partial(client.fget_object, DATASETS_BUCKET, digest)
+    for _ in range(MATERIALIZE_ATTEMPTS - 1):
+        try:
+            return load_dataset(cache.get_path(digest, fetch))
+        except FileNotFoundError:
+            # evicted by another worker before it is opened
+            pass
+    return load_dataset(cache.get_path(digest, fetch))
+
+
+def load_dataset(path: str) -> Any:
+    """Memory-maps a cached dataset file if it is a NumPy array, otherwise returns its
+    path."""
+    with open(path, 'rb') as f:
+        magic = f.read(len(NPY_MAGIC))
+    if magic == NPY_MAGIC:
+        return numpy.load(path, mmap_mode='r')
+    return path
@@ -0,0 +1,118 @@
+"""Cascade deletions of the transforms and users, executed in the background.
+
+The deleted transform is removed at once, and the deleted user is disabled, so that no
+new job depends on them. Their jobs and the job outputs are then deleted in batches of
+`CASCADE_BATCH_SIZE`, separated by `CASCADE_BATCH_INTERVAL` seconds, so that the
+cascade does not monopolize the database and the object store. The progress is
+recorded in the `Deletion` document, which is returned to the client.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from beanie import PydanticObjectId
+
+from ..config import CONFIG
+from ..models import Deletion, Transform, User
+from .reaper import delete_jobs
+from .transform_cache import invalidate_transform
+from .uploads import delete_user_uploads
+
+__all__ = ['resume_deletions', 'start_deletion']
+
+logger = logging.getLogger(__name__)
+
+# the deletions in progress, which must be referenced to not be garbage collected
+TASKS: set[asyncio.Task] = set()
+
+
+def start_deletion(deletion: Deletion) -> None:
+    """Executes a cascade deletion in the background."""
+    task = asyncio.create_task(run_deletion(deletion))
+    TASKS.add(task)
+    task.add_done_callback(TASKS.discard)
+
+
+async def resume_deletions() -> None:
+    """Resumes the cascade deletions interrupted by a server shutdown.
+
+    The deletions without progress during the reaper lease are considered interrupted.
+    They are claimed by updating their progress date, so that they are resumed by a
+    single server process.
+    """
+    now = datetime.utcnow()
+    query = {
+        'status': {'$in': ['queued', 'running']},
+        'updated_at': {'$lt': now - timedelta(seconds=CONFIG.reaper_lease)},
+    }
+    collection = Deletion.get_motor_collection()
+    async for document in collection.find(query, {'_id': True}):
+        result = await collection.update_one(
+            {'_id': document['_id'], **query}, {'$set': {'updated_at': now}}
+        )
+        if result.modified_count:
+            deletion = await Deletion.get(document['_id'])
+            if deletion is not None:
+                logger.info(f'Resuming the deletion {deletion.id}.')
+                start_deletion(deletion)
+
+
+async def run_deletion(deletion: Deletion) -> None:
+    """Executes a cascade deletion, recording its status."""
+    deletion.status = 'running'
+    await update_progress(deletion)
+    try:
+        if deletion.kind == 'transform':
+            await delete_transform_cascade(deletion)
+        else:
+            await delete_user_cascade(deletion)
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.exception(f'The deletion {deletion.id} failed.')
+        deletion.status = 'failed'
+        deletion.error = str(exc)
+    else:
+        deletion.status = 'done'
+    deletion.done_at = datetime.utcnow()
+    await update_progress(deletion)
+
+
+async def delete_transform_cascade(deletion: Deletion) -> None:
+    """Deletes the jobs of a deleted transform."""
+    await delete_jobs_in_batches(deletion, {'transform_id': deletion.target_id})
+
+
+async def delete_user_cascade(deletion: Deletion) -> None:
+    """Deletes the transforms of a disabled user, the jobs of the user and those of
+    the user transforms, the user uploads, and then the user."""
+    user_id = deletion.target_id
+    collection = Transform.get_motor_collection()
+    cursor = collection.find({'user_id': user_id}, {'_id': True})
+    transform_ids = [document['_id'] async for document in cursor]
+    await collection.delete_many({'_id': {'$in': transform_ids}})
+    for transform_id in transform_ids:
+        await invalidate_transform(PydanticObjectId(transform_id))
+
+    query = {'$or': [{'user_id': user_id}, {'transform_id': {'$in': transform_ids}}]}
+    await delete_jobs_in_batches(deletion, query)
+    await delete_user_uploads(user_id)
+    await User.get_motor_collection().delete_one({'_id': user_id})
+
+
+async def delete_jobs_in_batches(deletion: Deletion, query: dict) -> None:
+    """Deletes jobs in rate-limited batches, recording the progress."""
+    while True:
+        count = await delete_jobs(query, CONFIG.cascade_batch_size, datetime.utcnow())
+        if not count:
+            return
+        deletion.deleted_jobs += count
+        await update_progress(deletion)
+        await asyncio.sleep(CONFIG.cascade_batch_interval)
+
+
+async def update_progress(deletion: Deletion) -> None:
+    """Stores the status and the progress of a deletion."""
+    deletion.updated_at = datetime.utcnow()
+    await deletion.replace()
@@ -0,0 +1,102 @@
+"""On-disk cache, bounded by the size of its files and shared by processes.
+
+The cache is a directory, in which each entry is a file. The entries are fetched to
+temporary files, which are atomically renamed, so that several processes can use the
+same directory without locking. The modification time of the files records their last
+use: when a fetch makes the cache exceed its maximum size, the least recently used
+files are removed. The files already opened or memory-mapped by a process remain
+readable by it after their removal.
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+from collections.abc import Callable
+from contextlib import suppress
+
+__all__ = ['DiskCache']
+
+PARTIAL_PREFIX = '.partial-'
+
+
+class DiskCache:
+    """Least recently used cache of files, bounded by their size.
+
+    Attributes:
+        directory: The cache directory, created on the first fetch.
+        max_size: The maximum size of the files, in bytes. The last fetched file is
+            kept even if it exceeds it.
+        partial_lifetime: The age in seconds after which the temporary files of the
+            interrupted fetches are removed.
+    """
+
+    def __init__(self, directory: str, max_size: int, partial_lifetime: float = 3600):
+        self.directory = directory
+        self.max_size = max_size
+        self.partial_lifetime = partial_lifetime
+
+    def get_path(self, name: str, fetch: Callable[[str], None]) -> str:
+        """Returns the path of a cache entry, fetching it if it is not cached.
+
+        Arguments:
+            name: The entry name, which must be a valid file name.
+            fetch: The function writing the entry content to the given path.
+
+        Returns:
+            The path of the entry file.
+        """
+        path = os.path.join(self.directory, name)
+        try:
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            pass
+
+        os.makedirs(self.directory, exist_ok=True)
+        fd, partial_path = tempfile.mkstemp(dir=self.directory, prefix=PARTIAL_PREFIX)
+        os.close(fd)
+        try:
+            fetch(partial_path)
+            os.replace(partial_path, path)
+        except BaseException:
+            with suppress(FileNotFoundError):
+                os.unlink(partial_path)
+            raise
+        self.evict(keep=name)
+        return path
+
+    def evict(self, keep: str | None = None) -> None:
+        """Removes the least recently used files beyond the maximum size, and the
+        stale temporary files.
+
+        Arguments:
+            keep: The name of an entry that is not removed.
+        """
+        entries = []
+        partial_deadline = time.time() - self.partial_lifetime
+        with os.scandir(self.directory) as scanned_entries:
+            for entry in scanned_entries:
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.name.startswith(PARTIAL_PREFIX):
+                    if stat.st_mtime < partial_deadline:
+                        self.remove(entry.name)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.name))
+
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, name in sorted(entries):
+            if size <= self.max_size:
+                break
+            if name == keep:
+                continue
+            self.remove(name)
+            size -= entry_size
+
+    def remove(self, name: str) -> None:
+        with suppress(FileNotFoundError):
+            os.unlink(os.path.join(self.directory, name))
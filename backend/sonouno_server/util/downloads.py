@@ -0,0 +1,108 @@
+"""Presigned download URLs of the stored job outputs.
+
+The jobs bucket is private: the URIs stored in the jobs are replaced in the responses
+by URLs of the public MinIO endpoint, presigned for `PRESIGNED_URL_EXPIRY` seconds, so
+that the clients download the outputs directly from the object store.
+
+The URLs are signed for fixed time windows, starting at multiples of the expiry minus
+`PRESIGNED_URL_MIN_VALIDITY`: the URL of an object is the same during a window, in
+all the server processes, and remains valid for at least the minimum validity. The
+signatures are cached during their window.
+"""
+
+from __future__ import annotations
+
+import time
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+from minio import Minio
+
+from ..config import CONFIG
+from ..models import Job, OutputWithValue
+from .cache import LRUCache
+from .io import get_object_name
+from .minio import create_presign_client
+
+__all__ = ['SIGNATURE_CACHE', 'get_signing_window', 'presign_job', 'presign_uri']
+
+# memory size of a cache entry, without its URL
+ENTRY_OVERHEAD = 200
+
+SIGNATURE_CACHE: LRUCache[str] = LRUCache('signatures', CONFIG.signature_cache_max_size)
+
+
+def get_signing_window() -> int | None:
+    """Returns the index of the current signing window, or None if the URLs are not
+    presigned."""
+    if not CONFIG.presigned_urls:
+        return None
+    return int(time.time()) // get_window_duration()
+
+
+def get_window_duration() -> int:
+    """Returns the duration of the signing windows, in seconds."""
+    return max(CONFIG.presigned_url_expiry - CONFIG.presigned_url_min_validity, 1)
+
+
+@lru_cache
+def get_presign_client() -> Minio:
+    return create_presign_client()
+
+
+def presign_uri(uri: str, window: int) -> str:
+    """Returns the presigned URL of a URI of the jobs bucket.
+
+    Arguments:
+        uri: The URI of the object, as stored in the job.
+        window: The index of the signing window.
+
+    Returns:
+        The presigned URL, or the URI itself if it is not that of an object of the
+        jobs bucket.
+    """
+    name = get_object_name(uri)
+    if name is None:
+        return uri
+    key = f'{window}:{name}'
+    url = SIGNATURE_CACHE.get(key)
+    if url is None:
+        request_date = datetime.fromtimestamp(
+            window * get_window_duration(), timezone.utc
+        )
+        url = get_presign_client().presigned_get_object(
+            'jobs',
+            name,
+            expires=timedelta(seconds=CONFIG.presigned_url_expiry),
+            request_date=request_date,
+        )
+        SIGNATURE_CACHE.set(key, url, ENTRY_OVERHEAD + len(url))
+    return url
+
+
+def presign_job(job: Job, window: int | None = None) -> Job:
+    """Returns a copy of a job, in which the URIs of the stored outputs and of the
+    profile statistics are replaced by presigned URLs.
+
+    Arguments:
+        job: The job, as stored in the database.
+        window: The index of the signing window, by default the current one.
+    """
+    if window is None:
+        window = get_signing_window()
+        if window is None:
+            return job
+    update: dict[str, object] = {
+        'outputs': [presign_output(output, window) for output in job.outputs]
+    }
+    profile = job.execution_profile
+    if profile is not None and profile.stats_uri is not None:
+        stats_uri = presign_uri(profile.stats_uri, window)
+        update['execution_profile'] = profile.copy(update={'stats_uri': stats_uri})
+    return job.copy(update=update)
+
+
+def presign_output(output: OutputWithValue, window: int) -> OutputWithValue:
+    if output.transfer != 'uri' or not isinstance(output.value, str):
+        return output
+    return output.copy(update={'value': presign_uri(output.value, window)})
@@ -1,11 +1,13 @@
+import base64
 from io import BytesIO
+from typing import Any
 
 import numpy as np
 from scipy.io import wavfile
 
 import sonounolib
 
-from ..types import JSONSchemaType, MediaEncoding
+from ..types import JSONSchemaType, JSONType, MediaEncoding
 
 
 def numpy_encode(value: np.ndarray, schema: JSONSchemaType):
@@ -101,3 +103,46 @@ class SonoUnoTrackEncoder:
         buffer = BytesIO()
         value.to_wav(buffer, **params)  # type: ignore[arg-type]
         return buffer
+
+
+class NumpyTypedArrayEncoder:
+    """Encodes numeric arrays as JSON objects, for the JSON transfer.
+
+    The typed array object contains the dtype name, the shape and the base64-encoded
+    little-endian bytes of the array in C order. It is more compact than nested lists
+    and is decoded without parsing each element.
+    """
+
+    VALID_KINDS = 'biufc'
+    SCHEMA: JSONSchemaType = {
+        'type': 'object',
+        'properties': {
+            'dtype': {'type': 'string'},
+            'shape': {'type': 'array', 'items': {'type': 'integer'}},
+            'data': {
+                'type': 'string',
+                'contentEncoding': 'base64',
+                'contentMediaType': 'application/octet-stream',
+            },
+        },
+        'required': ['dtype', 'shape', 'data'],
+        'x-typedArray': True,
+    }
+
+    def encode(self, value: np.ndarray) -> dict[str, JSONType]:
+        if value.dtype.kind not in self.VALID_KINDS:
+            raise TypeError(
+                f'Cannot encode arrays of dtype {value.dtype} as typed arrays.'
+            )
+        array = value.astype(value.dtype.newbyteorder('<'), order='C', copy=False)
+        return {
+            'dtype': array.dtype.name,
+            'shape': list(array.shape),
+            'data': base64.b64encode(array.data).decode(),
+        }
+
+    @staticmethod
+    def decode(value: dict[str, Any]) -> np.ndarray:
+        dtype = np.dtype(value['dtype']).newbyteorder('<')
+        data = base64.b64decode(value['data'])
+        return np.frombuffer(data, dtype).reshape(value['shape'])
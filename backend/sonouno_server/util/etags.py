@@ -0,0 +1,87 @@
+"""Entity tags of the immutable documents and conditional requests.
+"""
+
+from datetime import datetime
+
+from fastapi import Request, Response
+
+from ..compression import ENCODINGS
+from ..responses import MSGPACK_MEDIA_TYPE, get_response_media_type
+
+__all__ = [
+    'get_document_etag',
+    'match_etag',
+    'not_modified_response',
+    'set_etag',
+]
+
+# the responses are specific to the authenticated user, and the caches must check
+# that they are still valid before reusing them
+CACHE_CONTROL = 'private, no-cache'
+
+
+def get_document_etag(
+    request: Request,
+    document_id: object,
+    done_at: datetime | None = None,
+    version: int | None = None,
+) -> str:
+    """Returns the strong entity tag of an immutable document representation.
+
+    Arguments:
+        request: The request, whose `Accept` header selects the representation.
+        document_id: The document identifier.
+        done_at: For the jobs, the completion date, after which they are immutable.
+        version: The version of the representation, such as the signing window of the
+            presigned URLs of the jobs.
+    """
+    parts = [str(document_id)]
+    if done_at is not None:
+        parts.append(done_at.strftime('%Y%m%d%H%M%S%f'))
+    if version is not None:
+        parts.append(f'v{version}')
+    if get_response_media_type(request) == MSGPACK_MEDIA_TYPE:
+        parts.append('msgpack')
+    return '"' + '-'.join(parts) + '"'
+
+
+def match_etag(request: Request, etag: str) -> str | None:
+    """Returns the tag of the request `If-None-Match` header matching an entity tag.
+
+    As specified by RFC 7232, the weak comparison is used. The suffixes appended to
+    the entity tags by the compression of the responses are ignored, but kept in the
+    returned tag, so that it can be sent back in the 304 response.
+
+    Returns:
+        The matching tag, or None if the header does not match the entity tag.
+    """
+    if_none_match = request.headers.get('if-none-match')
+    if not if_none_match:
+        return None
+    for tag in if_none_match.split(','):
+        tag = tag.strip().removeprefix('W/')
+        if tag == '*':
+            return etag
+        uncompressed_tag = tag
+        for encoding in ENCODINGS:
+            uncompressed_tag = uncompressed_tag.replace(f'-{encoding}"', '"')
+        if uncompressed_tag == etag:
+            return tag
+    return None
+
+
+def set_etag(response: Response, etag: str) -> None:
+    """Sets the entity tag and the cache directives of a response."""
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = CACHE_CONTROL
+
+
+def not_modified_response(etag: str) -> Response:
+    """Returns the response to a conditional request matching an entity tag.
+
+    Arguments:
+        etag: The matching tag, as returned by `match_etag`.
+    """
+    response = Response(status_code=304)
+    set_etag(response, etag)
+    return response
@@ -0,0 +1,58 @@
+"""Idempotency keys of the job requests.
+
+A client retrying a request specifies the same `Idempotency-Key` header, so that the
+job created by the first request is returned instead of executing a new one. The keys
+are stored per user in the `IdempotencyKey` collection, from which they expire after
+`IDEMPOTENCY_KEY_RETENTION` seconds.
+"""
+
+import hashlib
+
+from beanie import PydanticObjectId
+from pymongo.errors import DuplicateKeyError
+
+from ..models import IdempotencyKey, JobIn
+from ..responses import dumps_json
+
+__all__ = ['claim_idempotency_key', 'find_idempotency_key', 'get_request_hash']
+
+
+def get_request_hash(job_in: JobIn) -> str:
+    """Returns the hash of a job request, to detect the reuse of keys."""
+    return hashlib.sha256(dumps_json(job_in, sort_keys=True)).hexdigest()
+
+
+async def find_idempotency_key(
+    user_id: PydanticObjectId, key: str
+) -> IdempotencyKey | None:
+    """Returns the stored idempotency key of a user, if any."""
+    return await IdempotencyKey.find_one(
+        IdempotencyKey.user_id == user_id, IdempotencyKey.key == key
+    )
+
+
+async def claim_idempotency_key(
+    user_id: PydanticObjectId, key: str, request_hash: str, job_id: PydanticObjectId
+) -> IdempotencyKey | None:
+    """Stores an idempotency key, unless it is already stored by a concurrent request.
+
+    Arguments:
+        user_id: The user sending the request.
+        key: The value of the `Idempotency-Key` header.
+        request_hash: The hash of the request body.
+        job_id: The identifier of the job to be created by the request.
+
+    Returns:
+        The idempotency key stored by a concurrent request, or None if the key is
+        claimed by this request.
+    """
+    idempotency_key = IdempotencyKey(
+        user_id=user_id, key=key, request_hash=request_hash, job_id=job_id
+    )
+    try:
+        await idempotency_key.insert()
+    except DuplicateKeyError:
+        stored_key = await find_idempotency_key(user_id, key)
+        # if the stored key has expired in between, the request is still rejected
+        return stored_key or idempotency_key
+    return None
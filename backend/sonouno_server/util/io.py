@@ -1,30 +1,49 @@
+import base64
+import gzip
+import hashlib
 import json
 import logging
 import mimetypes
 import pickle
-from collections.abc import Mapping
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from datetime import datetime
 from io import BytesIO
 from typing import Any, cast
 from uuid import uuid4
 
 import numpy
 from fastapi import HTTPException
+from minio.error import S3Error
 
 import sonounolib
 
 from ..app import app
 from ..config import CONFIG
-from ..models import Job, OutputWithValue
+from ..metrics import DEDUPLICATED_BYTES, ENCODE_SECONDS, UPLOAD_BYTES
+from ..models import Blob, Job, OutputWithValue
+from ..responses import json_default
 from ..schemas import JSONSchema
+from ..tracing import span
 from ..types import JSONSchemaType
-from ..util.encoders import SonoUnoTrackEncoder, numpy_encode
+from ..util.encoders import NumpyTypedArrayEncoder, SonoUnoTrackEncoder, numpy_encode
+from .profiler import job_phase
 
-__all__ = ['transfer_values']
+__all__ = ['BLOB_PREFIX', 'store_buffer', 'transfer_values']
 
 logger = logging.getLogger(__name__)
 
+# the prefix of the content-addressed objects in the jobs bucket
+BLOB_PREFIX = 'blobs/'
+# the JSON output values are encoded by chunks, so that their whole encoding is never
+# held in memory as a string
+JSON_ENCODER = json.JSONEncoder(separators=(',', ':'), default=json_default)
+# the range of the integers stored in the database
+BSON_MIN_INT = -(2**63)
+BSON_MAX_INT = 2**63 - 1
 
-def transfer_values(job: Job, values: Mapping[str, Any]) -> None:
+
+async def transfer_values(job: Job, values: Mapping[str, Any]) -> None:
     """Copies job output values to the current Job instance or MinIO.
 
     Arguments:
@@ -34,18 +53,141 @@ def transfer_values(job: Job, values: Mapping[str, Any]) -> None:
     for output, value in job.iter_output_values(values):
         if output.transfer == 'ignore':
             continue
-        json_schema = JSONSchema(output.json_schema)
-        if json_schema.has_content_type():
-            output.value = get_value_with_known_content_type(job, output, value)
-        elif json_schema.has_json_schema():
-            output.value = get_value_with_known_schema(job, output, value)
-        else:
-            output.value = get_value_unknown(job, output, value)
+        with span('job.output', output_id=output.id, transfer=output.transfer):
+            json_schema = JSONSchema(output.json_schema)
+            if output.transfer == 'auto':
+                output.value = await get_value_auto(job, output, value)
+            elif json_schema.has_content_type():
+                output.value = await get_value_with_known_content_type(
+                    job, output, value
+                )
+            elif json_schema.has_json_schema():
+                output.value = await get_value_with_known_schema(job, output, value)
+            else:
+                output.value = await get_value_unknown(job, output, value)
+
+
+async def get_value_auto(job: Job, output: OutputWithValue, value: Any) -> Any:
+    """Copies an output value to the current Job instance or MinIO, depending on the
+    size of its encoded value.
+
+    The output transfer mode is then set to `json` or `uri`:
+        * binary contents (values with a content type other than `application/json`)
+            are returned as base64 strings up to the size `TRANSFER_INLINE_MAX_SIZE`,
+        * JSON-serializable values, including the numeric arrays encoded as typed
+            arrays, are returned as is if their JSON encoding does not exceed
+            `TRANSFER_JSON_MAX_SIZE` and they can be stored in the database,
+            otherwise they are stored as JSON files, optionally compressed,
+        * the other values are stored as pickle files.
+
+    Arguments:
+        job: The executed job.
+        output: The current job output.
+        value: The value of the job output as returned by the job execution.
+
+    Returns:
+        The output value for JSON transfer, otherwise the URI of the stored file.
+    """
+    schema = cast(JSONSchemaType, output.json_schema)
+    content_type = schema.get('contentMediaType')
+    if content_type is not None and not is_json_content(content_type, value):
+        with encoding_phase(content_type):
+            buffer, ext = get_buffer_from_value(schema, value)
+        if buffer.getbuffer().nbytes > CONFIG.transfer_inline_max_size:
+            output.transfer = 'uri'
+            return await store_value(job, output, buffer, ext)
+        output.transfer = 'json'
+        output.json_schema['contentEncoding'] = 'base64'
+        return base64.b64encode(buffer.getbuffer()).decode()
+
+    if isinstance(value, numpy.ndarray) and JSONSchema(schema).has_json_schema():
+        # the schema describes a JSON instance, such as an array of numbers
+        value = value.tolist()
+    else:
+        value = get_json_compatible_value(output, value)
+
+    max_size = CONFIG.transfer_json_max_size
+    try:
+        with encoding_phase('application/json'):
+            # the sizing stops early for the values too large to be returned as is
+            if get_json_size(value, max_size) <= max_size and is_bson_compatible(value):
+                output.transfer = 'json'
+                return value
+            buffer = encode_json(value)
+    except TypeError:
+        output.transfer = 'uri'
+        return await get_value_unknown(job, output, value)
+
+    output.transfer = 'uri'
+    output.json_schema['contentMediaType'] = 'application/json'
+    metadata = {}
+    if CONFIG.transfer_json_compression == 'gzip':
+        with encoding_phase('application/gzip'):
+            buffer = BytesIO(gzip.compress(buffer.getbuffer(), compresslevel=6))
+        metadata['Content-Encoding'] = 'gzip'
+    return await store_value(job, output, buffer, '.json', metadata)
+
+
+def get_json_size(value: Any, max_size: int | None = None) -> int:
+    """Returns the size of the JSON encoding of a value, without storing it.
+
+    Arguments:
+        value: The value to be encoded.
+        max_size: If set, the encoding stops as soon as its size exceeds it, and the
+            returned size is only known to be greater than it.
+
+    Raises:
+        TypeError: When the value cannot be serialized in JSON.
+    """
+    size = 0
+    # the encoding is ASCII-only, so that its size is its number of characters
+    for chunk in JSON_ENCODER.iterencode(value):
+        size += len(chunk)
+        if max_size is not None and size > max_size:
+            break
+    return size
+
+
+def is_bson_compatible(value: Any) -> bool:
+    """Returns false if a JSON value contains integers beyond 64 bits, which cannot be
+    stored in the database."""
+    if isinstance(value, int):
+        return BSON_MIN_INT <= value <= BSON_MAX_INT
+    if isinstance(value, dict):
+        return all(is_bson_compatible(_) for _ in value.values())
+    if isinstance(value, (list, tuple)):
+        return all(is_bson_compatible(_) for _ in value)
+    return True
+
+
+def encode_json(value: Any) -> BytesIO:
+    """Encodes a value in JSON into a binary buffer, chunk by chunk.
+
+    Raises:
+        TypeError: When the value cannot be serialized in JSON.
+    """
+    buffer = BytesIO()
+    for chunk in JSON_ENCODER.iterencode(value):
+        buffer.write(chunk.encode())
+    buffer.seek(0)
+    return buffer
+
+
+def is_json_content(content_type: str, value: Any) -> bool:
+    """Returns true if the output value is transferred as JSON, despite its content
+    type: JSON content and numeric arrays of generic binary content type."""
+    if content_type == 'application/json':
+        return True
+    return (
+        content_type == 'application/octet-stream'
+        and isinstance(value, numpy.ndarray)
+        and value.dtype.kind in NumpyTypedArrayEncoder.VALID_KINDS
+    )
 
 
-def get_value_with_known_content_type(
+async def get_value_with_known_content_type(
     job: Job, output: OutputWithValue, value: Any
-) -> str | None:
+) -> Any:
     """Copies an output value with known content type to the current Job instance or
     MinIO.
 
@@ -57,22 +199,97 @@ def get_value_with_known_content_type(
         value: The value of the job output as returned by the job execution.
 
     Returns:
-        The string-encoded value for JSON transfer, otherwise the URI of the file
+        The JSON-encoded value for JSON transfer, otherwise the URI of the file
         encoding the output value according to its content type.
     """
-    buffer, ext = get_buffer_from_value(cast(JSONSchemaType, output.json_schema), value)
-
     if output.transfer == 'json':
-        # note: the schema may define a valid JSON schema, in which case it should
-        # be copied to the property contentSchema.
-        raise NotImplementedError('String-encoded JSON is not implemented.')
+        return get_json_value_with_known_content_type(output, value)
 
     if output.transfer == 'uri':
-        return store_value(job, output, buffer, ext)
+        schema = cast(JSONSchemaType, output.json_schema)
+        with encoding_phase(schema['contentMediaType']):
+            buffer, ext = get_buffer_from_value(schema, value)
+        return await store_value(job, output, buffer, ext)
 
     raise
 
 
+def get_json_value_with_known_content_type(output: OutputWithValue, value: Any) -> Any:
+    """Encodes an output value with known content type for the JSON transfer.
+
+    Arguments:
+        output: The current job output.
+        value: The value of the job output as returned by the job execution.
+
+    Returns:
+        * the value itself, if the content type is `application/json`,
+        * the typed array encoding the value, if it is a numeric array of content type
+            `application/octet-stream` (see `NumpyTypedArrayEncoder`),
+        * otherwise, the base64-encoded content of the value. The property
+            `contentEncoding` of the output schema is then set to `base64`.
+    """
+    schema = cast(JSONSchemaType, output.json_schema)
+    content_type = schema['contentMediaType']
+
+    if is_json_content(content_type, value):
+        return get_json_value(output, value)
+
+    with encoding_phase(content_type):
+        buffer, _ = get_buffer_from_value(schema, value)
+        encoded_value = base64.b64encode(buffer.getbuffer()).decode()
+    output.json_schema['contentEncoding'] = 'base64'
+    return encoded_value
+
+
+def get_json_value(output: OutputWithValue, value: Any) -> Any:
+    """Returns an output value that can be serialized in JSON.
+
+    Raises:
+        HTTPException: When the value cannot be serialized in JSON or stored in the
+            database.
+    """
+    value = get_json_compatible_value(output, value)
+    try:
+        get_json_size(value)
+    except TypeError:
+        raise HTTPException(
+            422, f'Output {output.id} is not JSON-serializable: {value}'
+        )
+    if not is_bson_compatible(value):
+        raise HTTPException(
+            422, f'Output {output.id} has integers beyond 64 bits: {value}'
+        )
+    return value
+
+
+def get_json_compatible_value(output: OutputWithValue, value: Any) -> Any:
+    """Converts the numpy values that cannot be serialized in JSON.
+
+    The numpy scalars are converted into Python scalars and the numeric arrays into
+    typed arrays, in which case the output schema is replaced by the typed array
+    schema.
+    """
+    if isinstance(value, numpy.generic):
+        return value.item()
+
+    if isinstance(value, numpy.ndarray) and value.dtype.kind in (
+        NumpyTypedArrayEncoder.VALID_KINDS
+    ):
+        with encoding_phase('typed-array'):
+            encoded_value = NumpyTypedArrayEncoder().encode(value)
+        schema = {
+            k: v
+            for k, v in output.json_schema.items()
+            if k not in {'contentMediaType', 'x-contentMediaEncoding'}
+        }
+        output.json_schema = cast(
+            JSONSchemaType, schema | NumpyTypedArrayEncoder.SCHEMA
+        )
+        return encoded_value
+
+    return value
+
+
 def get_buffer_from_value(schema: JSONSchemaType, value: Any) -> tuple[BytesIO, str]:
     """Returns the content of the job output as a binary buffer.
 
@@ -104,8 +321,7 @@ def get_buffer_from_value(schema: JSONSchemaType, value: Any) -> tuple[BytesIO,
         buffer = SonoUnoTrackEncoder().encode(value, encoding)
 
     elif content_type == 'application/json':
-        buffer = BytesIO()
-        buffer.write(json.dumps(value).encode())
+        buffer = encode_json(value)
 
     elif content_type == 'application/octet-stream':
         buffer = BytesIO()
@@ -122,7 +338,9 @@ def get_buffer_from_value(schema: JSONSchemaType, value: Any) -> tuple[BytesIO,
     return buffer, ext
 
 
-def get_value_with_known_schema(job: Job, output: OutputWithValue, value: Any) -> Any:
+async def get_value_with_known_schema(
+    job: Job, output: OutputWithValue, value: Any
+) -> Any:
     """Copies one output with valid json schema to the current Job instance or MinIO.
 
     Arguments:
@@ -135,18 +353,21 @@ def get_value_with_known_schema(job: Job, output: OutputWithValue, value: Any) -
         the output value.
     """
     if output.transfer == 'json':
+        if isinstance(value, numpy.ndarray):
+            # the schema describes a JSON instance, such as an array of numbers
+            return value.tolist()
         return value
 
     if output.transfer == 'uri':
         output.json_schema['contentMediaType'] = 'application/json'
-        buffer = BytesIO()
-        buffer.write(json.dumps(value).encode())
-        return store_value(job, output, buffer, '.json')
+        with encoding_phase('application/json'):
+            buffer = encode_json(value)
+        return await store_value(job, output, buffer, '.json')
 
     raise
 
 
-def get_value_unknown(job: Job, output: OutputWithValue, value: Any) -> Any:
+async def get_value_unknown(job: Job, output: OutputWithValue, value: Any) -> Any:
     """Copies an output value with no content type and no valid JSON schema
     to the current Job instance or MinIO.
 
@@ -160,41 +381,153 @@ def get_value_unknown(job: Job, output: OutputWithValue, value: Any) -> Any:
         encoding the output value.
     """
     if output.transfer == 'json':
-        try:
-            json.dumps(value)
-
-        except TypeError:
-            raise HTTPException(
-                422, f'Output {output.id} is not JSON-serializable: {value}'
-            )
-        return value
+        return get_json_value(output, value)
 
     if output.transfer == 'uri':
         output.json_schema['contentMediaType'] = 'application/octet-stream'
-        buffer = BytesIO()
-        buffer.write(pickle.dumps(value))
-        return store_value(job, output, buffer, '.pickle')
+        with encoding_phase('application/octet-stream'):
+            buffer = BytesIO()
+            buffer.write(pickle.dumps(value))
+        return await store_value(job, output, buffer, '.pickle')
 
     raise
 
 
-def store_value(job: Job, output: OutputWithValue, buffer: BytesIO, ext: str) -> str:
-    """Stores value in MinIO."""
+@contextmanager
+def encoding_phase(content_type: str) -> Iterator[None]:
+    """Times the encoding of an output value into a content type."""
+    with ENCODE_SECONDS.time(content_type=content_type):
+        with job_phase('encode', content_type=content_type):
+            yield
+
+
+async def store_value(
+    job: Job,
+    output: OutputWithValue,
+    buffer: BytesIO,
+    ext: str,
+    metadata: dict[str, str] | None = None,
+) -> str:
+    """Stores value in MinIO.
+
+    When the storage deduplication is enabled, the value is stored under the hash of
+    its content, and is not uploaded if an identical value is already stored.
+    """
 
     content_type = output.json_schema.get('contentMediaType')
     if not content_type:
         raise ValueError('A content type is required to store a value.')
 
+    if CONFIG.storage_deduplication:
+        return await store_blob(buffer, ext, content_type, metadata)
+
     uid = str(uuid4()).replace('-', '')[:6]
     output_id = output.id.replace('.', '-').replace('_', '-')
     name = f'job-{job.id}/{output_id}-{uid}{ext}'
+    return store_buffer(name, buffer, content_type, metadata)
 
-    length = buffer.getbuffer().nbytes
+
+async def store_blob(
+    buffer: BytesIO,
+    ext: str,
+    content_type: str,
+    metadata: dict[str, str] | None = None,
+) -> str:
+    """Stores a binary buffer in the jobs bucket under the hash of its content.
+
+    The blob is not uploaded if it is already stored. Its references by the job
+    outputs are counted in the `Blob` collection (see `add_blob_references`). Its
+    manifest is created or touched before the blob is looked up, so that the reaper
+    keeps it during the grace period, until the job references it. The blobs of the
+    jobs that fail are never referenced, and are removed after the grace period.
+
+    Arguments:
+        buffer: The binary buffer.
+        ext: The file extension of the object.
+        content_type: The content type of the object.
+        metadata: The additional headers of the object, such as `Content-Encoding`.
+
+    Returns:
+        The URI of the stored object.
+    """
+    with buffer.getbuffer() as content, job_phase('hash', size=content.nbytes):
+        # the buffer is hashed without being copied
+        digest = hashlib.sha256(content).hexdigest()
+        length = content.nbytes
+    name = f'{BLOB_PREFIX}{digest[:2]}/{digest}{ext}'
+    await touch_blob(name)
 
     client = app.state.minio
-    result = client.put_object(
-        'jobs', name, buffer, length=length, content_type=content_type
+    try:
+        client.stat_object('jobs', name)
+    except S3Error as exc:
+        if exc.code != 'NoSuchKey':
+            raise
+        return store_buffer(name, buffer, content_type, metadata)
+
+    DEDUPLICATED_BYTES.observe(length, content_type=content_type)
+    logger.debug(f'MinIO: deduplicated: {name} ({length} bytes)')
+    return get_object_uri(name)
+
+
+async def touch_blob(name: str) -> None:
+    """Creates the manifest of a blob, unreferenced, or updates its date and time."""
+    now = datetime.utcnow()
+    await Blob.get_motor_collection().update_one(
+        {'name': name},
+        {
+            '$set': {'updated_at': now},
+            '$setOnInsert': {'ref_count': 0, 'created_at': now},
+        },
+        upsert=True,
     )
-    logger.info(f'MinIO: put_object: {dir(result)}')
 
+
+def get_object_uri(name: str) -> str:
+    """Returns the URI of an object of the jobs bucket."""
     return f'{CONFIG.server_host}:9000/jobs/{name}'
+
+
+def get_object_name(uri: str) -> str | None:
+    """Returns the name of an object of the jobs bucket from its URI, or None if the
+    URI is not that of an object of the jobs bucket."""
+    prefix = get_object_uri('')
+    if not uri.startswith(prefix):
+        return None
+    return uri.removeprefix(prefix)
+
+
+def store_buffer(
+    name: str,
+    buffer: BytesIO,
+    content_type: str,
+    metadata: dict[str, str] | None = None,
+) -> str:
+    """Stores a binary buffer in the MinIO bucket of the jobs.
+
+    Arguments:
+        name: The object name.
+        buffer: The binary buffer.
+        content_type: The content type of the object.
+        metadata: The additional headers of the object, such as `Content-Encoding`.
+
+    Returns:
+        The URI of the stored object.
+    """
+    length = buffer.getbuffer().nbytes
+    buffer.seek(0)
+
+    client = app.state.minio
+    with job_phase('upload', object_name=name, size=length):
+        client.put_object(
+            'jobs',
+            name,
+            buffer,
+            length=length,
+            content_type=content_type,
+            metadata=metadata,
+        )
+    UPLOAD_BYTES.observe(length, content_type=content_type)
+    logger.debug(f'MinIO: put_object: {name} ({length} bytes)')
+
+    return get_object_uri(name)
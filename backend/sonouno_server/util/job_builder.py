@@ -1,7 +1,11 @@
 import logging
-from http.client import HTTPException
+from datetime import datetime, timedelta
 
+from fastapi import HTTPException
+
+from ..config import CONFIG
 from ..models import (
+    ExecutionLimits,
     Input,
     Job,
     JobIn,
@@ -37,9 +41,26 @@ class JobBuilder:
             user_id=self.user.id,
             inputs=self.extract_inputs(transform_inputs),
             outputs=self.extract_outputs(transform_outputs),
+            limits=self.extract_limits(),
+            priority=self.job_in.priority,
+            profile=self.job_in.profile,
+            expires_at=self.extract_expiration(),
         )
         return job
 
+    def extract_expiration(self) -> datetime | None:
+        """Returns the expiration of the job, from the retention of the transform, or
+        that of the user, or that of the server. The jobs of zero retention do not
+        expire."""
+        retention_days = self.transform.job_retention_days
+        if retention_days is None:
+            retention_days = self.user.job_retention_days
+        if retention_days is None:
+            retention_days = CONFIG.job_retention_days
+        if not retention_days:
+            return None
+        return datetime.utcnow() + timedelta(days=retention_days)
+
     def extract_inputs(self, transform_inputs: dict[str, Input]) -> list[Input]:
         """Merges transform and job inputs."""
         job_inputs = {i.id: i for i in self.job_in.inputs}
@@ -59,9 +80,43 @@ class JobBuilder:
             if job_input:
                 transform_input = transform_input.copy()
                 transform_input.value = job_input.value
+                transform_input.upload_id = job_input.upload_id
+                transform_input.dataset_digest = job_input.dataset_digest
             out.append(transform_input)
         return out
 
+    def extract_limits(self) -> ExecutionLimits:
+        """Merges the server, transform and job resource limits.
+
+        The transform limits are capped by the server maximum limits, but a job
+        requesting limits above them is rejected.
+        """
+        maximum_limits = {
+            'wall_time': CONFIG.job_max_wall_time,
+            'cpu_time': CONFIG.job_max_cpu_time,
+            'memory': CONFIG.job_max_memory,
+        }
+        limits = {
+            'wall_time': CONFIG.job_wall_time,
+            'cpu_time': CONFIG.job_cpu_time,
+            'memory': CONFIG.job_memory,
+        }
+        limits |= self.transform.limits.dict(exclude_none=True)
+        limits = {k: min(v, maximum_limits[k]) for k, v in limits.items()}
+
+        job_limits = self.job_in.limits.dict(exclude_none=True)
+        invalid_names = sorted(
+            k for k, v in job_limits.items() if v > maximum_limits[k]
+        )
+        if invalid_names:
+            raise HTTPException(
+                400,
+                f"The job limit(s) {', '.join(repr(n) for n in invalid_names)} exceed "
+                f'the maximum limits of the server.',
+            )
+        limits |= job_limits
+        return ExecutionLimits(**limits)
+
     def extract_outputs(
         self, transform_outputs: dict[str, Output]
     ) -> list[OutputWithValue]:
@@ -94,6 +149,6 @@ class JobBuilder:
             for field in job_output.__fields_set__ - {'id', 'json_schema'}:
                 output[field] = getattr(job_output, field)
 
-            output['schema'] = JSONSchema(output['json']) | job_output.json_schema
+            output['schema'] = JSONSchema(output['schema']) | job_output.json_schema
 
         return OutputWithValue(**output)
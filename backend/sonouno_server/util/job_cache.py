@@ -0,0 +1,41 @@
+"""Cache of the serialized responses of the finished jobs.
+
+Once finished, the jobs are immutable: the cached responses are only invalidated
+when the jobs are deleted, or replaced when their presigned URLs are renewed.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from beanie import PydanticObjectId
+
+from ..config import CONFIG
+from .cache import LRUCache, invalidate
+
+__all__ = ['CachedJob', 'JOB_CACHE', 'invalidate_jobs']
+
+# memory size of a cache entry, without its serialized responses
+ENTRY_OVERHEAD = 512
+
+JOB_CACHE: LRUCache['CachedJob'] = LRUCache('jobs', CONFIG.job_cache_max_size)
+
+
+@dataclass
+class CachedJob:
+    """The owner and the serialized responses, by media type, of a finished job, for
+    a signing window of the presigned URLs."""
+
+    user_id: PydanticObjectId
+    done_at: datetime
+    window: int | None = None
+    bodies: dict[str, bytes] = field(default_factory=dict)
+
+    @property
+    def size(self) -> int:
+        """Estimated memory size of the cached responses, in bytes."""
+        return ENTRY_OVERHEAD + sum(map(len, self.bodies.values()))
+
+
+async def invalidate_jobs(*job_ids: PydanticObjectId) -> None:
+    """Removes deleted jobs from the caches of all the server processes."""
+    await invalidate(JOB_CACHE, *map(str, job_ids))
@@ -1,22 +1,182 @@
-import json
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timezone
+from hashlib import md5
+from io import BytesIO
+from threading import Lock
+from typing import Any, BinaryIO, cast
+from urllib.parse import urlsplit
 
 from minio import Minio
+from minio.commonconfig import CopySource
+from minio.datatypes import Object
+from minio.deleteobjects import DeleteError, DeleteObject
+from minio.error import S3Error
 
-__all__ = ['make_public_bucket']
+from ..config import CONFIG
 
+__all__ = [
+    'InMemoryMinio',
+    'create_forked_minio_client',
+    'create_minio_client',
+    'create_presign_client',
+    'make_bucket',
+]
 
-def make_public_bucket(client: Minio, bucket_name: str) -> None:
-    """Creates a public bucket."""
 
+def create_minio_client() -> Minio:
+    """Returns the MinIO client, or its in-memory stand-in when the storage backend is
+    `memory`."""
+    if CONFIG.storage_backend == 'memory':
+        return cast(Minio, InMemoryMinio())
+    return Minio(
+        CONFIG.minio_endpoint + ':9000',
+        CONFIG.minio_access_key,
+        CONFIG.minio_secret_key,
+        secure=False,
+    )
+
+
+def create_forked_minio_client(client: Minio) -> Minio:
+    """Returns the MinIO client of a forked process.
+
+    The connection pool of the client of the parent process, inherited through the
+    fork, must not be shared by the processes. The in-memory stand-in is kept, since
+    its objects are inherited.
+    """
+    if isinstance(client, InMemoryMinio):
+        return client
+    return create_minio_client()
+
+
+def create_presign_client() -> Minio:
+    """Returns the MinIO client presigning the URLs of the public endpoint.
+
+    Since the region is specified, the URLs are presigned without any request, even
+    when the storage backend is `memory`.
+    """
+    url = urlsplit(CONFIG.minio_public_url)
+    return Minio(
+        url.netloc,
+        CONFIG.minio_access_key,
+        CONFIG.minio_secret_key,
+        region=CONFIG.minio_region,
+        secure=url.scheme == 'https',
+    )
+
+
+def make_bucket(client: Minio, bucket_name: str) -> None:
+    """Creates a private bucket, whose objects are downloaded through presigned URLs."""
     if not client.bucket_exists(bucket_name):
         client.make_bucket(bucket_name)
 
-    return
 
-    # The following doesn't set the bucket policy as public...
+class InMemoryMinio:
+    """In-memory stand-in of the MinIO client, used by the benchmarks and load tests.
+
+    Only the subset of the client API used by the server is implemented. When listing
+    objects non-recursively, the common prefixes are not returned.
+    """
+
+    def __init__(self) -> None:
+        self.buckets: dict[str, dict[str, tuple[Object, bytes]]] = {}
+        self._lock = Lock()
+
+    def bucket_exists(self, bucket_name: str) -> bool:
+        return bucket_name in self.buckets
+
+    def make_bucket(self, bucket_name: str) -> None:
+        with self._lock:
+            self.buckets.setdefault(bucket_name, {})
+
+    def put_object(
+        self,
+        bucket_name: str,
+        object_name: str,
+        data: BinaryIO,
+        length: int,
+        content_type: str = 'application/octet-stream',
+        **keywords: Any,
+    ) -> None:
+        content = data.read() if length < 0 else data.read(length)
+        stat = Object(
+            bucket_name,
+            object_name,
+            last_modified=datetime.now(timezone.utc),
+            etag=md5(content).hexdigest(),
+            size=len(content),
+            content_type=content_type,
+        )
+        with self._lock:
+            self._get_bucket(bucket_name)[object_name] = stat, content
+
+    def copy_object(
+        self, bucket_name: str, object_name: str, source: CopySource, **keywords: Any
+    ) -> None:
+        stat, content = self._get_object(source.bucket_name, source.object_name)
+        self.put_object(
+            bucket_name, object_name, BytesIO(content), len(content), stat.content_type
+        )
+
+    def get_object(self, bucket_name: str, object_name: str) -> BytesIO:
+        return BytesIO(self._get_object(bucket_name, object_name)[1])
+
+    def fget_object(
+        self, bucket_name: str, object_name: str, file_path: str, **keywords: Any
+    ) -> Object:
+        stat, content = self._get_object(bucket_name, object_name)
+        with open(file_path, 'wb') as f:
+            f.write(content)
+        return stat
+
+    def stat_object(self, bucket_name: str, object_name: str) -> Object:
+        return self._get_object(bucket_name, object_name)[0]
+
+    def remove_object(self, bucket_name: str, object_name: str) -> None:
+        with self._lock:
+            self._get_bucket(bucket_name).pop(object_name, None)
+
+    def remove_objects(
+        self, bucket_name: str, delete_object_list: Iterable[DeleteObject]
+    ) -> Iterator[DeleteError]:
+        for delete_object in delete_object_list:
+            # the name is private in minio < 7.2
+            name = getattr(delete_object, 'name', None) or delete_object._name
+            self.remove_object(bucket_name, name)
+        return iter([])
+
+    def list_objects(
+        self, bucket_name: str, prefix: str | None = None, recursive: bool = False
+    ) -> Iterator[Object]:
+        prefix = prefix or ''
+        for object_name, (stat, _) in sorted(self._get_bucket(bucket_name).items()):
+            if not object_name.startswith(prefix):
+                continue
+            if not recursive and '/' in object_name.removeprefix(prefix):
+                continue
+            yield stat
+
+    def _get_bucket(self, bucket_name: str) -> dict[str, tuple[Object, bytes]]:
+        try:
+            return self.buckets[bucket_name]
+        except KeyError:
+            raise self._error('NoSuchBucket', bucket_name)
+
+    def _get_object(self, bucket_name: str, object_name: str) -> tuple[Object, bytes]:
+        try:
+            return self._get_bucket(bucket_name)[object_name]
+        except KeyError:
+            raise self._error('NoSuchKey', bucket_name, object_name)
 
-    policy = {
-        'Version': '2012-10-17',
-        'Statement': [],
-    }
-    client.set_bucket_policy(bucket_name, json.dumps(policy))
+    @staticmethod
+    def _error(code: str, bucket_name: str, object_name: str | None = None) -> S3Error:
+        resource = f'/{bucket_name}' + (f'/{object_name}' if object_name else '')
+        return S3Error(
+            code=code,
+            message=f'The specified resource does not exist: {resource}',
+            resource=resource,
+            request_id=None,
+            host_id=None,
+            response=None,
+            bucket_name=bucket_name,
+            object_name=object_name,
+        )
@@ -0,0 +1,131 @@
+"""MongoDB client configuration and read-only queries.
+"""
+
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Any, TypeVar, cast
+
+from beanie import Document, PydanticObjectId
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from pymongo.read_preferences import make_read_preference, read_pref_mode_from_name
+
+from ..config import CONFIG
+
+__all__ = [
+    'create_motor_client',
+    'find_read_only',
+    'get_read_only',
+    'get_read_only_fields',
+    'read_only_collection',
+]
+
+D = TypeVar('D', bound=Document)
+
+
+def create_motor_client() -> AsyncIOMotorClient:
+    """Returns a Motor client configured with the connection pool settings.
+
+    The compressors `zstd` and `snappy` require the optional packages `zstandard`
+    and `python-snappy`. When the MongoDB backend is `memory`, an in-memory stand-in
+    of the client is returned.
+    """
+    if CONFIG.mongo_backend == 'memory':
+        from mongomock_motor import AsyncMongoMockClient
+
+        return cast(AsyncIOMotorClient, AsyncMongoMockClient())
+
+    # fail at startup, rather than in the first request
+    get_read_preference(CONFIG.mongo_read_preference)
+    options: dict[str, Any] = {
+        'maxPoolSize': CONFIG.mongo_max_pool_size,
+        'minPoolSize': CONFIG.mongo_min_pool_size,
+        'serverSelectionTimeoutMS': CONFIG.mongo_server_selection_timeout_ms,
+    }
+    if CONFIG.mongo_max_idle_time_ms:
+        options['maxIdleTimeMS'] = CONFIG.mongo_max_idle_time_ms
+    if CONFIG.mongo_compressors:
+        options['compressors'] = CONFIG.mongo_compressors
+    if CONFIG.mongo_replica_set:
+        options['replicaSet'] = CONFIG.mongo_replica_set
+    return AsyncIOMotorClient(CONFIG.mongo_uri, **options)
+
+
+@lru_cache
+def get_read_preference(name: str) -> Any:
+    """Returns the pymongo read preference from its name, such as `primary` or
+    `secondaryPreferred`, as an instance of the read preference classes, such as
+    `pymongo.read_preferences.SecondaryPreferred`.
+
+    Raises:
+        ValueError: When the read preference name is invalid.
+    """
+    try:
+        mode = read_pref_mode_from_name(name)
+    except ValueError:
+        raise ValueError(f'Invalid MongoDB read preference: {name!r}.') from None
+    return make_read_preference(mode, None)
+
+
+def read_only_collection(model: type[Document]) -> AsyncIOMotorCollection:
+    """Returns the collection of a document model, with the read preference of the
+    read-only endpoints.
+
+    Arguments:
+        model: The Beanie document model.
+    """
+    collection = model.get_motor_collection()
+    read_preference = get_read_preference(CONFIG.mongo_read_preference)
+    if collection.read_preference == read_preference:
+        return collection
+    return collection.with_options(read_preference=read_preference)
+
+
+async def get_read_only(model: type[D], document_id: PydanticObjectId) -> D | None:
+    """Gets a document by identifier, using the read preference of the read-only
+    endpoints.
+
+    Arguments:
+        model: The Beanie document model.
+        document_id: The identifier of the document.
+
+    Returns:
+        The document, or None if it does not exist.
+    """
+    document = await read_only_collection(model).find_one({'_id': document_id})
+    if document is None:
+        return None
+    return model.parse_obj(document)
+
+
+async def get_read_only_fields(
+    model: type[Document], document_id: PydanticObjectId, fields: list[str]
+) -> dict[str, Any] | None:
+    """Gets some fields of a document by identifier, using the read preference of the
+    read-only endpoints.
+
+    Arguments:
+        model: The Beanie document model.
+        document_id: The identifier of the document.
+        fields: The names of the fields to be returned, as stored in the database.
+
+    Returns:
+        The raw field values, or None if the document does not exist.
+    """
+    return await read_only_collection(model).find_one(
+        {'_id': document_id}, {field: True for field in fields}
+    )
+
+
+async def find_read_only(model: type[D], *criteria: Mapping[str, Any]) -> list[D]:
+    """Finds documents, using the read preference of the read-only endpoints.
+
+    Arguments:
+        model: The Beanie document model.
+        criteria: The Beanie search criteria.
+
+    Returns:
+        The list of documents satisfying the criteria.
+    """
+    query = model.find(*criteria).get_filter_query()
+    cursor = read_only_collection(model).find(query)
+    return [model.parse_obj(document) async for document in cursor]
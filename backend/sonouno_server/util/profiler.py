@@ -0,0 +1,162 @@
+"""Timing and profiling of the job phases.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import marshal
+import pstats
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, cast
+
+from .. import tracing
+from ..metrics import JOB_PHASE_SECONDS
+from ..models.profiles import HotFunction, JobProfile
+
+__all__ = ['JobProfiler', 'current_profiler', 'job_phase']
+
+current_profiler: ContextVar[JobProfiler | None] = ContextVar(
+    'current_profiler', default=None
+)
+
+
+class JobProfiler:
+    """Records the duration of the job phases and profiles them when enabled.
+
+    Only the synchronous phases can be profiled by the deterministic profiler, since
+    the asynchronous ones would also capture the other requests served by the event
+    loop.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.phases: dict[str, float] = {}
+        self._profile = cProfile.Profile() if enabled else None
+        self._profile_depth = 0
+        self._profile_used = False
+        self._stats: pstats.Stats | None = None
+
+    @contextmanager
+    def phase(self, name: str, profile: bool = False) -> Iterator[None]:
+        """Times a phase of the job.
+
+        Arguments:
+            name: The name of the phase. The durations of phases of same name are
+                summed.
+            profile: If true and the profiler is enabled, the phase is profiled.
+        """
+        profile = profile and self._profile is not None
+        if profile:
+            self._enable_profile()
+        start = time.perf_counter()
+        try:
+            with JOB_PHASE_SECONDS.time(phase=name):
+                yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+            if profile:
+                self._disable_profile()
+
+    def add_stats(self, stats: dict[Any, Any] | None) -> None:
+        """Adds raw profile statistics, such as the ones of the execution worker."""
+        if stats is None:
+            return
+        # pstats.Stats only requires the attribute `stats` and the method
+        # `create_stats` of a profile
+        raw_stats = cast(cProfile.Profile, _RawStats(stats))
+        if self._stats is None:
+            self._stats = pstats.Stats(raw_stats)
+        else:
+            self._stats.add(raw_stats)
+
+    def get_stats(self) -> pstats.Stats | None:
+        """Returns the profile statistics of the profiled phases."""
+        if self._profile is not None and self._profile_used:
+            self.add_stats(_get_raw_stats(self._profile))
+            self._profile = cProfile.Profile()
+            self._profile_used = False
+        return self._stats
+
+    def get_profile(self, count: int) -> JobProfile:
+        """Returns the job profile, without the URI of the full statistics.
+
+        Arguments:
+            count: The number of hot functions to be returned.
+        """
+        stats = self.get_stats()
+        hot_functions = [] if stats is None else _get_hot_functions(stats, count)
+        return JobProfile(phases=self.phases, hot_functions=hot_functions)
+
+    def _enable_profile(self) -> None:
+        assert self._profile is not None
+        if self._profile_depth == 0:
+            self._profile.enable()
+            self._profile_used = True
+        self._profile_depth += 1
+
+    def _disable_profile(self) -> None:
+        assert self._profile is not None
+        self._profile_depth -= 1
+        if self._profile_depth == 0:
+            self._profile.disable()
+
+
+@contextmanager
+def job_phase(
+    name: str, profile: bool = False, span_name: str = '', **attributes: Any
+) -> Iterator[None]:
+    """Times and traces a phase of the job handled by the current request.
+
+    Arguments:
+        name: The name of the phase.
+        profile: If true, the phase is profiled when the profiling of the job is
+            requested.
+        span_name: The name of the span of the phase. By default, it is the phase
+            name prefixed by `job.`.
+        attributes: The attributes of the span.
+    """
+    profiler = current_profiler.get()
+    timer = (
+        JOB_PHASE_SECONDS.time(phase=name)
+        if profiler is None
+        else profiler.phase(name, profile)
+    )
+    with tracing.span(span_name or f'job.{name}', **attributes), timer:
+        yield
+
+
+def dump_stats(stats: pstats.Stats) -> bytes:
+    """Serializes profile statistics in the format of `pstats.Stats.dump_stats`."""
+    return marshal.dumps(stats.stats)  # type: ignore[attr-defined]
+
+
+class _RawStats:
+    """Wraps raw profile statistics, so that they can be loaded by pstats.Stats."""
+
+    def __init__(self, stats: dict[Any, Any]):
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+
+def _get_raw_stats(profile: cProfile.Profile) -> dict[Any, Any]:
+    profile.create_stats()
+    return profile.stats  # type: ignore[attr-defined]
+
+
+def _get_hot_functions(stats: pstats.Stats, count: int) -> list[HotFunction]:
+    raw_stats = stats.stats  # type: ignore[attr-defined]
+    items = sorted(raw_stats.items(), key=lambda item: item[1][2], reverse=True)
+    return [
+        HotFunction(
+            function=pstats.func_std_string(func),  # type: ignore[attr-defined]
+            calls=calls,
+            total_time=total_time,
+            cumulative_time=cumulative_time,
+        )
+        for func, (_, calls, total_time, cumulative_time, _) in items[:count]
+    ]
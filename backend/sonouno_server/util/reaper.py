@@ -0,0 +1,185 @@
+"""Deletion of the expired jobs and of their outputs, off the request path.
+
+The jobs expire after the retention of their transform, of their user or of the server
+(see `JobBuilder.extract_expiration`). The retention of the server,
+`JOB_RETENTION_DAYS`, is opt-in: by default, the jobs are kept. Every `REAPER_INTERVAL`
+seconds, the reaper deletes the expired jobs in batches of `REAPER_BATCH_SIZE`: their
+objects are removed from the jobs bucket with bulk requests, the references to their
+blobs are released and the job documents are deleted at once.
+
+Several server processes may run the reaper: each batch of jobs is first claimed, so
+that the blob references of a job are released only once. The claims of an
+interrupted reaper are released after `REAPER_LEASE` seconds.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+from typing import Any
+
+from beanie import PydanticObjectId
+from fastapi.concurrency import run_in_threadpool
+from minio.deleteobjects import DeleteObject
+
+from ..app import app
+from ..config import CONFIG
+from ..metrics import REAPER_DELETED, REAPER_EXPIRED_JOBS, REAPER_PASS_SECONDS
+from ..models import Blob, Job
+from .blobs import iter_blob_names, remove_blob_references
+from .io import get_object_name
+from .job_cache import invalidate_jobs
+
+__all__ = ['delete_jobs', 'reap', 'run_reaper']
+
+logger = logging.getLogger(__name__)
+
+
+async def run_reaper(interval: float) -> None:
+    """Deletes the expired jobs and the unreferenced blobs, until cancelled.
+
+    Arguments:
+        interval: The interval between the reaper passes, in seconds.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            with REAPER_PASS_SECONDS.time():
+                await reap()
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning(f'Cannot reap the expired jobs: {exc}')
+
+
+async def reap(now: datetime | None = None) -> None:
+    """Deletes the jobs expired at a given date and time, then the blobs that are no
+    longer referenced, and the pending or oversized uploads whose URL has expired."""
+    # the uploads module depends on the reaper
+    from .uploads import reap_oversized_uploads, reap_uploads
+
+    if now is None:
+        now = datetime.utcnow()
+    while await reap_jobs(now, CONFIG.reaper_batch_size):
+        pass
+    while await reap_blobs(now, CONFIG.reaper_batch_size):
+        pass
+    while await reap_uploads(now, CONFIG.reaper_batch_size):
+        pass
+    while await reap_oversized_uploads(now, CONFIG.reaper_batch_size):
+        pass
+
+
+async def reap_jobs(now: datetime, batch_size: int) -> int:
+    """Deletes a batch of expired jobs and their outputs.
+
+    Returns:
+        The number of deleted jobs.
+    """
+    query = {'expires_at': {'$lte': now}}
+    collection = Job.get_motor_collection()
+    unclaimed_query = {'$and': [query, get_unclaimed_query(now)]}
+    REAPER_EXPIRED_JOBS.set(await collection.count_documents(unclaimed_query))
+    return await delete_jobs(query, batch_size, now)
+
+
+def get_unclaimed_query(now: datetime) -> dict:
+    """Returns the query of the jobs that are not claimed by a reaper."""
+    released_claim = PydanticObjectId.from_datetime(
+        now - timedelta(seconds=CONFIG.reaper_lease)
+    )
+    return {'$or': [{'reaper_claim': None}, {'reaper_claim': {'$lt': released_claim}}]}
+
+
+async def delete_jobs(query: dict, batch_size: int, now: datetime) -> int:
+    """Deletes a batch of jobs and their outputs.
+
+    Arguments:
+        query: The MongoDB query of the jobs to be deleted.
+        batch_size: The maximum number of deleted jobs.
+        now: The current date and time, to release the claims of the other reapers.
+
+    Returns:
+        The number of jobs in the batch, which may have been deleted concurrently.
+    """
+    query = {'$and': [query, get_unclaimed_query(now)]}
+    collection = Job.get_motor_collection()
+    cursor = collection.find(query, {'_id': True}).limit(batch_size)
+    ids = [document['_id'] async for document in cursor]
+    if not ids:
+        return 0
+
+    claim = PydanticObjectId()
+    await collection.update_many(
+        {'_id': {'$in': ids}, **query}, {'$set': {'reaper_claim': claim}}
+    )
+    jobs = await Job.find(Job.reaper_claim == claim).to_list()
+    object_names = [name for job in jobs for name in iter_object_names(job)]
+    await run_in_threadpool(remove_objects, object_names)
+    REAPER_DELETED.inc(len(object_names), kind='object')
+    await remove_blob_references(*jobs)
+    result = await Job.find(Job.reaper_claim == claim).delete()
+    deleted_count = result.deleted_count if result is not None else 0
+    await invalidate_jobs(*(job.id for job in jobs if job.id is not None))
+    REAPER_DELETED.inc(deleted_count, kind='job')
+    logger.info(f'Reaper: deleted {deleted_count} jobs.')
+    return len(ids)
+
+
+def iter_object_names(job: Job) -> Iterable[str]:
+    """Iterates over the names of the objects owned by a job, which are not shared
+    with other jobs."""
+    uris = [output.value for output in job.outputs if output.transfer == 'uri']
+    if job.execution_profile is not None:
+        uris.append(job.execution_profile.stats_uri)
+    blob_names = set(iter_blob_names(job))
+    for uri in uris:
+        if not isinstance(uri, str):
+            continue
+        name = get_object_name(uri)
+        if name is not None and name.startswith(f'job-{job.id}/'):
+            if name not in blob_names:
+                yield name
+
+
+async def reap_blobs(now: datetime, batch_size: int) -> int:
+    """Removes a batch of the blobs that are no longer referenced.
+
+    The blobs are removed after a grace period, since a job storing an output may have
+    stored the blob, or found it in the bucket, without having referenced it yet (see
+    `store_blob`). The blobs of the failed jobs, never referenced, are removed after
+    it.
+
+    Returns:
+        The number of removed blobs.
+    """
+    query: dict[str, Any] = {
+        'ref_count': {'$lte': 0},
+        'updated_at': {'$lt': now - timedelta(seconds=CONFIG.blob_grace_period)},
+    }
+    collection = Blob.get_motor_collection()
+    cursor = collection.find(query, {'name': True}).limit(batch_size)
+    names = [document['name'] async for document in cursor]
+    if not names:
+        return 0
+
+    await collection.delete_many({'name': {'$in': names}, **query})
+    # the blobs referenced again in between are kept
+    cursor = collection.find({'name': {'$in': names}}, {'name': True})
+    referenced_names = {document['name'] async for document in cursor}
+    removed_names = [_ for _ in names if _ not in referenced_names]
+    await run_in_threadpool(remove_objects, removed_names)
+    REAPER_DELETED.inc(len(removed_names), kind='blob')
+    logger.info(f'Reaper: removed {len(removed_names)} unreferenced blobs.')
+    return len(names)
+
+
+def remove_objects(names: list[str], bucket_name: str = 'jobs') -> None:
+    """Removes objects from a bucket, by default the jobs one, with bulk requests."""
+    if not names:
+        return
+    client = app.state.minio
+    errors = client.remove_objects(bucket_name, [DeleteObject(_) for _ in names])
+    # the objects are removed while the errors are iterated
+    for error in errors:
+        logger.warning(f'Reaper: cannot remove object {error.name}: {error.message}')
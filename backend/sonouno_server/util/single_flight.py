@@ -0,0 +1,62 @@
+"""Coalescing of identical concurrent calls.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Generic, TypeVar
+
+__all__ = ['SingleFlight']
+
+T = TypeVar('T')
+
+
+class SingleFlight(Generic[T]):
+    """Runs at most one call per key at a time, the concurrent callers of the same key
+    getting the result of the call in flight.
+
+    The results are not kept once the call is finished: unlike a cache, only the
+    concurrent work is deduplicated.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[str, asyncio.Future[T]] = {}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._calls
+
+    async def run(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        """Calls a function, or waits for the result of the call in flight.
+
+        Arguments:
+            key: The key identifying the identical calls.
+            func: The function called if no call of the same key is in flight.
+
+        Returns:
+            The result of the call, which is shared by the callers of the same key.
+
+        Raises:
+            The exception raised by the call.
+        """
+        future = self._calls.get(key)
+        if future is not None:
+            # the call is not cancelled if one of its waiters is
+            return await asyncio.shield(future)
+
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # the exception does not need to be retrieved if there is no waiter
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
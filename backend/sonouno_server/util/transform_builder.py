@@ -235,7 +235,7 @@ class TransformBuilder:
 
     @staticmethod
     def extract_output_transfer(schema: JSONSchema, is_entry_point: bool):
-        """Infers the default transfer mode from the output JSON schema.
+        """Infers the default transfer mode of an output.
 
         Arguments:
             schema: The JSON schema of the output.
@@ -243,27 +243,14 @@ class TransformBuilder:
 
         Returns:
             * `ignore` when the schema does not describe an entry point output.
-            * `json` when the content type is unknown (no property `contentMediaType`
-                or when the schema validates a valid JSON instance (i.e. when any of
-                the properties `type`, `enum` or `const` are defined).
-            * `uri` otherwise, i.e. when the entry point output schema includes
-                a content type (presence of the property `contentMediaType` and it
-                validates any instance (i.e. no property `type`, `enum` and `const`).
+            * `auto` otherwise: the transfer mode is decided for each job from the
+                size of the encoded output value (see `util.io.get_value_auto`).
         """
         if not is_entry_point:
             # currently, we only capture the entry point outputs
             return 'ignore'
 
-        if not schema.has_content_type():
-            # the content type is unknown, we will attempt to send the output through
-            # JSON, even if the schema may not describe an instance validation.
-            return 'json'
-
-        if schema.has_json_schema():
-            # it means that the JSON schema is defined and valid
-            return 'json'
-
-        return 'uri'
+        return 'auto'
 
     def extract_callees(
         self,
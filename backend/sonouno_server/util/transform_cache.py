@@ -0,0 +1,91 @@
+"""Cache of the transforms, shared by the job creation and the transform routes.
+
+The transforms are immutable once created: they can only be deleted, in which case
+they are invalidated in all the server processes. The cached transforms must not be
+modified.
+"""
+
+from dataclasses import dataclass, field
+
+from beanie import PydanticObjectId
+
+from ..config import CONFIG
+from ..models import Transform
+from ..responses import render_document
+from .cache import LRUCache, invalidate
+from .mongo import get_read_only
+
+__all__ = [
+    'CachedTransform',
+    'TRANSFORM_CACHE',
+    'get_transform',
+    'invalidate_transform',
+]
+
+# ratio of the memory size of a parsed transform to the length of its JSON encoding,
+# as measured for transforms of 10 to 200 functions
+OBJECT_SIZE_RATIO = 6
+
+TRANSFORM_CACHE: LRUCache['CachedTransform'] = LRUCache(
+    'transforms', CONFIG.transform_cache_max_size
+)
+
+
+@dataclass
+class CachedTransform:
+    """A transform and its serialized responses, by media type."""
+
+    transform: Transform
+    bodies: dict[str, bytes] = field(default_factory=dict)
+
+    @property
+    def size(self) -> int:
+        """Estimated memory size of the cached transform, in bytes."""
+        json_size = len(self.get_body('application/json'))
+        return OBJECT_SIZE_RATIO * json_size + sum(map(len, self.bodies.values()))
+
+    def get_body(self, media_type: str) -> bytes:
+        """Returns the serialized transform, in JSON or MessagePack."""
+        body = self.bodies.get(media_type)
+        if body is None:
+            body = self.bodies[media_type] = render_document(self.transform, media_type)
+            if media_type != 'application/json':
+                TRANSFORM_CACHE.resize(str(self.transform.id), self.size)
+        return body
+
+
+async def get_transform(
+    transform_id: PydanticObjectId, read_only: bool = False
+) -> CachedTransform | None:
+    """Returns a transform from the cache, or from the database on cache miss.
+
+    Arguments:
+        transform_id: The transform identifier.
+        read_only: If true, the transform is read using the read preference of the
+            read-only endpoints. Unless it is `primary`, the transform read on cache
+            miss is not cached: a lagging secondary can return a transform whose
+            deletion has already been invalidated.
+
+    Returns:
+        The cached transform, or None if it does not exist.
+    """
+    key = str(transform_id)
+    cached = TRANSFORM_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    if read_only:
+        transform = await get_read_only(Transform, transform_id)
+    else:
+        transform = await Transform.get(document_id=transform_id)
+    if transform is None:
+        return None
+    cached = CachedTransform(transform)
+    if not read_only or CONFIG.mongo_read_preference == 'primary':
+        TRANSFORM_CACHE.set(key, cached, cached.size)
+    return cached
+
+
+async def invalidate_transform(transform_id: PydanticObjectId) -> None:
+    """Removes a deleted transform from the caches of all the server processes."""
+    await invalidate(TRANSFORM_CACHE, str(transform_id))
@@ -0,0 +1,281 @@
+"""Uploads of the large job inputs, directly to the object store.
+
+The content of an upload is either sent to a presigned URL of the public MinIO
+endpoint, or streamed through the server, which spools it to disk before storing it.
+The job inputs reference the uploads by identifier: they are only downloaded by the
+worker executing the job, to a temporary file, which is memory-mapped for the NumPy
+arrays of content type `application/x-npy` and otherwise opened in binary mode. The
+content type of an upload is copied to the schema of the job inputs referencing it,
+since the job worker does not access the database.
+
+The presigned URLs do not limit the size of the content: the uploads larger than
+`UPLOAD_MAX_SIZE` are found when they are refreshed, and their content is removed.
+Since the content of a ready upload can be replaced until the expiry of its URL, the
+reaper then checks its size once more, and deletes the oversized uploads. The uploads
+whose content is never sent are also deleted by the reaper.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from collections.abc import AsyncIterator, Mapping
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+from tempfile import SpooledTemporaryFile, TemporaryDirectory
+from typing import Any, cast
+
+import numpy
+from beanie import PydanticObjectId
+from beanie.operators import In
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from minio import Minio
+from minio.error import S3Error
+
+from ..app import app
+from ..config import CONFIG
+from ..metrics import REAPER_DELETED
+from ..models import Job, JobIn, Upload, User
+from ..types import JSONSchemaType
+from .downloads import get_presign_client
+from .reaper import remove_objects
+
+__all__ = [
+    'UPLOADS_BUCKET',
+    'check_job_uploads',
+    'create_upload_url',
+    'delete_user_uploads',
+    'materialize_upload',
+    'reap_oversized_uploads',
+    'reap_uploads',
+    'refresh_upload',
+    'set_upload_media_types',
+    'store_upload_stream',
+]
+
+logger = logging.getLogger(__name__)
+
+UPLOADS_BUCKET = 'uploads'
+NPY_MEDIA_TYPE = 'application/x-npy'
+
+
+def create_upload_url(upload: Upload) -> tuple[str, datetime]:
+    """Returns the presigned URL to which the content of an upload is sent, and its
+    expiration."""
+    expires = timedelta(seconds=CONFIG.upload_url_expiry)
+    expires_at = datetime.utcnow() + expires
+    url = get_presign_client().presigned_put_object(
+        UPLOADS_BUCKET, upload.object_name, expires=expires
+    )
+    return url, expires_at
+
+
+async def refresh_upload(upload: Upload) -> None:
+    """Marks a pending upload as ready, if its content has been sent to the presigned
+    URL.
+
+    Raises:
+        HTTPException: When the content exceeds `UPLOAD_MAX_SIZE`. It is removed, so
+            that another content can be sent while the URL is valid.
+    """
+    if upload.status != 'pending':
+        return
+    client = app.state.minio
+    try:
+        stat = await run_in_threadpool(
+            client.stat_object, UPLOADS_BUCKET, upload.object_name
+        )
+    except S3Error as exc:
+        if exc.code != 'NoSuchKey':
+            raise
+        return
+    if stat.size > CONFIG.upload_max_size:
+        await run_in_threadpool(
+            client.remove_object, UPLOADS_BUCKET, upload.object_name
+        )
+        raise HTTPException(413, 'The upload exceeds the maximum size.')
+    upload.status = 'ready'
+    upload.size = stat.size
+    await upload.replace()
+
+
+async def store_upload_stream(upload: Upload, stream: AsyncIterator[bytes]) -> None:
+    """Stores the content of an upload streamed through the server.
+
+    The content is spooled to disk beyond `UPLOAD_SPOOL_SIZE`, so that the large
+    uploads are not held in memory.
+
+    Raises:
+        HTTPException: When the content exceeds `UPLOAD_MAX_SIZE`.
+    """
+    with SpooledTemporaryFile(max_size=CONFIG.upload_spool_size) as file:
+        size = 0
+        async for chunk in stream:
+            size += len(chunk)
+            if size > CONFIG.upload_max_size:
+                raise HTTPException(413, 'The upload exceeds the maximum size.')
+            await run_in_threadpool(file.write, chunk)
+        file.seek(0)
+        await run_in_threadpool(
+            app.state.minio.put_object,
+            UPLOADS_BUCKET,
+            upload.object_name,
+            file,
+            length=size,
+            content_type=upload.content_type,
+        )
+    upload.status = 'ready'
+    upload.size = size
+    await upload.replace()
+
+
+async def check_job_uploads(
+    job_in: JobIn, user: User
+) -> dict[PydanticObjectId, Upload]:
+    """Checks that the uploads referenced by the job inputs are ready and owned by the
+    user.
+
+    Returns:
+        The uploads, by identifier.
+
+    Raises:
+        HTTPException: When an upload is unknown, not owned by the user or not ready.
+    """
+    upload_ids = {i.upload_id for i in job_in.inputs if i.upload_id is not None}
+    if not upload_ids:
+        return {}
+    uploads = await Upload.find(In(Upload.id, list(upload_ids))).to_list()
+    missing_ids = upload_ids - {upload.id for upload in uploads}
+    if missing_ids:
+        raise HTTPException(
+            400, f"Unknown upload(s): {', '.join(map(str, sorted(missing_ids)))}."
+        )
+    for upload in uploads:
+        if upload.user_id != user.id:
+            raise HTTPException(403, f'The upload {upload.id} is forbidden.')
+        await refresh_upload(upload)
+        if upload.status != 'ready':
+            raise HTTPException(400, f'The upload {upload.id} is not complete.')
+    return {upload.id: upload for upload in uploads if upload.id is not None}
+
+
+def set_upload_media_types(
+    job: Job, uploads: Mapping[PydanticObjectId, Upload]
+) -> None:
+    """Sets the content type of the uploads in the schemas of the job inputs
+    referencing them."""
+    for input_ in job.inputs:
+        if input_.upload_id is not None:
+            content_type = uploads[input_.upload_id].content_type
+            # the schema may be shared with the cached transform
+            schema = input_.json_schema | {'contentMediaType': content_type}
+            input_.json_schema = cast(JSONSchemaType, schema)
+
+
+async def delete_user_uploads(user_id: PydanticObjectId) -> None:
+    """Deletes the uploads of a user and their content."""
+    uploads = await Upload.find(Upload.user_id == user_id).to_list()
+    names = [upload.object_name for upload in uploads]
+    await run_in_threadpool(remove_objects, names, UPLOADS_BUCKET)
+    await Upload.find(Upload.user_id == user_id).delete()
+
+
+def materialize_upload(
+    client: Minio,
+    upload_id: PydanticObjectId,
+    content_type: str | None,
+    stack: ExitStack,
+) -> Any:
+    """Downloads the content of an upload, in the job worker.
+
+    Arguments:
+        client: The MinIO client of the job worker.
+        upload_id: The upload identifier.
+        content_type: The content type of the upload, as set in the schema of the job
+            input (see `set_upload_media_types`).
+        stack: The exit stack releasing the downloaded file after the execution.
+
+    Returns:
+        A read-only memory-mapped array, for the uploads of content type
+        `application/x-npy`, otherwise a binary file object.
+    """
+    directory = stack.enter_context(TemporaryDirectory(prefix='sonouno-upload-'))
+    path = os.path.join(directory, str(upload_id))
+    client.fget_object(UPLOADS_BUCKET, str(upload_id), path)
+    if content_type == NPY_MEDIA_TYPE:
+        return numpy.load(path, mmap_mode='r')
+    return stack.enter_context(open(path, 'rb'))
+
+
+async def reap_uploads(now: datetime, batch_size: int) -> int:
+    """Deletes a batch of the pending uploads whose URL has expired before the grace
+    period, and their content, if it has been sent without being refreshed.
+
+    Returns:
+        The number of deleted uploads.
+    """
+    expired_at = now - timedelta(
+        seconds=CONFIG.upload_url_expiry + CONFIG.upload_grace_period
+    )
+    query = Upload.find(Upload.status == 'pending', Upload.created_at < expired_at)
+    uploads = await query.limit(batch_size).to_list()
+    if not uploads:
+        return 0
+
+    ids = [upload.id for upload in uploads]
+    await Upload.find(In(Upload.id, ids), Upload.status == 'pending').delete()
+    # the uploads refreshed in between are kept
+    refreshed_ids = {
+        upload.id for upload in await Upload.find(In(Upload.id, ids)).to_list()
+    }
+    names = [_.object_name for _ in uploads if _.id not in refreshed_ids]
+    await run_in_threadpool(remove_objects, names, UPLOADS_BUCKET)
+    REAPER_DELETED.inc(len(names), kind='upload')
+    logger.info(f'Reaper: deleted {len(names)} expired pending uploads.')
+    return len(uploads)
+
+
+async def reap_oversized_uploads(now: datetime, batch_size: int) -> int:
+    """Checks the size of a batch of the ready uploads whose URL has expired before
+    the grace period, and deletes those exceeding `UPLOAD_MAX_SIZE` with their
+    content.
+
+    Returns:
+        The number of checked uploads.
+    """
+    expired_at = now - timedelta(
+        seconds=CONFIG.upload_url_expiry + CONFIG.upload_grace_period
+    )
+    query = Upload.find(
+        Upload.status == 'ready',
+        Upload.created_at < expired_at,
+        {'size_checked': {'$ne': True}},
+    )
+    uploads = await query.limit(batch_size).to_list()
+    if not uploads:
+        return 0
+
+    client = app.state.minio
+    oversized_uploads = []
+    for upload in uploads:
+        try:
+            stat = await run_in_threadpool(
+                client.stat_object, UPLOADS_BUCKET, upload.object_name
+            )
+        except S3Error as exc:
+            if exc.code != 'NoSuchKey':
+                raise
+            continue
+        if stat.size > CONFIG.upload_max_size:
+            oversized_uploads.append(upload)
+
+    ids = [upload.id for upload in uploads]
+    await Upload.find(In(Upload.id, ids)).update({'$set': {'size_checked': True}})
+    if oversized_uploads:
+        names = [upload.object_name for upload in oversized_uploads]
+        await run_in_threadpool(remove_objects, names, UPLOADS_BUCKET)
+        await Upload.find(In(Upload.id, [_.id for _ in oversized_uploads])).delete()
+        REAPER_DELETED.inc(len(names), kind='upload')
+        logger.info(f'Reaper: deleted {len(names)} oversized uploads.')
+    return len(uploads)
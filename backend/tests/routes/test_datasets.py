@@ -0,0 +1,124 @@
+import hashlib
+import os
+from io import BytesIO
+
+import numpy as np
+
+from sonouno_server.app import app
+from sonouno_server.config import CONFIG
+from sonouno_server.models import Job
+from sonouno_server.util.datasets import DATASETS_BUCKET, materialize_dataset
+from sonouno_server.util.disk_cache import DiskCache
+
+from ..data import added_transform
+from .test_uploads import dumps_npy
+
+
+async def create_upload(client, headers, content: bytes, content_type: str) -> str:
+    upload_in = {'content_type': content_type}
+    response = await client.post('/uploads', json=upload_in, headers=headers)
+    upload_id = response.json()['upload']['_id']
+    await client.put(f'/uploads/{upload_id}', content=content, headers=headers)
+    return upload_id
+
+
+async def test_create(client, user_auth, user2_auth):
+    content = b'content'
+    upload_id = await create_upload(client, user_auth, content, 'text/plain')
+    response = await client.post(
+        '/datasets', json={'upload_id': upload_id}, headers=user2_auth
+    )
+    assert response.status_code == 403
+
+    response = await client.post(
+        '/datasets', json={'upload_id': upload_id}, headers=user_auth
+    )
+    assert response.status_code == 201
+    dataset = response.json()
+    assert dataset['digest'] == hashlib.sha256(content).hexdigest()
+    assert dataset['size'] == len(content)
+    assert dataset['content_type'] == 'text/plain'
+
+    # the identical contents are stored once
+    upload_id = await create_upload(client, user2_auth, content, 'text/plain')
+    response = await client.post(
+        '/datasets', json={'upload_id': upload_id}, headers=user2_auth
+    )
+    assert response.status_code == 200
+    assert response.json()['_id'] == dataset['_id']
+    # the temporary copies are removed
+    objects = app.state.minio.list_objects(DATASETS_BUCKET, recursive=True)
+    assert [_.object_name for _ in objects] == [dataset['digest']]
+
+    response = await client.get(f"/datasets/{dataset['digest']}", headers=user2_auth)
+    assert response.status_code == 200
+    response = await client.get(f'/datasets/{64 * "0"}', headers=user2_auth)
+    assert response.status_code == 404
+
+
+async def test_job_input(client, user, user_auth, monkeypatch, tmp_path):
+    monkeypatch.setattr(CONFIG, 'dataset_cache_dir', str(tmp_path))
+    source = """
+import numpy as np
+from streamunolib import exposed
+
+def total(array, path):
+    assert isinstance(array, np.memmap)
+    with open(path) as f:
+        return float(array.sum()) + len(f.read())
+
+@exposed
+def pipeline(array, path) -> float:
+    return total(array, path)
+"""
+    npy_upload_id = await create_upload(
+        client, user_auth, dumps_npy(np.arange(10.0)), 'application/x-npy'
+    )
+    text_upload_id = await create_upload(client, user_auth, b'text', 'text/plain')
+    digests = []
+    for upload_id in npy_upload_id, text_upload_id:
+        response = await client.post(
+            '/datasets', json={'upload_id': upload_id}, headers=user_auth
+        )
+        digests.append(response.json()['digest'])
+
+    async with added_transform(user=user, source=source) as transform:
+        job_in = {
+            'transform_id': str(transform.id),
+            'inputs': [
+                {'id': 'pipeline.array', 'dataset_digest': digests[0]},
+                {'id': 'pipeline.path', 'dataset_digest': 64 * '0'},
+            ],
+        }
+        response = await client.post('/jobs', json=job_in, headers=user_auth)
+        assert response.status_code == 400
+
+        job_in['inputs'][1]['dataset_digest'] = digests[1]
+        response = await client.post('/jobs', json=job_in, headers=user_auth)
+    assert response.status_code == 200
+    job = Job(**response.json())
+    assert job.status == 'done', job.error
+    assert job.outputs[0].value == 49
+    assert sorted(os.listdir(tmp_path)) == sorted(digests)
+
+
+async def test_materialize_evicted(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(CONFIG, 'dataset_cache_dir', str(tmp_path))
+    content = dumps_npy(np.arange(10.0))
+    digest = hashlib.sha256(content).hexdigest()
+    app.state.minio.put_object(DATASETS_BUCKET, digest, BytesIO(content), len(content))
+    get_path = DiskCache.get_path
+    evicted_paths = []
+
+    def get_evicted_path(self, name, fetch):
+        # another worker evicts the entry before it is opened, once
+        path = get_path(self, name, fetch)
+        if not evicted_paths:
+            os.unlink(path)
+            evicted_paths.append(path)
+        return path
+
+    monkeypatch.setattr(DiskCache, 'get_path', get_evicted_path)
+    array = materialize_dataset(app.state.minio, digest)
+    assert evicted_paths
+    assert array.sum() == 45
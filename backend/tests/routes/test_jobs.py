@@ -1,4 +1,27 @@
-from sonouno_server.models import Job
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+from sonouno_server.app import app
+from sonouno_server.config import CONFIG
+from sonouno_server.executors import ProcessExecutor
+from sonouno_server.models import Blob, Job
+from sonouno_server.responses import dumps_msgpack, loads_msgpack
+from sonouno_server.util.job_cache import JOB_CACHE
+from sonouno_server.util.reaper import reap
+
+from ..data import added_transform
+
+
+def get_object_name(url):
+    """Returns the name of an object of the jobs bucket from its presigned URL."""
+    return urlsplit(url).path.removeprefix('/jobs/')
 
 
 async def test_create(client, user_auth, public_transform):
@@ -16,3 +39,385 @@ async def test_create(client, user_auth, public_transform):
     actual_job = Job(**response.json())
     output = next(o for o in actual_job.outputs if o.id == 'pipeline.0')
     assert output.value == ['test', [4, 14]]
+    assert actual_job.status == 'done'
+    # the jobs are kept by default
+    assert actual_job.expires_at is None
+
+
+async def test_get_not_modified(client, user_auth, user2_auth, public_transform):
+    job_in = {
+        'transform_id': str(public_transform.id),
+        'inputs': [{'id': 'pipeline.param1', 'value': 'test'}],
+    }
+    response = await client.post('/jobs', json=job_in, headers=user_auth)
+    url = f'/jobs/{response.json()["_id"]}'
+    response = await client.get(url, headers=user_auth)
+    etag = response.headers['etag']
+    response = await client.get(url, headers=user_auth | {'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['etag'] == etag
+    headers = user_auth | {'If-None-Match': etag, 'Accept': 'application/msgpack'}
+    response = await client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert response.headers['etag'] != etag
+    response = await client.get(url, headers=user2_auth | {'If-None-Match': etag})
+    assert response.status_code == 403
+
+
+async def test_get_cached(client, user_auth, user2_auth, public_transform):
+    job_in = {
+        'transform_id': str(public_transform.id),
+        'inputs': [{'id': 'pipeline.param1', 'value': 'test'}],
+    }
+    response = await client.post('/jobs', json=job_in, headers=user_auth)
+    job_id = response.json()['_id']
+    response = await client.get(f'/jobs/{job_id}', headers=user_auth)
+    assert JOB_CACHE.get(job_id) is not None
+    hits = JOB_CACHE.hits
+    cached_response = await client.get(f'/jobs/{job_id}', headers=user_auth)
+    assert JOB_CACHE.hits == hits + 1
+    assert cached_response.content == response.content
+    assert cached_response.headers['etag'] == response.headers['etag']
+    response = await client.get(f'/jobs/{job_id}', headers=user2_auth)
+    assert response.status_code == 403
+
+    response = await client.get('/system/caches')
+    cache_info = next(_ for _ in response.json() if _['name'] == 'jobs')
+    assert cache_info['entries'] >= 1
+    assert cache_info['size'] >= len(cached_response.content)
+
+
+@pytest.mark.parametrize('deduplication', [True, False])
+async def test_create_coalesced(
+    client, user, user_auth, user2_auth, monkeypatch, deduplication
+):
+    monkeypatch.setattr(CONFIG, 'storage_deduplication', deduplication)
+    source = """
+import time
+from streamunolib import exposed
+
+def wait(duration):
+    time.sleep(duration)
+    return time.time()
+
+@exposed
+def pipeline(duration: float) -> float:
+    return wait(duration)
+"""
+    async with added_transform(user=user, source=source) as transform:
+        job_in = {
+            'transform_id': str(transform.id),
+            'inputs': [{'id': 'pipeline.duration', 'value': 0.5}],
+        }
+        responses = await asyncio.gather(
+            client.post('/jobs', json=job_in, headers=user_auth),
+            client.post('/jobs', json=job_in, headers=user2_auth),
+        )
+    job1, job2 = (Job(**_.json()) for _ in responses)
+    assert job1.id != job2.id
+    assert job1.user_id != job2.user_id
+    assert job1.status == job2.status == 'done'
+    if not deduplication:
+        # the stored outputs of the executed job would be deleted with it
+        assert job1.coalesced_with is job2.coalesced_with is None
+        return
+    assert job1.outputs[0].value == job2.outputs[0].value
+    assert (job1.coalesced_with, job2.coalesced_with) in {
+        (None, job1.id),
+        (job2.id, None),
+    }
+
+
+async def test_create_idempotent(client, user_auth, user2_auth, public_transform):
+    job_in = {
+        'transform_id': str(public_transform.id),
+        'inputs': [{'id': 'pipeline.param1', 'value': 'test'}],
+    }
+    headers = user_auth | {'Idempotency-Key': 'key-1'}
+    response = await client.post('/jobs', json=job_in, headers=headers)
+    assert response.status_code == 200
+    assert 'idempotent-replayed' not in response.headers
+    job_id = response.json()['_id']
+
+    response = await client.post('/jobs', json=job_in, headers=headers)
+    assert response.status_code == 200
+    assert response.headers['idempotent-replayed'] == 'true'
+    assert response.json()['_id'] == job_id
+
+    headers2 = user2_auth | {'Idempotency-Key': 'key-1'}
+    response = await client.post('/jobs', json=job_in, headers=headers2)
+    assert response.json()['_id'] != job_id
+
+    job_in['inputs'][0]['value'] = 'other'
+    response = await client.post('/jobs', json=job_in, headers=headers)
+    assert response.status_code == 422
+
+    headers = user_auth | {'Idempotency-Key': 256 * 'k'}
+    response = await client.post('/jobs', json=job_in, headers=headers)
+    assert response.status_code == 400
+
+
+async def test_create_deduplicated(client, user, user_auth, monkeypatch):
+    monkeypatch.setattr(CONFIG, 'transfer_json_max_size', 10)
+    source = """
+import numpy as np
+from streamunolib import exposed
+
+def get_values():
+    return np.arange(10, dtype=np.float64)
+
+@exposed
+def pipeline() -> np.ndarray:
+    return get_values()
+"""
+    async with added_transform(user=user, source=source) as transform:
+        job_in = {'transform_id': str(transform.id)}
+        uris = []
+        for _ in range(2):
+            response = await client.post('/jobs', json=job_in, headers=user_auth)
+            assert response.status_code == 200, response.text
+            uris.append(Job(**response.json()).outputs[0].value)
+    assert uris[0] == uris[1]
+    query = parse_qs(urlsplit(uris[0]).query)
+    assert query['X-Amz-Expires'] == [str(CONFIG.presigned_url_expiry)]
+    assert 'X-Amz-Signature' in query
+    blob = await Blob.find_one(Blob.name == get_object_name(uris[0]))
+    assert blob.ref_count == 2
+
+
+async def test_reap(client, user, user_auth, monkeypatch):
+    monkeypatch.setattr(CONFIG, 'transfer_json_max_size', 10)
+    monkeypatch.setattr(CONFIG, 'job_retention_days', 30)
+    source = """
+import numpy as np
+from streamunolib import exposed
+
+def get_values():
+    return np.arange(10, dtype=np.float64)
+
+@exposed
+def pipeline() -> np.ndarray:
+    return get_values()
+"""
+    async with added_transform(user=user, source=source) as transform:
+        job_in = {'transform_id': str(transform.id)}
+        response = await client.post('/jobs', json=job_in, headers=user_auth)
+        job1 = Job(**response.json())
+        response = await client.post('/jobs', json=job_in, headers=user_auth)
+        job2 = Job(**response.json())
+    assert job1.expires_at is not None
+    name = get_object_name(job1.outputs[0].value)
+
+    response = await client.get(f'/jobs/{job1.id}', headers=user_auth)
+    assert response.status_code == 200
+    assert JOB_CACHE.get(str(job1.id)) is not None
+
+    now = datetime.utcnow()
+    await Job.find_one(Job.id == job1.id).update({'$set': {'expires_at': now}})
+    await reap(now)
+    assert await Job.get(job1.id) is None
+    assert JOB_CACHE.get(str(job1.id)) is None
+    assert await Job.get(job2.id) is not None
+    assert (await Blob.find_one(Blob.name == name)).ref_count == 1
+
+    await Job.find_one(Job.id == job2.id).update({'$set': {'expires_at': now}})
+    await reap(now)
+    assert (await Blob.find_one(Blob.name == name)).ref_count == 0
+    assert app.state.minio.stat_object('jobs', name)
+    await reap(now + timedelta(seconds=CONFIG.blob_grace_period + 1))
+    assert await Blob.find_one(Blob.name == name) is None
+    assert not list(app.state.minio.list_objects('jobs', prefix=name))
+
+
+async def test_create_exceeding_wall_time(client, user, user_auth):
+    source = """
+from streamunolib import exposed
+
+def spin():
+    while True:
+        pass
+
+@exposed
+def pipeline():
+    spin()
+"""
+    async with added_transform(user=user, source=source) as transform:
+        job_in = {'transform_id': str(transform.id), 'limits': {'wall_time': 1}}
+        response = await client.post('/jobs', json=job_in, headers=user_auth)
+    assert response.status_code == 200
+    actual_job = Job(**response.json())
+    assert actual_job.status == 'failed'
+    assert 'wall-clock time limit' in actual_job.error
+    assert actual_job.done_at is not None
+
+
+async def test_create_unexpected_error(
+    client, user_auth, public_transform, monkeypatch
+):
+    def run(self):
+        raise RuntimeError('Unexpected.')
+
+    monkeypatch.setattr(ProcessExecutor, 'run', run)
+    job_in = {
+        'transform_id': str(public_transform.id),
+        'inputs': [{'id': 'pipeline.param1', 'value': 'test'}],
+    }
+    with pytest.raises(RuntimeError):
+        await client.post('/jobs', json=job_in, headers=user_auth)
+    job = await Job.find_one(Job.transform_id == public_transform.id)
+    assert job.status == 'failed'
+    assert job.error == 'RuntimeError: Unexpected.'
+    assert job.done_at is not None
+
+
+async def test_create_coalesced_error(
+    client, user_auth, user2_auth, public_transform, monkeypatch
+):
+    def run(self):
+        time.sleep(0.5)
+        raise HTTPException(422, 'Unexpected.')
+
+    monkeypatch.setattr(ProcessExecutor, 'run', run)
+    job_in = {
+        'transform_id': str(public_transform.id),
+        'inputs': [{'id': 'pipeline.param1', 'value': 'test'}],
+    }
+    responses = await asyncio.gather(
+        client.post('/jobs', json=job_in, headers=user_auth),
+        client.post('/jobs', json=job_in, headers=user2_auth),
+    )
+    assert [_.status_code for _ in responses] == [422, 422]
+    jobs = await Job.find(Job.transform_id == public_transform.id).to_list()
+    assert len(jobs) == 2
+    for job in jobs:
+        assert job.status == 'failed'
+        assert job.error == 'Unexpected.'
+        assert job.done_at is not None
+
+
+async def test_create_exceeding_maximum_limits(client, user_auth, public_transform):
+    job_in = {
+        'transform_id': str(public_transform.id),
+        'inputs': [{'id': 'pipeline.param1', 'value': 'test'}],
+        'limits': {'memory': 10**9},
+    }
+    response = await client.post('/jobs', json=job_in, headers=user_auth)
+    assert response.status_code == 400
+
+
+async def test_create_ndarray_json(client, user, user_auth):
+    source = """
+import asyncio
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+from streamunolib import exposed
+
+def get_values():
+    return np.arange(4, dtype=np.float32)
+
+@exposed
+def pipeline() -> np.ndarray:
+    return get_values()
+"""
+    async with added_transform(user=user, source=source) as transform:
+        job_in = {'transform_id': str(transform.id)}
+        response = await client.post('/jobs', json=job_in, headers=user_auth)
+    assert response.status_code == 200
+    actual_job = Job(**response.json())
+    output = actual_job.outputs[0]
+    assert output.transfer == 'json'
+    assert output.json_schema['x-typedArray']
+    assert output.value['dtype'] == 'float32'
+    assert output.value['shape'] == [4]
+
+
+async def test_create_big_int(client, user, user_auth):
+    source = """
+from streamunolib import exposed
+
+def get_value():
+    return 2**70
+
+@exposed
+def pipeline() -> int:
+    return get_value()
+"""
+    async with added_transform(user=user, source=source) as transform:
+        job_in = {'transform_id': str(transform.id)}
+        response = await client.post('/jobs', json=job_in, headers=user_auth)
+        assert response.status_code == 200
+        job_id = response.json()['_id']
+        response = await client.get(f'/jobs/{job_id}', headers=user_auth)
+    assert response.status_code == 200
+    actual_job = Job(**response.json())
+    assert actual_job.status == 'done', actual_job.error
+    # the integers beyond 64 bits cannot be stored in the database
+    output = actual_job.outputs[0]
+    assert output.transfer == 'uri'
+    content = app.state.minio.get_object('jobs', get_object_name(output.value))
+    assert json.loads(content.read()) == 2**70
+
+
+async def test_get_compressed(client, user, user_auth):
+    source = """
+import numpy as np
+from streamunolib import exposed
+
+def get_values():
+    return np.arange(1000, dtype=np.float64)
+
+@exposed
+def pipeline() -> np.ndarray:
+    return get_values()
+"""
+    async with added_transform(user=user, source=source) as transform:
+        job_in = {'transform_id': str(transform.id)}
+        response = await client.post('/jobs', json=job_in, headers=user_auth)
+        assert response.status_code == 200
+        job_id = response.json()['_id']
+        headers = user_auth | {'Accept-Encoding': 'gzip'}
+        async with client.stream('GET', f'/jobs/{job_id}', headers=headers) as response:
+            content = b''.join([chunk async for chunk in response.aiter_raw()])
+    assert response.headers['content-encoding'] == 'gzip'
+    # the extra flags of the gzip header are 4 for the fastest compression level
+    assert content[8] == 4
+
+
+async def test_create_msgpack(client, user, user_auth):
+    source = """
+import asyncio
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+from streamunolib import exposed
+
+def get_values(values):
+    return 2 * np.array(values, dtype=np.float32)
+
+@exposed
+def pipeline(values: list[float]) -> np.ndarray:
+    return get_values(values)
+"""
+    async with added_transform(user=user, source=source) as transform:
+        job_in = {
+            'transform_id': str(transform.id),
+            'inputs': [{'id': 'pipeline.values', 'value': np.arange(4.0)}],
+        }
+        headers = user_auth | {
+            'Accept': 'application/msgpack',
+            'Content-Type': 'application/msgpack',
+        }
+        response = await client.post(
+            '/jobs', content=dumps_msgpack(job_in), headers=headers
+        )
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/msgpack'
+    job = loads_msgpack(response.content)
+    assert job['status'] == 'done'
+    assert job['inputs'][0]['value'] == [0, 1, 2, 3]
+    value = job['outputs'][0]['value']
+    assert value.dtype == np.float32
+    np.testing.assert_array_equal(value, [0, 2, 4, 6])
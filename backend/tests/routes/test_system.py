@@ -0,0 +1,20 @@
+from sonouno_server.app import app
+
+
+async def test_get_scheduler(client, user, user_auth):
+    response = await client.get('/system/scheduler')
+    assert response.status_code == 401
+
+    scheduler = app.state.scheduler
+    async with scheduler.slot(str(user.id)):
+        response = await client.get('/system/scheduler', headers=user_auth)
+    assert response.status_code == 200
+    info = response.json()
+    assert info['running'] == info['active_users'] == 1
+    assert info['user']['user_id'] == str(user.id)
+    assert info['user']['running'] == 1
+
+    response = await client.get('/system/scheduler', headers=user_auth)
+    info = response.json()
+    assert info['running'] == info['active_users'] == 0
+    assert info['user'] is None
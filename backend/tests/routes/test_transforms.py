@@ -1,6 +1,15 @@
-from sonouno_server.models import ExposedFunction, Transform
+from datetime import datetime
+
+from sonouno_server.config import CONFIG
+from sonouno_server.models import CacheInvalidation, ExposedFunction, Job, Transform
+from sonouno_server.responses import loads_msgpack
+from sonouno_server.util import mongo
+from sonouno_server.util.cache import apply_invalidations
+from sonouno_server.util.job_cache import JOB_CACHE
+from sonouno_server.util.transform_cache import TRANSFORM_CACHE
 
 from ..data import added_transform
+from ..util import wait_deletion
 
 
 def test_create(user, public_transform):
@@ -17,6 +26,27 @@ async def test_get_public_from_creator(client, user_auth, public_transform):
     assert actual_transform == public_transform
 
 
+async def test_get_msgpack(client, user_auth, public_transform):
+    headers = user_auth | {'Accept': 'application/json;q=0.5, application/msgpack'}
+    response = await client.get(f'/transforms/{public_transform.id}', headers=headers)
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/msgpack'
+    actual_transform = Transform(**loads_msgpack(response.content))
+    assert actual_transform == public_transform
+
+
+async def test_get_not_modified(client, user_auth, user2_auth, public_transform):
+    url = f'/transforms/{public_transform.id}'
+    response = await client.get(url, headers=user_auth)
+    etag = response.headers['etag']
+    response = await client.get(url, headers=user_auth | {'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.content == b''
+    assert response.headers['etag'] == etag
+    response = await client.get(url, headers=user2_auth | {'If-None-Match': '"x"'})
+    assert response.status_code == 200
+
+
 async def test_get_private_from_creator(client, user_auth, private_transform):
     response = await client.get(
         f'/transforms/{private_transform.id}', headers=user_auth
@@ -49,14 +79,57 @@ async def test_get_unknown(client, user_auth):
     assert response.status_code == 404
 
 
-async def test_delete_from_creator(client, user, user_auth):
+async def test_delete_from_creator(client, user, user_auth, user2_auth, monkeypatch):
+    monkeypatch.setattr(CONFIG, 'cascade_batch_size', 1)
+    monkeypatch.setattr(CONFIG, 'cascade_batch_interval', 0)
     async with added_transform(user=user) as transform:
         response = await client.get(f'/transforms/{transform.id}', headers=user_auth)
         assert response.status_code == 200
-        response = await client.delete(f'/transforms/{transform.id}', headers=user_auth)
-        assert response.status_code == 204
+        job_in = {
+            'transform_id': str(transform.id),
+            'inputs': [{'id': 'pipeline.param1', 'value': 'test'}],
+        }
+        job_ids = []
+        for auth in [user_auth, user2_auth]:
+            response = await client.post('/jobs', json=job_in, headers=auth)
+            job_ids.append(response.json()['_id'])
+            await client.get(f'/jobs/{job_ids[-1]}', headers=auth)
+            assert JOB_CACHE.get(job_ids[-1]) is not None
+        deletion_response = await client.delete(
+            f'/transforms/{transform.id}', headers=user_auth
+        )
+        assert deletion_response.status_code == 202
         response = await client.get(f'/transforms/{transform.id}', headers=user_auth)
         assert response.status_code == 404
+        deletion = await wait_deletion(client, deletion_response, user_auth)
+        assert deletion['status'] == 'done'
+        assert deletion['deleted_jobs'] == 2
+        assert all(JOB_CACHE.get(_) is None for _ in job_ids)
+        assert await Job.find(Job.transform_id == transform.id).count() == 0
+
+
+async def test_invalidation_from_other_process(client, user_auth, public_transform):
+    since = datetime.utcnow()
+    response = await client.get(f'/transforms/{public_transform.id}', headers=user_auth)
+    assert response.status_code == 200
+    key = str(public_transform.id)
+    assert TRANSFORM_CACHE.get(key) is not None
+    await CacheInvalidation(cache='transforms', key=key).insert()
+    await apply_invalidations(since)
+    assert TRANSFORM_CACHE.get(key) is None
+
+
+async def test_get_from_secondary_not_cached(
+    client, user_auth, public_transform, monkeypatch
+):
+    monkeypatch.setattr(CONFIG, 'mongo_read_preference', 'secondaryPreferred')
+    # the test database may have no secondaries, nor read preferences
+    monkeypatch.setattr(
+        mongo, 'read_only_collection', lambda model: model.get_motor_collection()
+    )
+    response = await client.get(f'/transforms/{public_transform.id}', headers=user_auth)
+    assert response.status_code == 200
+    assert TRANSFORM_CACHE.get(str(public_transform.id)) is None
 
 
 async def test_delete_from_other(client, user, user2_auth):
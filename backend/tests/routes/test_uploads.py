@@ -0,0 +1,146 @@
+from datetime import datetime, timedelta
+from io import BytesIO
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from sonouno_server.app import app
+from sonouno_server.config import CONFIG
+from sonouno_server.models import Job, Upload
+from sonouno_server.util.reaper import reap
+
+from ..data import added_transform
+
+
+def dumps_npy(array: np.ndarray) -> bytes:
+    buffer = BytesIO()
+    np.save(buffer, array)
+    return buffer.getvalue()
+
+
+async def test_create(client, user_auth):
+    response = await client.post('/uploads', json={}, headers=user_auth)
+    assert response.status_code == 201
+    upload_url = response.json()
+    assert upload_url['upload']['status'] == 'pending'
+    assert upload_url['upload']['content_type'] == 'application/octet-stream'
+    url = urlsplit(upload_url['url'])
+    assert url.path == f"/uploads/{upload_url['upload']['_id']}"
+    assert 'X-Amz-Signature' in parse_qs(url.query)
+
+
+async def test_put(client, user_auth, user2_auth):
+    response = await client.post('/uploads', json={}, headers=user_auth)
+    upload_id = response.json()['upload']['_id']
+
+    response = await client.put(
+        f'/uploads/{upload_id}', content=b'content', headers=user2_auth
+    )
+    assert response.status_code == 403
+
+    response = await client.put(
+        f'/uploads/{upload_id}', content=b'content', headers=user_auth
+    )
+    assert response.status_code == 200
+    assert response.json()['status'] == 'ready'
+    assert response.json()['size'] == len(b'content')
+
+    response = await client.put(
+        f'/uploads/{upload_id}', content=b'other', headers=user_auth
+    )
+    assert response.status_code == 409
+
+
+async def test_job_input(client, user, user_auth, user2_auth):
+    source = """
+import numpy as np
+from streamunolib import exposed
+
+def total(data):
+    assert isinstance(data, np.memmap)
+    return float(data.sum())
+
+@exposed
+def pipeline(data) -> float:
+    return total(data)
+"""
+    upload_in = {'content_type': 'application/x-npy'}
+    response = await client.post('/uploads', json=upload_in, headers=user_auth)
+    upload_id = response.json()['upload']['_id']
+    async with added_transform(user=user, source=source) as transform:
+        job_in = {
+            'transform_id': str(transform.id),
+            'inputs': [{'id': 'pipeline.data', 'upload_id': upload_id}],
+        }
+        response = await client.post('/jobs', json=job_in, headers=user_auth)
+        assert response.status_code == 400
+        # the input value has a single source
+        job_in_with_value = {
+            'transform_id': str(transform.id),
+            'inputs': [{'id': 'pipeline.data', 'upload_id': upload_id, 'value': 1}],
+        }
+        response = await client.post('/jobs', json=job_in_with_value, headers=user_auth)
+        assert response.status_code == 400
+        message = response.json()['detail'][0]['msg']
+        assert message == 'Only one of value, upload_id can be specified.'
+
+        content = dumps_npy(np.arange(10.0))
+        await client.put(f'/uploads/{upload_id}', content=content, headers=user_auth)
+        response = await client.post('/jobs', json=job_in, headers=user2_auth)
+        assert response.status_code == 403
+
+        response = await client.post('/jobs', json=job_in, headers=user_auth)
+    assert response.status_code == 200
+    job = Job(**response.json())
+    assert job.status == 'done', job.error
+    assert job.outputs[0].value == 45
+    assert job.inputs[0].json_schema['contentMediaType'] == 'application/x-npy'
+
+
+async def test_presigned_exceeding_maximum_size(client, user_auth, monkeypatch):
+    monkeypatch.setattr(CONFIG, 'upload_max_size', 4)
+    response = await client.post('/uploads', json={}, headers=user_auth)
+    upload_id = response.json()['upload']['_id']
+    # the content sent to the presigned URL
+    app.state.minio.put_object('uploads', upload_id, BytesIO(b'content'), 7)
+
+    response = await client.get(f'/uploads/{upload_id}', headers=user_auth)
+    assert response.status_code == 413
+    assert not list(app.state.minio.list_objects('uploads', prefix=upload_id))
+    response = await client.get(f'/uploads/{upload_id}', headers=user_auth)
+    assert response.json()['status'] == 'pending'
+
+
+async def test_reap_pending(client, user_auth):
+    upload_ids = []
+    for _ in range(2):
+        response = await client.post('/uploads', json={}, headers=user_auth)
+        upload_ids.append(response.json()['upload']['_id'])
+    await client.put(f'/uploads/{upload_ids[1]}', content=b'content', headers=user_auth)
+
+    expiry = CONFIG.upload_url_expiry + CONFIG.upload_grace_period
+    await reap(datetime.utcnow() + timedelta(seconds=expiry + 1))
+    assert await Upload.get(upload_ids[0]) is None
+    assert await Upload.get(upload_ids[1]) is not None
+
+
+async def test_reap_oversized(client, user_auth, monkeypatch):
+    upload_ids = []
+    for _ in range(2):
+        response = await client.post('/uploads', json={}, headers=user_auth)
+        upload_id = response.json()['upload']['_id']
+        await client.put(f'/uploads/{upload_id}', content=b'data', headers=user_auth)
+        upload_ids.append(upload_id)
+    # the content replaced through the presigned URL of a ready upload
+    app.state.minio.put_object('uploads', upload_ids[0], BytesIO(b'content'), 7)
+    monkeypatch.setattr(CONFIG, 'upload_max_size', 4)
+
+    await reap(datetime.utcnow())
+    assert await Upload.get(upload_ids[0]) is not None
+
+    expiry = CONFIG.upload_url_expiry + CONFIG.upload_grace_period
+    await reap(datetime.utcnow() + timedelta(seconds=expiry + 1))
+    assert await Upload.get(upload_ids[0]) is None
+    assert not list(app.state.minio.list_objects('uploads', prefix=upload_ids[0]))
+    upload = await Upload.get(upload_ids[1])
+    assert upload.size_checked
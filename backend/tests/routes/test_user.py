@@ -4,8 +4,9 @@ User information tests
 
 from httpx import AsyncClient
 
+from sonouno_server.models import Job, Transform, User
 from tests.data import add_empty_user
-from tests.util import auth_headers
+from tests.util import auth_headers, wait_deletion
 
 
 async def test_user_get(client: AsyncClient) -> None:
@@ -55,7 +56,25 @@ async def test_user_delete(client: AsyncClient) -> None:
     assert data['email'] == email
     # Delete user
     resp = await client.delete('/users/me', headers=auth)
-    assert resp.status_code == 204
+    assert resp.status_code == 202
+    assert resp.json()['kind'] == 'user'
     # Check deletion
+    await wait_deletion(client, resp, auth)
     resp = await client.get('/users/me', headers=auth)
     assert resp.status_code == 404
+
+
+async def test_user_delete_cascade(client, user, user_auth, public_transform):
+    job_in = {
+        'transform_id': str(public_transform.id),
+        'inputs': [{'id': 'pipeline.param1', 'value': 'test'}],
+    }
+    await client.post('/jobs', json=job_in, headers=user_auth)
+    resp = await client.delete('/users/me', headers=user_auth)
+    assert resp.status_code == 202
+    job_resp = await client.post('/jobs', json=job_in, headers=user_auth)
+    assert job_resp.status_code == 403
+    await wait_deletion(client, resp, user_auth)
+    assert await Transform.find(Transform.user_id == user.id).count() == 0
+    assert await Job.find(Job.user_id == user.id).count() == 0
+    assert await User.get(user.id) is None
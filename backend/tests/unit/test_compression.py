@@ -0,0 +1,135 @@
+import gzip
+
+import brotli
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from httpx import AsyncClient
+
+from sonouno_server.compression import (
+    CompressionMiddleware,
+    compression,
+    select_encoding,
+)
+from sonouno_server.config import CONFIG
+
+BODY = b'{"source": "' + 1000 * b'abcd' + b'"}'
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware)
+
+
+@app.get('/json')
+async def get_json():
+    return Response(BODY, media_type='application/json')
+
+
+@app.get('/etag')
+async def get_etag():
+    return Response(BODY, media_type='application/json', headers={'ETag': '"a"'})
+
+
+@app.get('/small')
+async def get_small():
+    return Response(b'{}', media_type='application/json')
+
+
+@app.get('/audio')
+async def get_audio():
+    return Response(BODY, media_type='audio/x-wav')
+
+
+@app.get('/stream')
+async def get_stream():
+    async def iter_body():
+        for _ in range(3):
+            yield BODY
+
+    return StreamingResponse(iter_body(), media_type='application/json')
+
+
+@app.get('/fast')
+@compression(gzip=1)
+async def get_fast():
+    return Response(BODY, media_type='application/json')
+
+
+@pytest.fixture
+async def client():
+    async with AsyncClient(app=app, base_url='http://test') as client:
+        yield client
+
+
+@pytest.mark.parametrize(
+    'accept_encoding, expected',
+    [
+        ('', None),
+        ('identity', None),
+        ('gzip', 'gzip'),
+        ('gzip, deflate, br', 'br'),
+        ('br;q=0.5, gzip', 'gzip'),
+        ('*', 'br'),
+        ('*, br;q=0', 'gzip'),
+    ],
+)
+def test_select_encoding(accept_encoding, expected):
+    assert select_encoding(accept_encoding) == expected
+
+
+@pytest.mark.parametrize(
+    'encoding, decompress', [('gzip', gzip.decompress), ('br', brotli.decompress)]
+)
+async def test_compressed(client, encoding, decompress):
+    headers, raw_content = await get_raw(client, '/json', encoding)
+    assert headers['content-encoding'] == encoding
+    assert headers['vary'] == 'Accept-Encoding'
+    assert int(headers['content-length']) == len(raw_content) < len(BODY)
+    assert decompress(raw_content) == BODY
+
+
+async def test_etag(client):
+    response = await client.get('/etag', headers={'Accept-Encoding': 'br'})
+    assert response.headers['etag'] == '"a-br"'
+
+
+async def test_not_accepted(client):
+    response = await client.get('/json', headers={'Accept-Encoding': 'identity'})
+    assert 'content-encoding' not in response.headers
+    assert response.headers['vary'] == 'Accept-Encoding'
+    assert response.content == BODY
+
+
+@pytest.mark.parametrize('path', ['/small', '/audio'])
+async def test_not_compressible(client, path):
+    response = await client.get(path, headers={'Accept-Encoding': 'gzip'})
+    assert 'content-encoding' not in response.headers
+    assert 'vary' not in response.headers
+
+
+async def test_streaming(client):
+    response = await client.get('/stream', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['content-encoding'] == 'gzip'
+    assert 'content-length' not in response.headers
+    assert response.content == 3 * BODY
+
+
+async def test_thread(client, monkeypatch):
+    monkeypatch.setattr(CONFIG, 'compression_thread_min_size', 0)
+    response = await client.get('/json', headers={'Accept-Encoding': 'gzip'})
+    assert response.content == BODY
+
+
+async def test_route_level(client):
+    _, raw_content = await get_raw(client, '/fast', 'gzip')
+    # the extra flags of the gzip header are 4 for the fastest compression level
+    assert raw_content[8] == 4
+    _, raw_content = await get_raw(client, '/json', 'gzip')
+    assert raw_content[8] == 0
+
+
+async def get_raw(client, path, encoding):
+    """Returns the headers and the content of a response, without decoding."""
+    headers = {'Accept-Encoding': encoding}
+    async with client.stream('GET', path, headers=headers) as response:
+        content = b''.join([chunk async for chunk in response.aiter_raw()])
+    return response.headers, content
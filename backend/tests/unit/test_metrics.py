@@ -0,0 +1,61 @@
+import math
+
+import pytest
+
+from sonouno_server import metrics
+from sonouno_server.metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+
+def test_counter(registry):
+    counter = Counter('requests_total', 'Requests.', ['result'], registry=registry)
+    counter.inc(result='hit')
+    counter.inc(2, result='hit')
+    counter.inc(result='miss')
+    assert registry.render() == (
+        '# HELP requests_total Requests.\n'
+        '# TYPE requests_total counter\n'
+        'requests_total{result="hit"} 3.0\n'
+        'requests_total{result="miss"} 1.0\n'
+    )
+
+
+def test_gauge(registry):
+    gauge = Gauge('depth', 'Depth.', registry=registry)
+    gauge.set(3)
+    gauge.set(2)
+    assert registry.render().splitlines()[-1] == 'depth 2.0'
+
+
+def test_histogram(registry):
+    histogram = Histogram(
+        'latency', 'Latency.', ['route'], buckets=(1, 2, math.inf), registry=registry
+    )
+    for value in [0.5, 1, 1.5, 3]:
+        histogram.observe(value, route='/a"b')
+    assert registry.render().splitlines()[2:] == [
+        'latency_bucket{route="/a\\"b",le="1.0"} 2',
+        'latency_bucket{route="/a\\"b",le="2.0"} 3',
+        'latency_bucket{route="/a\\"b",le="+Inf"} 4',
+        'latency_sum{route="/a\\"b"} 6.0',
+        'latency_count{route="/a\\"b"} 4',
+    ]
+
+
+def test_duplicate(registry):
+    Gauge('depth', 'Depth.', registry=registry)
+    with pytest.raises(ValueError, match='Duplicate metric'):
+        Gauge('depth', 'Depth.', registry=registry)
+
+
+def test_disabled(registry, monkeypatch):
+    monkeypatch.setattr(metrics, 'ENABLED', False)
+    histogram = Histogram('latency', 'Latency.', registry=registry)
+    with histogram.time():
+        pass
+    histogram.observe(1)
+    assert registry.render().splitlines()[2:] == []
@@ -0,0 +1,96 @@
+import json
+from datetime import datetime
+
+import numpy as np
+import pytest
+from beanie import PydanticObjectId
+from fastapi import Request
+from pydantic import BaseModel, Field
+
+from sonouno_server.models import OutputWithValue
+from sonouno_server.responses import (
+    DocumentResponse,
+    dumps_json,
+    dumps_msgpack,
+    get_accepted_quality,
+    loads_msgpack,
+)
+from sonouno_server.util.encoders import NumpyTypedArrayEncoder
+
+
+class Model(BaseModel):
+    id: PydanticObjectId = Field(alias='_id')
+    revision_id: int | None = Field(None, hidden=True)
+
+
+def test_document():
+    model = Model(_id=PydanticObjectId(), revision_id=1)
+    content = json.loads(DocumentResponse(model).body)
+    assert content == {'_id': str(model.id)}
+
+
+def test_alias():
+    output = OutputWithValue(id='pipeline.0', name='0', schema={'type': 'array'})
+    assert json.loads(dumps_json([output]))[0]['schema'] == {'type': 'array'}
+
+
+@pytest.mark.parametrize(
+    'value, expected',
+    [
+        (np.arange(3), [0, 1, 2]),
+        (np.float32(0.5), 0.5),
+        ({1: 'a'}, {'1': 'a'}),
+        (2**70, 2**70),
+        (
+            {'value': 2**70, 'done_at': datetime(2022, 1, 2, 3, 4, 5, 6)},
+            {'value': 2**70, 'done_at': '2022-01-02T03:04:05.000006'},
+        ),
+    ],
+)
+def test_dumps_json(value, expected):
+    assert json.loads(dumps_json(value)) == expected
+
+
+def test_dumps_json_not_serializable():
+    with pytest.raises(TypeError):
+        dumps_json(object())
+
+
+@pytest.mark.parametrize('dtype', ['<f8', '>i2', '?'])
+def test_msgpack_ndarray(dtype):
+    value = np.arange(6).reshape(2, 3).astype(dtype)
+    actual = loads_msgpack(dumps_msgpack({'value': value}))['value']
+    assert actual.dtype == value.dtype
+    np.testing.assert_array_equal(actual, value)
+    actual = loads_msgpack(dumps_msgpack(value), ndarray_as_list=True)
+    assert actual == value.tolist()
+
+
+def test_msgpack_typed_array():
+    value = np.arange(3, dtype=np.float32)
+    output = OutputWithValue(
+        id='pipeline.0',
+        name='0',
+        schema=NumpyTypedArrayEncoder.SCHEMA,
+        value=NumpyTypedArrayEncoder().encode(value),
+    )
+    actual = loads_msgpack(dumps_msgpack(output))
+    np.testing.assert_array_equal(actual['value'], value)
+    assert actual['schema'] == NumpyTypedArrayEncoder.SCHEMA
+
+
+@pytest.mark.parametrize(
+    'accept, expected',
+    [
+        (None, 1),
+        ('application/json', 0),
+        ('application/msgpack', 1),
+        ('application/*;q=0.5', 0.5),
+        ('*/*;q=0.1, application/msgpack;q=0.8', 0.8),
+        ('application/msgpack;q=0, */*', 0),
+    ],
+)
+def test_accepted_quality(accept, expected):
+    headers = [] if accept is None else [(b'accept', accept.encode())]
+    request = Request({'type': 'http', 'headers': headers})
+    assert get_accepted_quality(request, 'application/msgpack') == expected
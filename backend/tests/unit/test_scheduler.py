@@ -0,0 +1,62 @@
+import asyncio
+
+from sonouno_server.scheduler import JobScheduler
+
+
+async def run_jobs(scheduler, requests, order, release):
+    """Queues executions, records their start order and waits for the release."""
+
+    async def run(user_id, priority):
+        async with scheduler.slot(user_id, priority):
+            order.append(user_id)
+            await release.wait()
+
+    tasks = [asyncio.create_task(run(*r)) for r in requests]
+    await asyncio.sleep(0)
+    return tasks
+
+
+async def test_user_concurrency():
+    scheduler = JobScheduler(max_concurrency=4, user_concurrency=2)
+    order, release = [], asyncio.Event()
+    tasks = await run_jobs(scheduler, [('a', 'interactive')] * 3, order, release)
+    assert order == ['a', 'a']
+    assert scheduler.get_stats()['a'].queued == 1
+    release.set()
+    await asyncio.gather(*tasks)
+    assert order == ['a', 'a', 'a']
+    assert scheduler.queue_depth == 0
+    assert scheduler.running == 0
+    # the statistics of the idle users are dropped
+    assert scheduler.get_stats() == {}
+
+
+async def test_fair_share():
+    scheduler = JobScheduler(max_concurrency=1, user_concurrency=1)
+    order, release = [], asyncio.Event()
+    tasks = await run_jobs(scheduler, [('a', 'bulk')] * 4, order, release)
+    tasks += await run_jobs(scheduler, [('b', 'bulk')] * 2, order, release)
+    release.set()
+    await asyncio.gather(*tasks)
+    assert order == ['a', 'b', 'a', 'b', 'a', 'a']
+
+
+async def test_interactive_before_bulk():
+    scheduler = JobScheduler(max_concurrency=1, user_concurrency=1)
+    order, release = [], asyncio.Event()
+    tasks = await run_jobs(scheduler, [('a', 'bulk')] * 3, order, release)
+    tasks += await run_jobs(scheduler, [('b', 'interactive')], order, release)
+    release.set()
+    await asyncio.gather(*tasks)
+    assert order == ['a', 'b', 'a', 'a']
+
+
+async def test_cancel_queued():
+    scheduler = JobScheduler(max_concurrency=1, user_concurrency=1)
+    order, release = [], asyncio.Event()
+    tasks = await run_jobs(scheduler, [('a', 'interactive')] * 2, order, release)
+    tasks[1].cancel()
+    release.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    assert order == ['a']
+    assert scheduler.get_stats() == {}
@@ -0,0 +1,89 @@
+import pytest
+
+from sonouno_server import tracing
+from sonouno_server.config import CONFIG
+
+
+class ListExporter(tracing.SpanExporter):
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+
+@pytest.fixture
+def exporter(monkeypatch):
+    exporter = ListExporter()
+    monkeypatch.setattr(tracing, 'EXPORTER', exporter)
+    return exporter
+
+
+def test_exporter_not_implemented():
+    class IncompleteExporter(tracing.SpanExporter):
+        pass
+
+    with pytest.raises(TypeError):
+        IncompleteExporter()
+
+
+def test_disabled(monkeypatch):
+    monkeypatch.setattr(tracing, 'EXPORTER', None)
+    with tracing.span('a') as span:
+        assert span is None
+        assert tracing.get_traceparent() is None
+
+
+def test_nested_spans(exporter):
+    with tracing.span('root', key='value') as root:
+        with tracing.span('child'):
+            tracing.set_span_attributes(job_id='1')
+    child, root = exporter.spans
+    assert root.name == 'root'
+    assert root.parent_id is None
+    assert root.attributes == {'key': 'value'}
+    assert child.trace_id == root.trace_id
+    assert child.parent_id == root.span_id
+    assert child.attributes == {'job_id': '1'}
+    assert root.end_time >= child.end_time >= child.start_time >= root.start_time
+    assert tracing.get_current_span() is None
+
+
+def test_error(exporter):
+    with pytest.raises(ValueError):
+        with tracing.span('root'):
+            raise ValueError('boom')
+    assert exporter.spans[0].status == 'error'
+    assert exporter.spans[0].error == 'ValueError: boom'
+
+
+def test_sampling(exporter, monkeypatch):
+    monkeypatch.setattr(CONFIG, 'tracing_sample_rate', 0.0)
+    with tracing.span('root'):
+        with tracing.span('child'):
+            assert tracing.get_traceparent().endswith('-00')
+    assert exporter.spans == []
+
+
+def test_traceparent(exporter):
+    with tracing.span('root') as root:
+        traceparent = tracing.get_traceparent()
+    assert traceparent == f'00-{root.trace_id}-{root.span_id}-01'
+
+    tracing.attach_traceparent(traceparent)
+    try:
+        with tracing.span('worker') as worker:
+            pass
+    finally:
+        tracing.current_span.set(None)
+    assert worker.trace_id == root.trace_id
+    assert worker.parent_id == root.span_id
+
+
+async def test_traced(exporter):
+    @tracing.traced('function')
+    async def function(x):
+        return x + 1
+
+    assert await function(1) == 2
+    assert [s.name for s in exporter.spans] == ['function']
@@ -0,0 +1,57 @@
+from uuid import uuid4
+
+import pytest
+
+from sonouno_server.util.cache import LRUCache
+
+
+@pytest.fixture
+def cache():
+    return LRUCache(f'test-{uuid4()}', max_size=10)
+
+
+def test_eviction(cache):
+    cache.set('a', 1, 4)
+    cache.set('b', 2, 4)
+    assert cache.get('a') == 1
+    cache.set('c', 3, 4)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.size == 8
+    assert len(cache) == 2
+
+
+def test_too_large(cache):
+    cache.set('a', 1, 4)
+    cache.set('b', 2, 11)
+    assert cache.get('b') is None
+    assert cache.size == 4
+
+
+def test_replace(cache):
+    cache.set('a', 1, 4)
+    cache.set('a', 2, 6)
+    assert cache.get('a') == 2
+    assert cache.size == 6
+
+
+def test_resize(cache):
+    cache.set('a', 1, 4)
+    cache.resize('a', 5)
+    cache.resize('b', 5)
+    assert cache.size == 5
+    assert cache.get('b') is None
+
+
+def test_pop(cache):
+    cache.set('a', 1, 4)
+    cache.pop('a')
+    cache.pop('b')
+    assert cache.get('a') is None
+    assert cache.size == 0
+
+
+def test_duplicate(cache):
+    with pytest.raises(ValueError, match='Duplicate cache'):
+        LRUCache(cache.name, 10)
@@ -0,0 +1,63 @@
+import os
+
+import pytest
+
+from sonouno_server.util.disk_cache import PARTIAL_PREFIX, DiskCache
+
+
+def fetcher(content: bytes, fetched: list[str]):
+    def fetch(path: str) -> None:
+        fetched.append(path)
+        with open(path, 'wb') as f:
+            f.write(content)
+
+    return fetch
+
+
+def test_disk_cache_hit(tmp_path):
+    cache = DiskCache(str(tmp_path / 'cache'), 100)
+    fetched: list[str] = []
+    path = cache.get_path('a', fetcher(b'content', fetched))
+    assert path == str(tmp_path / 'cache' / 'a')
+    assert cache.get_path('a', fetcher(b'other', fetched)) == path
+    assert len(fetched) == 1
+    with open(path, 'rb') as f:
+        assert f.read() == b'content'
+
+
+def test_disk_cache_eviction(tmp_path):
+    cache = DiskCache(str(tmp_path), 25)
+    fetched: list[str] = []
+    for index, name in enumerate(['a', 'b']):
+        cache.get_path(name, fetcher(10 * b'x', fetched))
+        os.utime(tmp_path / name, (index, index))
+    # the entry a becomes the most recently used
+    cache.get_path('a', fetcher(b'', fetched))
+    cache.get_path('c', fetcher(10 * b'x', fetched))
+    assert sorted(os.listdir(tmp_path)) == ['a', 'c']
+
+    # the last fetched entry is kept, even if it exceeds the maximum size
+    cache.get_path('d', fetcher(30 * b'x', fetched))
+    assert os.listdir(tmp_path) == ['d']
+
+
+def test_disk_cache_failed_fetch(tmp_path):
+    cache = DiskCache(str(tmp_path), 100)
+
+    def fetch(path: str) -> None:
+        raise OSError('Unreachable.')
+
+    with pytest.raises(OSError, match='Unreachable'):
+        cache.get_path('a', fetch)
+    assert os.listdir(tmp_path) == []
+
+
+def test_disk_cache_stale_partial(tmp_path):
+    cache = DiskCache(str(tmp_path), 100, partial_lifetime=60)
+    stale_path = tmp_path / f'{PARTIAL_PREFIX}stale'
+    stale_path.write_bytes(b'')
+    os.utime(stale_path, (0, 0))
+    fresh_path = tmp_path / f'{PARTIAL_PREFIX}fresh'
+    fresh_path.write_bytes(b'')
+    cache.get_path('a', fetcher(b'content', []))
+    assert sorted(os.listdir(tmp_path)) == [f'{PARTIAL_PREFIX}fresh', 'a']
@@ -0,0 +1,33 @@
+from urllib.parse import parse_qs, urlsplit
+
+from sonouno_server.config import CONFIG
+from sonouno_server.util.downloads import SIGNATURE_CACHE, presign_uri
+from sonouno_server.util.io import get_object_uri
+
+NAME = 'blobs/ab/abcdef.wav'
+
+
+def test_presign_uri():
+    uri = get_object_uri(NAME)
+    url = presign_uri(uri, 1)
+    split_url = urlsplit(url)
+    assert url.startswith(CONFIG.minio_public_url)
+    assert split_url.path == f'/jobs/{NAME}'
+    query = parse_qs(split_url.query)
+    assert query['X-Amz-Expires'] == [str(CONFIG.presigned_url_expiry)]
+    assert 'X-Amz-Signature' in query
+    assert SIGNATURE_CACHE.get(f'1:{NAME}') == url
+
+
+def test_presign_uri_window():
+    uri = get_object_uri(NAME)
+    url = presign_uri(uri, 2)
+    # the URLs of a window are the same in all the server processes
+    SIGNATURE_CACHE.clear()
+    assert presign_uri(uri, 2) == url
+    assert presign_uri(uri, 3) != url
+
+
+def test_presign_uri_other():
+    uri = 'https://example.org/jobs/output.wav'
+    assert presign_uri(uri, 1) == uri
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from sonouno_server.util.encoders import NumpyTypedArrayEncoder
+
+
+@pytest.mark.parametrize(
+    'value',
+    [
+        np.arange(10.0),
+        np.arange(6, dtype='>i4').reshape(2, 3),
+        np.arange(6, dtype=np.uint8).reshape(2, 3).T,
+        np.array([1 + 2j], dtype=np.complex64),
+        np.array([True, False]),
+        np.array(3.5),
+    ],
+)
+def test_typed_array(value):
+    encoded = NumpyTypedArrayEncoder().encode(value)
+    assert encoded['dtype'] == value.dtype.newbyteorder('<').name
+    assert encoded['shape'] == list(value.shape)
+    decoded = NumpyTypedArrayEncoder.decode(encoded)
+    assert decoded.dtype == value.dtype.newbyteorder('<')
+    np.testing.assert_array_equal(decoded, value)
+
+
+def test_typed_array_little_endian():
+    encoded = NumpyTypedArrayEncoder().encode(np.array([1], dtype='>u2'))
+    assert encoded == {'dtype': 'uint16', 'shape': [1], 'data': 'AQA='}
+
+
+def test_typed_array_invalid_dtype():
+    with pytest.raises(TypeError, match='dtype'):
+        NumpyTypedArrayEncoder().encode(np.array(['a']))
@@ -0,0 +1,39 @@
+from datetime import datetime
+
+import pytest
+from fastapi import Request
+
+from sonouno_server.util.etags import get_document_etag, match_etag
+
+
+def create_request(**headers):
+    raw_headers = [
+        (k.replace('_', '-').encode(), v.encode()) for k, v in headers.items()
+    ]
+    return Request({'type': 'http', 'headers': raw_headers})
+
+
+def test_document_etag():
+    done_at = datetime(2022, 5, 26, 12, 0, 0, 123000)
+    etag = get_document_etag(create_request(), 'id', done_at)
+    assert etag.startswith('"id-') and etag.endswith('"')
+    assert etag != get_document_etag(create_request(), 'id', datetime(2022, 5, 26))
+    request = create_request(accept='application/msgpack')
+    assert get_document_etag(request, 'id', done_at) == etag[:-1] + '-msgpack"'
+
+
+@pytest.mark.parametrize(
+    'if_none_match, expected',
+    [
+        ('"a"', '"a"'),
+        ('W/"a"', '"a"'),
+        ('"b", "a-gzip"', '"a-gzip"'),
+        ('*', '"a"'),
+        ('"b"', None),
+        ('"a-msgpack"', None),
+    ],
+)
+def test_match_etag(if_none_match, expected):
+    request = create_request(if_none_match=if_none_match)
+    assert match_etag(request, '"a"') == expected
+    assert match_etag(create_request(), '"a"') is None
@@ -0,0 +1,196 @@
+import base64
+import gzip
+import json
+from datetime import datetime
+from io import BytesIO
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from beanie import init_beanie
+from fastapi import HTTPException
+from mongomock_motor import AsyncMongoMockClient
+
+from sonouno_server.app import app
+from sonouno_server.config import CONFIG
+from sonouno_server.models import Blob, OutputWithValue
+from sonouno_server.util.encoders import NumpyTypedArrayEncoder
+from sonouno_server.util.io import (
+    get_json_size,
+    get_json_value,
+    get_value_auto,
+    get_value_with_known_content_type,
+)
+from sonouno_server.util.minio import InMemoryMinio
+
+
+def create_output(schema, transfer='json'):
+    return OutputWithValue(id='pipeline.0', name='0', schema=schema, transfer=transfer)
+
+
+@pytest.fixture
+async def blobs():
+    await init_beanie(AsyncMongoMockClient()['test'], document_models=[Blob])
+
+
+@pytest.fixture
+def minio(monkeypatch, blobs):
+    client = InMemoryMinio()
+    client.make_bucket('jobs')
+    monkeypatch.setattr(app.state, 'minio', client, raising=False)
+    return client
+
+
+@pytest.fixture
+def job():
+    return SimpleNamespace(id='628f4d4255358f834b9df030')
+
+
+def get_object_name(uri):
+    return uri.split('/jobs/', 1)[1]
+
+
+async def test_json_typed_array():
+    output = create_output(
+        {'title': 'A', 'contentMediaType': 'application/octet-stream'}
+    )
+    value = np.arange(5, dtype=np.int16)
+    encoded = await get_value_with_known_content_type(None, output, value)
+    np.testing.assert_array_equal(NumpyTypedArrayEncoder.decode(encoded), value)
+    assert output.json_schema['title'] == 'A'
+    assert output.json_schema['x-typedArray']
+    assert 'contentMediaType' not in output.json_schema
+
+
+async def test_json_base64():
+    output = create_output(
+        {
+            'contentMediaType': 'audio/x-wav',
+            'x-contentMediaEncoding': {'rate': 8000, 'format': 'int16'},
+        }
+    )
+    encoded = await get_value_with_known_content_type(
+        None, output, np.zeros(8, np.int16)
+    )
+    assert base64.b64decode(encoded).startswith(b'RIFF')
+    assert output.json_schema['contentEncoding'] == 'base64'
+    assert output.json_schema['contentMediaType'] == 'audio/x-wav'
+
+
+async def test_json_content_type():
+    output = create_output({'contentMediaType': 'application/json'})
+    assert await get_value_with_known_content_type(None, output, [1, 2]) == [1, 2]
+
+
+@pytest.mark.parametrize('value, expected', [(np.int64(3), 3), ({'a': 1}, {'a': 1})])
+def test_json_value(value, expected):
+    output = create_output({})
+    assert get_json_value(output, value) == expected
+    assert output.json_schema == {}
+
+
+@pytest.mark.parametrize('value', [object(), {'a': [2**63]}])
+def test_json_value_not_serializable(value):
+    with pytest.raises(HTTPException):
+        get_json_value(create_output({}), value)
+
+
+async def test_auto_json_inline(job, minio):
+    output = create_output({'type': 'array'}, transfer='auto')
+    assert await get_value_auto(job, output, np.arange(3)) == [0, 1, 2]
+    assert output.transfer == 'json'
+
+
+async def test_auto_binary_inline(job, minio, monkeypatch):
+    monkeypatch.setattr(CONFIG, 'transfer_inline_max_size', 1024)
+    output = create_output({'contentMediaType': 'text/plain'}, transfer='auto')
+    assert (
+        base64.b64decode(await get_value_auto(job, output, BytesIO(b'hello')))
+        == b'hello'
+    )
+    assert output.transfer == 'json'
+    assert output.json_schema['contentEncoding'] == 'base64'
+
+
+async def test_auto_binary_uri(job, minio, monkeypatch):
+    monkeypatch.setattr(CONFIG, 'transfer_inline_max_size', 2)
+    output = create_output({'contentMediaType': 'text/plain'}, transfer='auto')
+    uri = await get_value_auto(job, output, BytesIO(b'hello'))
+    assert output.transfer == 'uri'
+    assert 'contentEncoding' not in output.json_schema
+    assert minio.get_object('jobs', get_object_name(uri)).read() == b'hello'
+
+
+@pytest.mark.parametrize('compression', ['none', 'gzip'])
+async def test_auto_json_uri(job, minio, monkeypatch, compression):
+    monkeypatch.setattr(CONFIG, 'transfer_json_max_size', 10)
+    monkeypatch.setattr(CONFIG, 'transfer_json_compression', compression)
+    output = create_output({}, transfer='auto')
+    value = {'values': list(range(10))}
+    uri = await get_value_auto(job, output, value)
+    assert output.transfer == 'uri'
+    assert output.json_schema['contentMediaType'] == 'application/json'
+    assert uri.endswith('.json')
+    content = minio.get_object('jobs', get_object_name(uri)).read()
+    if compression == 'gzip':
+        content = gzip.decompress(content)
+    assert json.loads(content) == value
+
+
+async def test_auto_json_big_int(job, minio):
+    output = create_output({}, transfer='auto')
+    value = {'values': [-(2**63), 2**70]}
+    uri = await get_value_auto(job, output, value)
+    assert output.transfer == 'uri'
+    assert json.loads(minio.get_object('jobs', get_object_name(uri)).read()) == value
+
+
+async def test_auto_not_serializable(job, minio):
+    output = create_output({}, transfer='auto')
+    uri = await get_value_auto(job, output, object())
+    assert output.transfer == 'uri'
+    assert uri.endswith('.pickle')
+
+
+async def test_auto_not_serializable_beyond_max_size(job, minio, monkeypatch):
+    monkeypatch.setattr(CONFIG, 'transfer_json_max_size', 10)
+    output = create_output({}, transfer='auto')
+    uri = await get_value_auto(job, output, [list(range(10)), object()])
+    assert output.transfer == 'uri'
+    assert uri.endswith('.pickle')
+
+
+@pytest.mark.parametrize('max_size', [None, 21])
+def test_json_size(max_size):
+    assert get_json_size(list(range(10)), max_size) == 21
+
+
+def test_json_size_exceeded():
+    assert 4 < get_json_size(list(range(10)), 4) < 21
+
+
+@pytest.mark.parametrize('deduplication', [False, True])
+async def test_store_deduplicated(job, minio, monkeypatch, deduplication):
+    monkeypatch.setattr(CONFIG, 'storage_deduplication', deduplication)
+    monkeypatch.setattr(CONFIG, 'transfer_inline_max_size', 2)
+    output = create_output({'contentMediaType': 'text/plain'}, transfer='auto')
+    uri1 = await get_value_auto(job, output, BytesIO(b'hello'))
+    uri2 = await get_value_auto(job, output, BytesIO(b'hello'))
+    assert (uri1 == uri2) is deduplication
+    assert ('/jobs/blobs/' in uri1) is deduplication
+    assert len(list(minio.list_objects('jobs', recursive=True))) == 2 - deduplication
+
+
+async def test_store_blob_manifest(job, minio, monkeypatch):
+    monkeypatch.setattr(CONFIG, 'transfer_inline_max_size', 2)
+    output = create_output({'contentMediaType': 'text/plain'}, transfer='auto')
+    name = get_object_name(await get_value_auto(job, output, BytesIO(b'hello')))
+    blob = await Blob.find_one(Blob.name == name)
+    assert blob.ref_count == 0
+    past = datetime(2000, 1, 1)
+    await blob.set({Blob.updated_at: past})
+    # the lookup of the stored blob defers its removal by the reaper
+    await get_value_auto(job, output, BytesIO(b'hello'))
+    blob = await Blob.find_one(Blob.name == name)
+    assert blob.ref_count == 0
+    assert blob.updated_at > past
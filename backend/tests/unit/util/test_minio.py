@@ -0,0 +1,59 @@
+from io import BytesIO
+
+import pytest
+from minio import Minio
+from minio.deleteobjects import DeleteObject
+from minio.error import S3Error
+
+from sonouno_server.config import CONFIG
+from sonouno_server.util.minio import (
+    InMemoryMinio,
+    create_forked_minio_client,
+    create_minio_client,
+    make_bucket,
+)
+
+
+def test_in_memory_minio(tmp_path):
+    client = InMemoryMinio()
+    make_bucket(client, 'jobs')
+    assert client.bucket_exists('jobs')
+    client.put_object('jobs', 'job-1/a.json', BytesIO(b'[1, 2]'), 6, 'application/json')
+    client.put_object('jobs', 'job-1/b.npz', BytesIO(b'\x00\x01'), 2)
+    client.put_object('jobs', 'job-2/c.wav', BytesIO(b'RIFF'), 4, 'audio/x-wav')
+
+    assert client.get_object('jobs', 'job-1/a.json').read() == b'[1, 2]'
+    stat = client.stat_object('jobs', 'job-2/c.wav')
+    assert stat.size == 4
+    assert stat.content_type == 'audio/x-wav'
+    path = tmp_path / 'c.wav'
+    assert client.fget_object('jobs', 'job-2/c.wav', str(path)).size == 4
+    assert path.read_bytes() == b'RIFF'
+    names = [o.object_name for o in client.list_objects('jobs', 'job-1/')]
+    assert names == ['job-1/a.json', 'job-1/b.npz']
+    assert list(client.list_objects('jobs')) == []
+    assert len(list(client.list_objects('jobs', recursive=True))) == 3
+
+    client.remove_object('jobs', 'job-1/a.json')
+    with pytest.raises(S3Error, match='does not exist'):
+        client.get_object('jobs', 'job-1/a.json')
+
+    delete_objects = [DeleteObject('job-1/b.npz'), DeleteObject('job-2/c.wav')]
+    assert list(client.remove_objects('jobs', delete_objects)) == []
+    assert list(client.list_objects('jobs', recursive=True)) == []
+
+
+def test_in_memory_minio_unknown_bucket():
+    with pytest.raises(S3Error):
+        InMemoryMinio().put_object('jobs', 'a', BytesIO(b''), 0)
+
+
+def test_forked_client(monkeypatch):
+    monkeypatch.setattr(CONFIG, 'storage_backend', 'minio')
+    client = create_minio_client()
+    forked_client = create_forked_minio_client(client)
+    assert isinstance(forked_client, Minio)
+    assert forked_client is not client
+    # the objects of the in-memory stand-in are inherited by the forked processes
+    client = InMemoryMinio()
+    assert create_forked_minio_client(client) is client
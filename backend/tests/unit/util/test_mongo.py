@@ -0,0 +1,34 @@
+import pytest
+from pymongo import ReadPreference
+
+from sonouno_server.config import CONFIG
+from sonouno_server.util.mongo import create_motor_client, get_read_preference
+
+
+@pytest.mark.parametrize(
+    'name, expected',
+    [
+        ('primary', ReadPreference.PRIMARY),
+        ('primaryPreferred', ReadPreference.PRIMARY_PREFERRED),
+        ('secondary', ReadPreference.SECONDARY),
+        ('secondaryPreferred', ReadPreference.SECONDARY_PREFERRED),
+        ('nearest', ReadPreference.NEAREST),
+    ],
+)
+def test_read_preference(name, expected):
+    assert get_read_preference(name) == expected
+
+
+def test_read_preference_error():
+    with pytest.raises(ValueError, match='Invalid MongoDB read preference') as info:
+        get_read_preference('secondary_preferred')
+    assert info.value.__cause__ is None
+    assert info.value.__suppress_context__
+
+
+def test_motor_client_pool_options():
+    client = create_motor_client()
+    pool_options = client.delegate.options.pool_options
+    assert pool_options.max_pool_size == CONFIG.mongo_max_pool_size
+    assert pool_options.min_pool_size == CONFIG.mongo_min_pool_size
+    client.close()
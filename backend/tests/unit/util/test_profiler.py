@@ -0,0 +1,54 @@
+from sonouno_server.util.profiler import (
+    JobProfiler,
+    current_profiler,
+    dump_stats,
+    job_phase,
+)
+
+
+def busy_function():
+    return sum(i * i for i in range(10000))
+
+
+def test_phases():
+    profiler = JobProfiler()
+    with profiler.phase('build'):
+        pass
+    with profiler.phase('build'):
+        pass
+    with profiler.phase('exec'):
+        pass
+    assert set(profiler.phases) == {'build', 'exec'}
+    assert profiler.get_stats() is None
+    assert profiler.get_profile(10).hot_functions == []
+
+
+def test_hot_functions():
+    profiler = JobProfiler(True)
+    token = current_profiler.set(profiler)
+    try:
+        with job_phase('build', profile=True):
+            busy_function()
+        with job_phase('mongo_write'):
+            busy_function()
+    finally:
+        current_profiler.reset(token)
+    profile = profiler.get_profile(3)
+    assert set(profile.phases) == {'build', 'mongo_write'}
+    assert len(profile.hot_functions) == 3
+    assert any('test_profiler' in f.function for f in profile.hot_functions)
+    stats = profiler.get_stats()
+    assert stats is not None
+    assert dump_stats(stats)
+
+
+def test_add_stats():
+    profiler = JobProfiler(True)
+    with profiler.phase('build', profile=True):
+        busy_function()
+    worker_profiler = JobProfiler(True)
+    with worker_profiler.phase('exec', profile=True):
+        busy_function()
+    profiler.add_stats(worker_profiler.get_stats().stats)
+    functions = [f.function for f in profiler.get_profile(100).hot_functions]
+    assert any('busy_function' in f for f in functions)
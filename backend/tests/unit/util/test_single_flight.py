@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from sonouno_server.util.single_flight import SingleFlight
+
+
+async def test_concurrent_calls():
+    single_flight: SingleFlight[int] = SingleFlight()
+    calls = 0
+
+    async def func() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    results = await asyncio.gather(*(single_flight.run('a', func) for _ in range(3)))
+    assert results == [1, 1, 1]
+    assert 'a' not in single_flight
+    assert await single_flight.run('a', func) == 2
+
+
+async def test_distinct_keys():
+    single_flight: SingleFlight[str] = SingleFlight()
+
+    async def func(value: str) -> str:
+        await asyncio.sleep(0.01)
+        return value
+
+    results = await asyncio.gather(
+        single_flight.run('a', lambda: func('a')),
+        single_flight.run('b', lambda: func('b')),
+    )
+    assert results == ['a', 'b']
+
+
+async def test_exception():
+    single_flight: SingleFlight[None] = SingleFlight()
+
+    async def func() -> None:
+        await asyncio.sleep(0.01)
+        raise ValueError('failed')
+
+    results = await asyncio.gather(
+        single_flight.run('a', func),
+        single_flight.run('a', func),
+        return_exceptions=True,
+    )
+    assert all(isinstance(_, ValueError) for _ in results)
+    with pytest.raises(ValueError):
+        await single_flight.run('a', func)
@@ -1,7 +1,10 @@
 """Common test utilities
 """
 
-from httpx import AsyncClient
+import asyncio
+from typing import Any
+
+from httpx import AsyncClient, Response
 
 from sonouno_server.models.iam import RefreshToken
 
@@ -17,3 +20,21 @@ async def auth_headers(client: AsyncClient, email: str) -> dict[str, str]:
     """Returns the authorization headers for an email"""
     auth = await auth_payload(client, email)
     return {'AUTHORIZATION': 'Bearer ' + auth.access_token}
+
+
+async def wait_deletion(
+    client: AsyncClient, response: Response, headers: dict[str, str]
+) -> dict[str, Any] | None:
+    """Polls the status of a deletion until it is finished. Returns None if the
+    status is no longer accessible, once the requesting user is deleted."""
+    for _ in range(100):
+        status_response = await client.get(
+            response.headers['location'], headers=headers
+        )
+        if status_response.status_code != 200:
+            return None
+        deletion = status_response.json()
+        if deletion['status'] in {'done', 'failed'}:
+            return deletion
+        await asyncio.sleep(0.05)
+    raise TimeoutError('The deletion is not finished.')